@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.datasets import DAY, make_daily_candles
+from project.apps.indicators.mms.helpers import get_default_to_timestamp
+from project.services.candles.clients import CANDLE_SETTINGS, get_candles
+from project.services.candles.schemas import CandleSchema
+
+SIZES = [200, 1000, 10000]
+
+
+@pytest.mark.benchmark(group='candle_schema_from_dict')
+@pytest.mark.parametrize('size', SIZES)
+def bench_candle_schema_from_dict(benchmark, size):
+    candles = make_daily_candles(size)
+
+    result = benchmark(
+        lambda: [CandleSchema.from_dict(candle) for candle in candles]
+    )
+
+    assert len(result) == size
+
+
+@pytest.mark.benchmark(group='get_candles')
+@pytest.mark.parametrize('size', SIZES)
+def bench_get_candles(benchmark, event_loop, candles_server, size):
+    to_timestamp = get_default_to_timestamp()
+
+    # The logger is patched to measure the request and the parsing, the cost
+    # of logging the whole response depends on the logging setup
+    with patch.dict(CANDLE_SETTINGS, {
+        'url': str(candles_server.make_url('/')),
+        'max_retries': 1,
+    }), patch('project.services.candles.clients.logger'):
+        result = benchmark(lambda: event_loop.run_until_complete(get_candles(
+            pair='BRLBTC',
+            from_timestamp=to_timestamp - size * DAY + 1,
+            to_timestamp=to_timestamp,
+            precision='1d',
+        )))
+
+    assert len(result) == size
@@ -0,0 +1,91 @@
+import itertools
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.test import override_settings
+
+import pytest
+
+from benchmarks.datasets import (
+    DAY,
+    make_daily_candles,
+    make_simple_moving_averages
+)
+from project.apps.indicators.mms.helpers import (
+    _calculate_simple_moving_average,
+    get_default_to_timestamp,
+    save_simple_moving_average_database
+)
+from project.services.candles.schemas import CandleSchema
+
+
+@pytest.mark.benchmark(group='calculate_simple_moving_average')
+@pytest.mark.parametrize('size', [20, 50, 200])
+def bench_calculate_simple_moving_average(benchmark, size):
+    values = [
+        CandleSchema.from_dict(candle).close
+        for candle in make_daily_candles(size)
+    ]
+
+    result = benchmark(_calculate_simple_moving_average, values)
+
+    assert isinstance(result, Decimal)
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(group='retrieve')
+@pytest.mark.parametrize('cache_status', ['HIT', 'MISS'])
+@pytest.mark.parametrize('days', [30, 365])
+def bench_retrieve(benchmark, client, cache_status, days):
+    make_simple_moving_averages(days)
+    to_timestamp = get_default_to_timestamp()
+    params = {
+        'from': to_timestamp - (days - 1) * DAY,
+        'to': to_timestamp,
+        'range': 20,
+        'precision': '1d',
+    }
+    path = f'/v1/indicators/BRLBTC/mms?{urlencode(params)}'
+
+    # The tests use the dummy cache, which always misses
+    caches = {}
+    if cache_status == 'HIT':
+        caches = {'CACHES': {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            },
+            'response': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': f'bench_retrieve_{days}',
+            },
+            'lock': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            },
+        }}
+
+    with override_settings(**caches):
+        client.get(path)
+        response = benchmark(client.get, path)
+
+    assert response.status_code == 200
+    assert len(response.json()) == days
+    assert response['X-Cache-Status'] == cache_status
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(group='save_simple_moving_average_database')
+@pytest.mark.parametrize('days', [0, 365, 3650])
+def bench_save_simple_moving_average_database(benchmark, days):
+    make_simple_moving_averages(days)
+    timestamps = itertools.count(get_default_to_timestamp() + DAY, DAY)
+
+    # The function itself, without the thread of sync_to_async
+    save = save_simple_moving_average_database.func
+    benchmark(lambda: save(
+        pair='BRLBTC',
+        precision='1d',
+        mms_20=Decimal('201108.2404745000'),
+        mms_50=Decimal('258627.0329508000'),
+        mms_200=Decimal('229149.8719421000'),
+        timestamp=next(timestamps),
+    ))
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from project.services.candles.fake_server import create_app
+
+
+@pytest.fixture
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def candles_server(event_loop):
+    """
+    Local server of the fake Candles API
+    """
+    server = TestServer(create_app(), loop=event_loop)
+    event_loop.run_until_complete(server.start_server())
+    yield server
+    event_loop.run_until_complete(server.close())
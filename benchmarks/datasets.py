@@ -0,0 +1,44 @@
+import random
+from decimal import Decimal
+from typing import Dict, List
+
+from project.apps.indicators.mms.helpers import get_default_to_timestamp
+from project.apps.indicators.mms.models import SimpleMovingAverage
+from project.services.candles.fake_server import make_candles
+
+DAY = 86400
+
+
+def make_daily_candles(size: int) -> List[Dict]:
+    """
+    Returns the candles of the size days until yesterday
+    """
+    to_timestamp = get_default_to_timestamp()
+    return make_candles(
+        pair='BRLBTC',
+        from_timestamp=to_timestamp - size * DAY + 1,
+        to_timestamp=to_timestamp,
+    )
+
+
+def make_simple_moving_averages(
+    size: int,
+    pair: str = 'BRLBTC',
+    precision: str = '1d'
+) -> List[SimpleMovingAverage]:
+    """
+    Stores the simple moving averages of the size days until yesterday
+    """
+    generator = random.Random(size)
+    end = get_default_to_timestamp()
+    return SimpleMovingAverage.objects.bulk_create([
+        SimpleMovingAverage(
+            pair=pair,
+            precision=precision,
+            timestamp=end - index * DAY,
+            mms_20=Decimal(f'{generator.uniform(1e5, 3e5):.10f}'),
+            mms_50=Decimal(f'{generator.uniform(1e5, 3e5):.10f}'),
+            mms_200=Decimal(f'{generator.uniform(1e5, 3e5):.10f}'),
+        )
+        for index in range(size)
+    ])
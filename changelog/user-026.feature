@@ -0,0 +1 @@
+Adds the mms_partitions command to partition the indicator table by year, rotate partitions and create a BRIN index on timestamp
@@ -0,0 +1 @@
+Adds weekly and monthly rollups of the simple moving average and the granularity parameter on the indicator route
@@ -0,0 +1 @@
+Invalidates the indicator route cache with a per pair version after each calculation and warms the most requested ranges
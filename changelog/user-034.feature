@@ -0,0 +1 @@
+Accepts several ranges (or all of them) in the indicator route and returns every average from one query and one cached response
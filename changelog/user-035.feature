@@ -0,0 +1 @@
+Adds a batch indicator route that returns several pairs from one query and one cache multi-get
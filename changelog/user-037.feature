@@ -0,0 +1 @@
+Adds ETag and Cache-Control headers to the indicator route and answers matching If-None-Match requests with 304
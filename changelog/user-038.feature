@@ -0,0 +1 @@
+Adds columnar JSON, MessagePack and packed binary formats to the indicator routes
@@ -0,0 +1 @@
+Adds a streaming mode with chunked JSON, NDJSON and binary output to the indicator route
@@ -0,0 +1 @@
+Adds keyset pagination with a limit and an opaque cursor to the indicator route
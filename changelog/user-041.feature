@@ -0,0 +1 @@
+Adds a route with the latest simple moving averages of a pair, read from a Redis hash
@@ -0,0 +1 @@
+Adds server-sent events with the new simple moving averages of a pair, fed by Redis pub/sub
@@ -0,0 +1 @@
+Adds an opt-in queue-based log handler that writes from a background thread and computes the static log fields once
@@ -0,0 +1 @@
+Adds a /metrics/ endpoint with request, cache, lock, Candles API and Celery task metrics
@@ -0,0 +1 @@
+Adds an opt-in profiling middleware triggered by a signed header or a sample rate, with a Server-Timing header
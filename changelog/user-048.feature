@@ -0,0 +1 @@
+Adds a pytest-benchmark suite of the indicator hot paths with JSON results (make benchmark and make benchmark-compare)
@@ -0,0 +1 @@
+Adds a fake Candles API server and the mms_load_test command, which runs the beat, calculate, save and retrieve flow and reports throughput and latency percentiles
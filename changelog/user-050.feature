@@ -0,0 +1 @@
+Added pluggable lock backends (cache, Postgres advisory locks and in-process), picked with LOCK_BACKEND.
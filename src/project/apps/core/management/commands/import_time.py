@@ -0,0 +1,146 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, NamedTuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simple_settings import settings
+
+# Code run by each role when its process starts, up to the point where it
+# can handle the first request or task
+STARTUP_CODE = {
+    'web': (
+        'import project.core.asgi\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns\n'
+    ),
+    'worker': (
+        'import django\n'
+        'from project.core.celery import app\n'
+        'django.setup()\n'
+        'app.loader.import_default_modules()\n'
+    ),
+}
+STARTUP_CODE['beat'] = STARTUP_CODE['worker']
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_time: float
+    cumulative_time: float
+
+
+def parse_import_times(report: str) -> List[ImportTime]:
+    """
+    Parses the report of python -X importtime (microseconds) into the
+    import times of the modules in milliseconds
+    """
+    import_times = []
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        self_time, cumulative_time, module = line[12:].split('|')
+        if not self_time.strip().isdigit():
+            continue  # header
+
+        import_times.append(ImportTime(
+            module=module.strip(),
+            self_time=int(self_time) / 1000,
+            cumulative_time=int(cumulative_time) / 1000,
+        ))
+
+    return import_times
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the startup time of the processes of each role (web, '
+        'worker and beat) and reports the modules that take longer to import'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--role',
+            help='role of the process measured, can be repeated',
+            choices=list(STARTUP_CODE),
+            action='append',
+            dest='roles',
+        )
+        parser.add_argument(
+            '--repeat',
+            help='number of times each process is started',
+            type=int,
+            default=5,
+            required=False
+        )
+        parser.add_argument(
+            '--limit',
+            help='number of modules reported by role',
+            type=int,
+            default=20,
+            required=False
+        )
+        parser.add_argument(
+            '--sort',
+            help='time by which the modules are sorted',
+            choices=['self', 'cumulative'],
+            default='self',
+            required=False
+        )
+
+    def handle(self, *args, **options):
+        for role in options['roles'] or list(STARTUP_CODE):
+            durations = [
+                self.start_process(role)[0]
+                for _ in range(options['repeat'])
+            ]
+            self.stdout.write(
+                f'{role}: {statistics.median(durations):.1f} ms to start '
+                f'(median of {len(durations)} runs, '
+                f'min {min(durations):.1f} ms, max {max(durations):.1f} ms)'
+            )
+
+            _, report = self.start_process(role, import_time=True)
+            import_times = sorted(
+                parse_import_times(report),
+                key=lambda item: getattr(item, f'{options["sort"]}_time'),
+                reverse=True
+            )
+            self.stdout.write(f'{"self ms":>10} {"cumulative ms":>14}  module')
+            for item in import_times[:options['limit']]:
+                self.stdout.write(
+                    f'{item.self_time:>10.1f} {item.cumulative_time:>14.1f}  '
+                    f'{item.module}'
+                )
+            self.stdout.write('')
+
+    @staticmethod
+    def start_process(role: str, import_time: bool = False):
+        """
+        Starts a new interpreter that runs the startup of the role, returning
+        its duration in milliseconds and its stderr
+        """
+        command = [sys.executable]
+        if import_time:
+            command += ['-X', 'importtime']
+
+        start = time.perf_counter()
+        process = subprocess.run(
+            [*command, '-c', STARTUP_CODE[role]],
+            cwd=settings.SRC_DIR,
+            env={**os.environ, 'PROCESS_ROLE': role},
+            capture_output=True,
+            text=True,
+        )
+        duration = (time.perf_counter() - start) * 1000
+
+        if process.returncode != 0:
+            raise CommandError(
+                f'The {role} process failed to start:\n{process.stderr}'
+            )
+
+        return duration, process.stderr
@@ -0,0 +1,77 @@
+import subprocess
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from project.apps.core.management.commands.import_time import (
+    ImportTime,
+    parse_import_times
+)
+
+REPORT = (
+    'import time: self [us] | cumulative | imported package\n'
+    'import time:       120 |        120 |   orjson\n'
+    'import time:      2500 |       3100 | ninja.main\n'
+    'Using settings "project.core.settings.test"\n'
+)
+
+
+class TestCommandImportTime:
+
+    @pytest.fixture()
+    def mock_run(self):
+        with patch(
+            'project.apps.core.management.commands.import_time'
+            '.subprocess.run'
+        ) as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=0, stderr=REPORT
+            )
+            yield mock_run
+
+    def test_should_validate_the_parsing_of_the_import_time_report(self):
+        assert parse_import_times(REPORT) == [
+            ImportTime(module='orjson', self_time=0.12, cumulative_time=0.12),
+            ImportTime(
+                module='ninja.main', self_time=2.5, cumulative_time=3.1
+            ),
+        ]
+
+    def test_should_validate_that_the_role_startup_is_reported(
+        self,
+        mock_run
+    ):
+        out = StringIO()
+        call_command(
+            'import_time',
+            '--role=worker',
+            '--repeat=2',
+            '--limit=1',
+            stdout=out
+        )
+
+        output = out.getvalue()
+        assert mock_run.call_count == 3
+        assert all(
+            call.kwargs['env']['PROCESS_ROLE'] == 'worker'
+            for call in mock_run.call_args_list
+        )
+        assert mock_run.call_args.args[0][1:3] == ['-X', 'importtime']
+        assert output.startswith('worker: ')
+        assert '(median of 2 runs' in output
+        assert 'ninja.main' in output
+        assert 'orjson' not in output
+
+    def test_should_validate_that_a_failed_startup_raises_error(
+        self,
+        mock_run
+    ):
+        mock_run.return_value = subprocess.CompletedProcess(
+            args=[], returncode=1, stderr='ImportError'
+        )
+
+        with pytest.raises(CommandError, match='The web process failed'):
+            call_command('import_time', '--role=web', stdout=StringIO())
@@ -0,0 +1,324 @@
+import time
+from decimal import Decimal
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+import orjson
+from simple_settings import settings
+
+from project.apps.indicators.mms.enum import FormatEnum, RangeDaysEnum
+from project.core.caches import (
+    AsyncStaleWhileRevalidateCache,
+    LocalLRUCache,
+    StaleWhileRevalidateCache,
+    get_async_cache,
+    set_hash_if_newer
+)
+from project.core.metrics import registry
+from project.core.profiling import timed
+from project.core.pubsub import Subscription, publish
+from project.core.renderers import (
+    RendererBinary,
+    RendererColumnar,
+    RendererDefault,
+    RendererMsgPack,
+    RendererNDJson
+)
+
+cache = ConnectionProxy(caches, 'response')
+
+async_cache = get_async_cache('response')
+
+async_latest_cache = get_async_cache('default')
+
+local_cache = (
+    LocalLRUCache(max_size=settings.LOCAL_CACHE['max_size'])
+    if settings.LOCAL_CACHE['enabled']
+    else None
+)
+
+response_cache = StaleWhileRevalidateCache(
+    cache,
+    lifetime=settings.CACHE_LIFETIME['mms_retrieve'],
+    stale_lifetime=settings.CACHE_STALE_LIFETIME['mms_retrieve'],
+    local_cache=local_cache,
+    local_lifetime=settings.LOCAL_CACHE['lifetime'],
+)
+
+CACHE_REQUESTS = registry.counter(
+    'mms_cache_requests_total',
+    'Responses of the mms routes by cache status (HIT, MISS, STALE or '
+    'STALE_ERROR)',
+    labels=('route', 'status'),
+)
+
+RENDERERS = {
+    FormatEnum.JSON: RendererDefault(),
+    FormatEnum.NDJSON: RendererNDJson(),
+    FormatEnum.COLUMNS: RendererColumnar(),
+    FormatEnum.MSGPACK: RendererMsgPack(),
+    FormatEnum.BINARY: RendererBinary(),
+}
+
+async_response_cache = AsyncStaleWhileRevalidateCache(
+    async_cache,
+    lifetime=settings.CACHE_LIFETIME['mms_retrieve'],
+    stale_lifetime=settings.CACHE_STALE_LIFETIME['mms_retrieve'],
+    local_cache=local_cache,
+    local_lifetime=settings.LOCAL_CACHE['lifetime'],
+)
+
+
+def get_cache_key(
+    pair: str,
+    precision: str,
+    version: int,
+    range_days: Union[int, str],
+    from_timestamp: int,
+    to_timestamp: int,
+    granularity: str,
+    output_format: str,
+) -> str:
+    return (
+        'mms_retrieve_'
+        f'{pair}_{precision}_v{version}_{range_days}_'
+        f'{from_timestamp}_{to_timestamp}_{granularity}_{output_format}'
+    )
+
+
+def _get_version_key(pair: str, precision: str) -> str:
+    return f'mms_version_{pair}_{precision}'
+
+
+def _new_data_version() -> int:
+    """
+    Returns the current time in microseconds, the first version of the data
+    when the version key is missing (never set, evicted or flushed).
+
+    As the bumps of a pair are far less frequent than one a microsecond, a
+    version seeded after a reset is greater than any version used before
+    it, so a cache key or ETag never names two different contents.
+    """
+    return time.time_ns() // 1000
+
+
+def _seed_data_version(key: str) -> int:
+    version = _new_data_version()
+    cache.add(key, version, timeout=None)
+    return cache.get(key) or version
+
+
+async def _seed_data_version_async(key: str) -> int:
+    version = _new_data_version()
+    await async_cache.add(key, version, timeout=None)
+    return await async_cache.get(key) or version
+
+
+@timed('cache')
+def get_data_version(pair: str, precision: str) -> int:
+    """
+    Returns the version of the data of the pair and precision, which is part
+    of the cache keys and ETags of the responses.
+
+    With the local cache enabled the version is kept in process for a short
+    time, which bounds how long a worker can miss a new version.
+    """
+    key = _get_version_key(pair, precision)
+    version = local_cache.get(key) if local_cache is not None else None
+    if version is None:
+        version = cache.get(key) or _seed_data_version(key)
+        if local_cache is not None:
+            local_cache.set(
+                key,
+                version,
+                settings.LOCAL_CACHE['version_lifetime']
+            )
+
+    return version
+
+
+async def get_data_version_async(pair: str, precision: str) -> int:
+    """
+    The async counterpart of get_data_version
+    """
+    key = _get_version_key(pair, precision)
+    version = local_cache.get(key) if local_cache is not None else None
+    if version is None:
+        version = (
+            await async_cache.get(key) or
+            await _seed_data_version_async(key)
+        )
+        if local_cache is not None:
+            local_cache.set(
+                key,
+                version,
+                settings.LOCAL_CACHE['version_lifetime']
+            )
+
+    return version
+
+
+@timed('cache')
+def get_data_versions(pairs: List[str], precision: str) -> Dict[str, int]:
+    """
+    Returns the version of the data of each pair, reading the versions that
+    are not kept locally with a single call
+    """
+    keys = {pair: _get_version_key(pair, precision) for pair in pairs}
+
+    versions = {}
+    if local_cache is not None:
+        for pair, key in keys.items():
+            version = local_cache.get(key)
+            if version is not None:
+                versions[pair] = version
+
+    missing = [keys[pair] for pair in pairs if pair not in versions]
+    values = cache.get_many(missing) if missing else {}
+    for pair in pairs:
+        if pair in versions:
+            continue
+
+        versions[pair] = (
+            values.get(keys[pair]) or _seed_data_version(keys[pair])
+        )
+        if local_cache is not None:
+            local_cache.set(
+                keys[pair],
+                versions[pair],
+                settings.LOCAL_CACHE['version_lifetime']
+            )
+
+    return versions
+
+
+def bump_data_version(pair: str, precision: str) -> int:
+    """
+    Invalidates all cached responses of the pair and precision by moving
+    them to a new version
+    """
+    key = _get_version_key(pair, precision)
+    cache.add(key, _new_data_version(), timeout=None)
+    version = cache.incr(key)
+
+    if local_cache is not None:
+        local_cache.delete(key)
+
+    return version
+
+
+def _get_latest_key(pair: str, precision: str) -> str:
+    return f'mms_latest_{pair}_{precision}'
+
+
+def set_latest_values(
+    pair: str,
+    precision: str,
+    values: Dict[str, Union[int, Decimal]]
+) -> bool:
+    """
+    Stores the (timestamp, mms_20, mms_50, mms_200) values of the most recent
+    day of the pair and precision, unless a newer day is already stored
+    """
+    return set_hash_if_newer(
+        'default',
+        _get_latest_key(pair, precision),
+        values,
+        order_field='timestamp'
+    )
+
+
+async def get_latest_values_async(
+    pair: str,
+    precision: str
+) -> Dict[str, str]:
+    """
+    Returns the values stored by set_latest_values, or an empty dict
+    """
+    return await async_latest_cache.get_hash(_get_latest_key(pair, precision))
+
+
+@timed('serialization')
+def render_latest_content(
+    values: Dict[str, Union[str, int, Decimal]]
+) -> bytes:
+    """
+    Encodes the values stored by set_latest_values, or read from the
+    database, as IndicatorMmsLatestResponseSchema
+    """
+    return orjson.dumps({
+        'timestamp': int(values['timestamp']),
+        'mms_20': float(values['mms_20']),
+        'mms_50': float(values['mms_50']),
+        'mms_200': float(values['mms_200']),
+    })
+
+
+def _get_latest_channel(pair: str, precision: str) -> str:
+    return f'mms_events_{pair}_{precision}'
+
+
+def publish_latest_values(
+    pair: str,
+    precision: str,
+    values: Dict[str, Union[int, Decimal]]
+) -> int:
+    """
+    Notifies the subscribers of the pair and precision of a new most recent
+    day
+    """
+    return publish(
+        'default',
+        _get_latest_channel(pair, precision),
+        render_latest_content(values)
+    )
+
+
+def subscribe_latest_values(pair: str, precision: str) -> Subscription:
+    """
+    Returns the subscription to the contents published by
+    publish_latest_values
+    """
+    return Subscription('default', _get_latest_channel(pair, precision))
+
+
+def get_content_columns(ranges: Sequence[RangeDaysEnum]) -> List[str]:
+    """
+    Returns the fields of each item of the response: a single range is
+    returned as mms, as IndicatorMmsResponseSchema, and several ranges as
+    IndicatorMmsRangesResponseSchema
+    """
+    if len(ranges) == 1:
+        return ['timestamp', 'mms']
+
+    return ['timestamp', *[f'mms_{range_days.value}' for range_days in ranges]]
+
+
+@timed('serialization')
+def render_content(
+    items: Iterable[Tuple[int, Decimal]],
+    ranges: Sequence[RangeDaysEnum],
+    output_format: FormatEnum = FormatEnum.JSON
+) -> bytes:
+    """
+    Encodes the (timestamp, mms, ...) rows, with one mms per range, in the
+    output format
+    """
+    return RENDERERS[output_format].render_rows(
+        items,
+        get_content_columns(ranges)
+    )
+
+
+@timed('serialization')
+def render_pairs_content(contents: Dict[str, bytes]) -> bytes:
+    """
+    Joins the encoded content of each pair into a JSON object by pair,
+    without decoding them again
+    """
+    return b'{%s}' % b','.join(
+        orjson.dumps(pair) + b':' + content
+        for pair, content in contents.items()
+    )
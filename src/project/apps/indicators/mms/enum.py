@@ -1,7 +1,30 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
+from typing import List
 
 
 class RangeDaysEnum(IntEnum):
     TWENTY = 20
     FIFTY = 50
     TWO_HUNDRED = 200
+
+
+class GranularityEnum(Enum):
+    DAY = '1d'
+    WEEK = '1w'
+    MONTH = '1M'
+
+    @classmethod
+    def get_rollups(cls) -> List['GranularityEnum']:
+        return [cls.WEEK, cls.MONTH]
+
+
+class FormatEnum(Enum):
+    JSON = 'json'
+    NDJSON = 'ndjson'
+    COLUMNS = 'columns'
+    MSGPACK = 'msgpack'
+    BINARY = 'binary'
+
+    @classmethod
+    def get_streamable(cls) -> List['FormatEnum']:
+        return [cls.JSON, cls.NDJSON, cls.BINARY]
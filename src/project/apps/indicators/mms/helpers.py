@@ -1,16 +1,47 @@
+import datetime
 from decimal import Decimal
-from typing import List, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+from django.db import transaction
 from django.db.models import QuerySet
+from django.utils import timezone
 
+import structlog
 from asgiref.sync import sync_to_async
+from simple_settings import settings
 
+from project.apps.indicators.mms.cache import (
+    bump_data_version,
+    get_cache_key,
+    publish_latest_values,
+    render_content,
+    response_cache,
+    set_latest_values
+)
+from project.apps.indicators.mms.enum import (
+    FormatEnum,
+    GranularityEnum,
+    RangeDaysEnum
+)
 from project.apps.indicators.mms.exceptions import (
     CalculateMmsCountCandlesException
 )
-from project.apps.indicators.mms.models import SimpleMovingAverage
+from project.apps.indicators.mms.models import (
+    SimpleMovingAverage,
+    SimpleMovingAverageRollup
+)
 from project.services.candles.clients import get_candles
 
+logger = structlog.get_logger()
+
+PRECISION_SECONDS = {
+    '1m': 60,
+    '15m': 900,
+    '1h': 3600,
+    '3h': 10800,
+    '1d': 86400,
+}
+
 
 async def calculate_simple_moving_average_by_candles(
     pair: str,
@@ -63,15 +94,207 @@ def save_simple_moving_average_database(
     timestamp: int,
 ):
     """
-    Save simple moving average calculation to database
+    Save simple moving average calculation to database.
+
+    The day and its rollups are written in one transaction, so a failed
+    rollup does not leave the day saved (which would make the retry of the
+    task fail on the unique constraint), and the caches are updated only
+    after the commit.
+    """
+    with transaction.atomic():
+        SimpleMovingAverage.objects.create(
+            pair=pair,
+            precision=precision,
+            mms_20=mms_20,
+            mms_50=mms_50,
+            mms_200=mms_200,
+            timestamp=timestamp
+        )
+        save_simple_moving_average_rollups(
+            pair=pair,
+            precision=precision,
+            mms_20=mms_20,
+            mms_50=mms_50,
+            mms_200=mms_200,
+            timestamp=timestamp
+        )
+
+    try:
+        values = {
+            'timestamp': timestamp,
+            'mms_20': mms_20,
+            'mms_50': mms_50,
+            'mms_200': mms_200,
+        }
+        if set_latest_values(pair=pair, precision=precision, values=values):
+            publish_latest_values(
+                pair=pair,
+                precision=precision,
+                values=values
+            )
+    except Exception:
+        logger.warning(
+            'Could not store the latest simple moving average',
+            pair=pair,
+            precision=precision,
+            timestamp=timestamp,
+            exc_info=True,
+        )
+
+    try:
+        refresh_simple_moving_average_cache(
+            pair=pair,
+            precision=precision,
+            timestamp=timestamp
+        )
+    except Exception:
+        logger.warning(
+            'Could not refresh the simple moving average cache',
+            pair=pair,
+            precision=precision,
+            timestamp=timestamp,
+            exc_info=True,
+        )
+
+
+def save_simple_moving_average_rollups(
+    pair: str,
+    precision: str,
+    mms_20: Decimal,
+    mms_50: Decimal,
+    mms_200: Decimal,
+    timestamp: int,
+):
+    """
+    Incrementally updates the weekly and monthly rollups of the period that
+    contains the timestamp, keeping the values of the most recent day
     """
-    SimpleMovingAverage.objects.create(
+    values = {
+        'timestamp': timestamp,
+        'mms_20': mms_20,
+        'mms_50': mms_50,
+        'mms_200': mms_200,
+    }
+
+    for granularity in GranularityEnum.get_rollups():
+        lookup = {
+            'pair': pair,
+            'precision': precision,
+            'granularity': granularity.value,
+            'period': get_period_start(timestamp, granularity),
+        }
+        _, created = SimpleMovingAverageRollup.objects.get_or_create(
+            **lookup,
+            defaults=values
+        )
+        if not created:
+            SimpleMovingAverageRollup.objects.filter(
+                **lookup,
+                timestamp__lt=timestamp
+            ).update(**values, updated_at=timezone.now())
+
+
+def refresh_simple_moving_average_cache(
+    pair: str,
+    precision: str,
+    timestamp: int,
+):
+    """
+    Invalidates the cached responses of the pair and, when the most recent
+    day was written, warms the most requested ranges (each average alone and
+    all of them together) with a single query
+    """
+    version = bump_data_version(pair=pair, precision=precision)
+
+    to_timestamp = get_default_to_timestamp()
+    if timestamp < to_timestamp:
+        return
+
+    now = timezone.now()
+    windows = {}
+    for days in settings.CACHE_WARMING['mms_retrieve']:
+        start = now - datetime.timedelta(days=days)
+        from_timestamp, _ = normalize_timestamp_range(
+            from_timestamp=int(start.timestamp()),
+            to_timestamp=to_timestamp,
+            precision=precision,
+        )
+        windows[days] = from_timestamp
+
+    items = list(get_simple_moving_average_variations(
         pair=pair,
         precision=precision,
-        mms_20=mms_20,
-        mms_50=mms_50,
-        mms_200=mms_200,
-        timestamp=timestamp
+        from_timestamp=min(windows.values()),
+        to_timestamp=to_timestamp,
+    ).values_list('timestamp', 'mms_20', 'mms_50', 'mms_200'))
+
+    contents = {}
+    for from_timestamp in windows.values():
+        window = [item for item in items if item[0] >= from_timestamp]
+        for index, range_days in enumerate(RangeDaysEnum, start=1):
+            cache_key = get_cache_key(
+                pair=pair,
+                precision=precision,
+                version=version,
+                range_days=range_days.value,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                granularity=GranularityEnum.DAY.value,
+                output_format=FormatEnum.JSON.value,
+            )
+            contents[cache_key] = render_content(
+                ((item[0], item[index]) for item in window),
+                [range_days]
+            )
+
+        cache_key = get_cache_key(
+            pair=pair,
+            precision=precision,
+            version=version,
+            range_days='-'.join(str(item.value) for item in RangeDaysEnum),
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            granularity=GranularityEnum.DAY.value,
+            output_format=FormatEnum.JSON.value,
+        )
+        contents[cache_key] = render_content(window, list(RangeDaysEnum))
+
+    response_cache.set_many(contents)
+
+
+def get_period_start(timestamp: int, granularity: GranularityEnum) -> int:
+    """
+    Returns the timestamp of the first day of the week (monday) or month
+    that contains the timestamp
+    """
+    date = datetime.datetime.fromtimestamp(
+        timestamp,
+        tz=datetime.timezone.utc
+    ).date()
+
+    if granularity == GranularityEnum.WEEK:
+        date = date - datetime.timedelta(days=date.weekday())
+    elif granularity == GranularityEnum.MONTH:
+        date = date.replace(day=1)
+
+    start = datetime.datetime.combine(
+        date,
+        datetime.time.min,
+        tzinfo=datetime.timezone.utc
+    )
+    return int(start.timestamp())
+
+
+def _filter_simple_moving_average_variations(
+    granularity: GranularityEnum,
+    **filters
+) -> QuerySet:
+    if granularity == GranularityEnum.DAY:
+        return SimpleMovingAverage.objects.filter(**filters)
+
+    return SimpleMovingAverageRollup.objects.filter(
+        granularity=granularity.value,
+        **filters
     )
 
 
@@ -80,12 +303,107 @@ def get_simple_moving_average_variations(
     precision: str,
     from_timestamp: int,
     to_timestamp: int,
+    granularity: GranularityEnum = GranularityEnum.DAY,
 ) -> Union[QuerySet, List[SimpleMovingAverage]]:
     """
-    Filters out simple moving average variations in the database
+    Filters out simple moving average variations in the database.
+
+    Weekly and monthly granularities are read from the rollup table.
     """
-    return SimpleMovingAverage.objects.filter(
+    return _filter_simple_moving_average_variations(
+        granularity,
         pair=pair,
         precision=precision,
         timestamp__range=(from_timestamp, to_timestamp),
-    )
+    ).order_by('timestamp')
+
+
+def get_latest_simple_moving_average(
+    pair: str,
+    precision: str,
+) -> Optional[Dict]:
+    """
+    Returns the values of the most recent day of the pair, storing them as
+    the latest values for the next requests
+    """
+    values = SimpleMovingAverage.objects.filter(
+        pair=pair,
+        precision=precision,
+    ).order_by('-timestamp').values(
+        'timestamp',
+        'mms_20',
+        'mms_50',
+        'mms_200',
+    ).first()
+
+    if values is not None:
+        set_latest_values(pair=pair, precision=precision, values=values)
+
+    return values
+
+
+def get_simple_moving_average_variations_by_pairs(
+    pairs: List[str],
+    precision: str,
+    from_timestamp: int,
+    to_timestamp: int,
+    granularity: GranularityEnum = GranularityEnum.DAY,
+) -> Union[QuerySet, List[SimpleMovingAverage]]:
+    """
+    Filters out the simple moving average variations of several pairs with
+    a single query, ordered by pair and timestamp
+    """
+    return _filter_simple_moving_average_variations(
+        granularity,
+        pair__in=pairs,
+        precision=precision,
+        timestamp__range=(from_timestamp, to_timestamp),
+    ).order_by('pair', 'timestamp')
+
+
+def normalize_timestamp_range(
+    from_timestamp: int,
+    to_timestamp: int,
+    precision: str,
+) -> Tuple[int, int]:
+    """
+    Aligns the range to the boundaries of the precision, so requests for the
+    same days with different second offsets share the same cache entry.
+
+    The start is moved to the beginning of its period and the end to the end
+    of the last complete period, which keeps the same rows in the range as
+    they are stored at the end of each period.
+    """
+    seconds = PRECISION_SECONDS.get(precision)
+    if not seconds:
+        return from_timestamp, to_timestamp
+
+    from_timestamp = from_timestamp // seconds * seconds
+    to_timestamp = (to_timestamp + 1) // seconds * seconds - 1
+    return from_timestamp, to_timestamp
+
+
+def get_default_to_timestamp() -> int:
+    """
+    Returns the end of the previous day, the last day with a calculated
+    simple moving average
+    """
+    yesterday = timezone.now() - datetime.timedelta(days=1)
+    return int(yesterday.replace(
+        hour=23,
+        minute=59,
+        second=59,
+        microsecond=0,
+    ).timestamp())
+
+
+def get_max_age(to_timestamp: int) -> int:
+    """
+    Returns how long clients can keep a response of the range: ranges that
+    reach the last calculated day can still receive new data, the older ones
+    only change when a past day is calculated again
+    """
+    if to_timestamp >= get_default_to_timestamp():
+        return settings.HTTP_CACHE_MAX_AGE['mms_retrieve']['current']
+
+    return settings.HTTP_CACHE_MAX_AGE['mms_retrieve']['past']
@@ -0,0 +1,453 @@
+import argparse
+import asyncio
+import datetime
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urljoin
+from urllib.request import urlopen
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+import orjson
+from pydantic import errors
+
+from project.apps.indicators.mms.helpers import get_default_to_timestamp
+from project.apps.indicators.mms.models import (
+    SimpleMovingAverage,
+    SimpleMovingAverageRollup
+)
+from project.apps.indicators.mms.schemas import MAX_HISTORY_DAYS, RangeDaysList
+from project.apps.indicators.mms.tasks import (
+    _process_task_beat_select_pairs_to_mms,
+    task_calculate_simple_moving_average
+)
+from project.services.candles.clients import CANDLE_SETTINGS
+from project.services.candles.fake_server import create_app, serve_in_thread
+
+DAY = 86400
+PRECISION = '1d'
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    """
+    Nearest-rank percentile of the sorted values
+    """
+    if not values:
+        return 0
+
+    index = max(int(round(percentile / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def history_days(value: str) -> int:
+    """
+    Days of history read by the requests, which the retrieve route accepts
+    """
+    days = int(value)
+    if not 1 <= days <= MAX_HISTORY_DAYS:
+        raise argparse.ArgumentTypeError(
+            f'must be between 1 and {MAX_HISTORY_DAYS}'
+        )
+
+    return days
+
+
+def range_days(value: str) -> str:
+    """
+    Ranges of the requests, which the retrieve route accepts
+    """
+    try:
+        RangeDaysList.validate(value)
+    except errors.EnumMemberError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the beat, calculate, save and retrieve flow of the simple '
+        'moving average for synthetic pairs against the fake Candles API and '
+        'a running application, and reports the throughput and latency '
+        'percentiles of each step'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pairs',
+            help='number of synthetic pairs (LOAD00000, LOAD00001, ...)',
+            type=int,
+            default=10,
+            required=False
+        )
+        parser.add_argument(
+            '--concurrency',
+            help='number of tasks and requests processed at the same time',
+            type=int,
+            default=4,
+            required=False
+        )
+        parser.add_argument(
+            '--requests',
+            help='number of requests to the retrieve route by pair',
+            type=int,
+            default=10,
+            required=False
+        )
+        parser.add_argument(
+            '--history-days',
+            help='days stored by pair before the flow, read by the requests '
+                 f'(1 to {MAX_HISTORY_DAYS})',
+            type=history_days,
+            default=MAX_HISTORY_DAYS,
+            required=False
+        )
+        parser.add_argument(
+            '--ranges',
+            help='ranges of the requests (e.g. 20,50 or all)',
+            type=range_days,
+            default='all',
+            required=False
+        )
+        parser.add_argument(
+            '--base-url',
+            help='url of the running application called by the requests',
+            default='http://localhost:8000/',
+            required=False
+        )
+        parser.add_argument(
+            '--timeout',
+            help='seconds each request waits for the application',
+            type=float,
+            default=30,
+            required=False
+        )
+        parser.add_argument(
+            '--latency',
+            help='seconds each response of the Candles API waits',
+            type=float,
+            default=0.05,
+            required=False
+        )
+        parser.add_argument(
+            '--jitter',
+            help='maximum random seconds added to the latency',
+            type=float,
+            default=0,
+            required=False
+        )
+        parser.add_argument(
+            '--error-rate',
+            help='fraction of the responses of the Candles API that fail',
+            type=float,
+            default=0,
+            required=False
+        )
+        parser.add_argument(
+            '--size',
+            help='number of candles of every response of the Candles API',
+            type=int,
+            default=None,
+            required=False
+        )
+        parser.add_argument(
+            '--candles-host',
+            help='host where the fake Candles API listens',
+            default='127.0.0.1',
+            required=False
+        )
+        parser.add_argument(
+            '--candles-port',
+            help='port where the fake Candles API listens',
+            type=int,
+            default=8001,
+            required=False
+        )
+        parser.add_argument(
+            '--external-candles',
+            help='uses the Candles API of SERVICE_CANDLE_URL (e.g. a fake '
+                 'server started with other options) instead of starting '
+                 'the fake server',
+            action='store_true',
+            default=False,
+        )
+        parser.add_argument(
+            '--json',
+            help='file where the report is also written as JSON',
+            default=None,
+            required=False
+        )
+        parser.add_argument(
+            '--keep-data',
+            help='keeps the data of the synthetic pairs in the database',
+            action='store_true',
+            default=False,
+        )
+
+    def handle(self, *args, **options):
+        pairs = [f'LOAD{index:05d}' for index in range(options['pairs'])]
+        datetime_started = timezone.now()
+        self.concurrency = options['concurrency']
+
+        self.delete_data(pairs, datetime_started)
+        self.create_history(pairs, options['history_days'])
+
+        if options['external_candles']:
+            server = nullcontext(CANDLE_SETTINGS['url'])
+        else:
+            server = serve_in_thread(
+                create_app(
+                    latency=options['latency'],
+                    jitter=options['jitter'],
+                    error_rate=options['error_rate'],
+                    size=options['size'],
+                ),
+                host=options['candles_host'],
+                port=options['candles_port'],
+            )
+
+        # The tasks of the run call the fake server instead of the
+        # configured Candles API
+        with server as candles_url, patch.dict(
+            CANDLE_SETTINGS,
+            {'url': candles_url}
+        ):
+            steps = self.run_flow(
+                pairs=pairs,
+                datetime_started=datetime_started,
+                requests=options['requests'],
+                history_days=options['history_days'],
+                ranges=options['ranges'],
+                base_url=options['base_url'],
+                timeout=options['timeout'],
+            )
+
+        if not options['keep_data']:
+            self.delete_data(pairs, datetime_started)
+
+        report = {
+            'pairs': len(pairs),
+            'concurrency': self.concurrency,
+            'base_url': options['base_url'],
+            'candles_api': {
+                'url': candles_url,
+                'external': options['external_candles'],
+                'latency': options['latency'],
+                'jitter': options['jitter'],
+                'error_rate': options['error_rate'],
+                'size': options['size'],
+            },
+            'steps': steps,
+        }
+        self.write_report(report)
+        if options['json']:
+            with open(options['json'], 'wb') as file:
+                file.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+    def run_flow(
+        self,
+        pairs: List[str],
+        datetime_started: datetime.datetime,
+        requests: int,
+        history_days: int,
+        ranges: str,
+        base_url: str,
+        timeout: float
+    ) -> Dict[str, Dict]:
+        """
+        Runs each step for all pairs before the next one: the beat sends the
+        calculations to an in-process queue, instead of the broker, which
+        the calculate step consumes, and the requests are sent over HTTP to
+        the application at the base url
+        """
+        calculations = []
+
+        def send_calculation(args, **kwargs):
+            calculations.append(args)
+
+        with patch.object(
+            task_calculate_simple_moving_average,
+            'apply_async',
+            side_effect=send_calculation
+        ):
+            beat = self.run_step(
+                lambda pair: _process_task_beat_select_pairs_to_mms(
+                    pair=pair,
+                    precision=PRECISION,
+                    datetime_started=datetime_started,
+                ),
+                pairs,
+                concurrency=1
+            )
+
+        calculate = self.run_step(
+            lambda args: task_calculate_simple_moving_average(*args),
+            calculations
+        )
+
+        to_timestamp = get_default_to_timestamp()
+        query_string = urlencode({
+            'from': to_timestamp - history_days * DAY + 1,
+            'to': to_timestamp,
+            'range': ranges,
+            'precision': PRECISION,
+        })
+        urls = [
+            urljoin(base_url, f'/v1/indicators/{pair}/mms?{query_string}')
+            for pair in pairs
+            for _ in range(requests)
+        ]
+        random.shuffle(urls)
+
+        cache_status = Counter()
+        lock = threading.Lock()
+
+        def get(url):
+            try:
+                with urlopen(url, timeout=timeout) as response:
+                    response.read()
+            except HTTPError as exc:
+                response = exc
+
+            with lock:
+                cache_status[
+                    response.headers.get('X-Cache-Status', 'NONE')
+                ] += 1
+            if response.status != 200:
+                raise ValueError(f'Status code {response.status}')
+
+        retrieve = self.run_step(get, urls)
+        retrieve['cache_status'] = dict(cache_status)
+
+        return {'beat': beat, 'calculate': calculate, 'retrieve': retrieve}
+
+    def run_step(
+        self,
+        function: Callable,
+        items: Iterable,
+        concurrency: int = None
+    ) -> Dict:
+        """
+        Calls the function with each item, concurrency at a time, returning
+        the throughput and the latency percentiles in milliseconds
+        """
+        concurrency = concurrency or self.concurrency
+        durations = []
+        errors = Counter()
+        lock = threading.Lock()
+
+        def call(item):
+            start = time.perf_counter()
+            error = None
+            try:
+                function(item)
+            except Exception as exc:
+                error = type(exc).__name__
+
+            with lock:
+                durations.append((time.perf_counter() - start) * 1000)
+                if error:
+                    errors[error] += 1
+
+        start = time.perf_counter()
+        if concurrency == 1:
+            for item in items:
+                call(item)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=concurrency,
+                # The tasks run the coroutines in the loop of the thread
+                initializer=lambda: asyncio.set_event_loop(
+                    asyncio.new_event_loop()
+                ),
+            ) as executor:
+                list(executor.map(call, items))
+        seconds = time.perf_counter() - start
+
+        durations.sort()
+        return {
+            'count': len(durations),
+            'errors': dict(errors),
+            'seconds': round(seconds, 3),
+            'throughput': round(len(durations) / seconds, 2) if seconds else 0,
+            'latency_ms': {
+                'p50': round(get_percentile(durations, 50), 2),
+                'p90': round(get_percentile(durations, 90), 2),
+                'p99': round(get_percentile(durations, 99), 2),
+                'max': round(durations[-1] if durations else 0, 2),
+            },
+        }
+
+    @staticmethod
+    def create_history(pairs: List[str], days: int):
+        """
+        Stores synthetic averages for the days before the calculated one
+        """
+        end = get_default_to_timestamp() - DAY
+        generator = random.Random(0)
+        for pair in pairs:
+            SimpleMovingAverage.objects.bulk_create([
+                SimpleMovingAverage(
+                    pair=pair,
+                    precision=PRECISION,
+                    timestamp=end - day * DAY,
+                    mms_20=Decimal(f'{generator.uniform(1e3, 3e5):.10f}'),
+                    mms_50=Decimal(f'{generator.uniform(1e3, 3e5):.10f}'),
+                    mms_200=Decimal(f'{generator.uniform(1e3, 3e5):.10f}'),
+                )
+                for day in range(days - 1)
+            ], batch_size=1000)
+
+    @staticmethod
+    def delete_data(pairs: List[str], datetime_started: datetime.datetime):
+        """
+        Deletes the averages of the synthetic pairs and the locks of the
+        beat, so the flow can run again on the same day
+        """
+        SimpleMovingAverage.objects.filter(pair__in=pairs).delete()
+        SimpleMovingAverageRollup.objects.filter(pair__in=pairs).delete()
+        caches['lock'].delete_many([
+            'task_beat_select_pairs_to_mms:'
+            f'{pair}-{PRECISION}-{datetime_started.date().isoformat()}'
+            for pair in pairs
+        ])
+
+    def write_report(self, report: Dict):
+        api = report['candles_api']
+        self.stdout.write(
+            f'Pairs: {report["pairs"]}, concurrency: {report["concurrency"]}, '
+            f'application: {report["base_url"]}, '
+            f'Candles API: {api["url"]} (latency {api["latency"]} s, '
+            f'error rate {api["error_rate"]})'
+        )
+        self.stdout.write(
+            f'{"step":<10}{"count":>7}{"errors":>8}{"seconds":>9}'
+            f'{"ops/s":>9}{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}'
+            f'{"max ms":>9}'
+        )
+        for name, step in report['steps'].items():
+            latency = step['latency_ms']
+            self.stdout.write(
+                f'{name:<10}{step["count"]:>7}'
+                f'{sum(step["errors"].values()):>8}{step["seconds"]:>9.2f}'
+                f'{step["throughput"]:>9.1f}{latency["p50"]:>9.1f}'
+                f'{latency["p90"]:>9.1f}{latency["p99"]:>9.1f}'
+                f'{latency["max"]:>9.1f}'
+            )
+
+        for name, step in report['steps'].items():
+            if step['errors']:
+                self.stdout.write(f'{name} errors: {step["errors"]}')
+
+        cache_status = report['steps']['retrieve']['cache_status']
+        self.stdout.write(f'retrieve cache status: {cache_status}')
@@ -0,0 +1,121 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+import structlog
+
+from project.apps.indicators.mms import partitions
+
+logger = structlog.get_logger()
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates and rotates the yearly partitions of the Simple Moving '
+        'Average indicator table (Postgres only)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--setup',
+            help='converts the indicator table into a partitioned table',
+            action='store_true',
+            default=False,
+        )
+        parser.add_argument(
+            '--years-ahead',
+            help='number of future years that must have a partition',
+            type=int,
+            default=1,
+            required=False
+        )
+        parser.add_argument(
+            '--retention-years',
+            help='drops the partitions older than this number of years',
+            type=int,
+            default=None,
+            required=False
+        )
+        parser.add_argument(
+            '--brin',
+            help='creates a BRIN index on the timestamp column',
+            action='store_true',
+            default=False,
+        )
+        parser.add_argument(
+            '--database',
+            help='database alias where the commands will be executed',
+            default='default',
+            required=False
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        years_ahead = int(options['years_ahead'])
+        retention_years = options['retention_years']
+
+        if not partitions.is_postgresql(using):
+            logger.error(
+                'Partitioning is only supported on Postgres databases',
+                database=using,
+            )
+            return
+
+        try:
+            current_year = timezone.now().year
+            statements = []
+
+            partitioned = partitions.is_partitioned(using)
+            if not partitioned and not options['setup']:
+                logger.error(
+                    'The indicator table is not partitioned, run the '
+                    'command with --setup first',
+                    database=using,
+                )
+                return
+
+            if not partitioned:
+                years = sorted(set(
+                    partitions.get_stored_years(using) +
+                    list(range(current_year, current_year + years_ahead + 1))
+                ))
+                statements += partitions.sql_convert_to_partitioned(years)
+                existing_years = years
+            else:
+                existing_years = partitions.get_partition_years(using)
+                statements += [
+                    partitions.sql_create_partition(year)
+                    for year in range(
+                        current_year,
+                        current_year + years_ahead + 1
+                    )
+                    if year not in existing_years
+                ]
+
+            dropped_years = []
+            if retention_years is not None:
+                dropped_years = [
+                    year for year in existing_years
+                    if year < current_year - int(retention_years)
+                ]
+                for year in dropped_years:
+                    statements += partitions.sql_drop_partition(year)
+
+            if options['brin']:
+                statements.append(partitions.sql_create_brin_index())
+
+            partitions.execute_statements(statements, using)
+
+            logger.info(
+                'Simple moving average partitions successfully rotated',
+                database=using,
+                years_ahead=years_ahead,
+                retention_years=retention_years,
+                dropped_years=dropped_years,
+                statements=len(statements),
+            )
+        except Exception:
+            logger.error(
+                'An error occurred while rotating the partitions',
+                database=using,
+                exc_info=True,
+            )
@@ -0,0 +1,82 @@
+# Generated by Django 3.2.12 on 2026-10-19 12:00
+
+import datetime
+
+from django.db import migrations, models
+import project.core.models
+import uuid
+
+
+def get_period_start(timestamp, granularity):
+    date = datetime.datetime.fromtimestamp(
+        timestamp, tz=datetime.timezone.utc
+    ).date()
+    if granularity == '1w':
+        date = date - datetime.timedelta(days=date.weekday())
+    else:
+        date = date.replace(day=1)
+    start = datetime.datetime.combine(
+        date, datetime.time.min, tzinfo=datetime.timezone.utc
+    )
+    return int(start.timestamp())
+
+
+def backfill_rollups(apps, schema_editor):
+    SimpleMovingAverage = apps.get_model('mms', 'SimpleMovingAverage')
+    SimpleMovingAverageRollup = apps.get_model(
+        'mms', 'SimpleMovingAverageRollup'
+    )
+
+    rollups = {}
+    items = SimpleMovingAverage.objects.order_by('timestamp').iterator()
+    for item in items:
+        for granularity in ('1w', '1M'):
+            period = get_period_start(item.timestamp, granularity)
+            key = (item.pair, item.precision, granularity, period)
+            rollups[key] = SimpleMovingAverageRollup(
+                pair=item.pair,
+                precision=item.precision,
+                granularity=granularity,
+                period=period,
+                timestamp=item.timestamp,
+                mms_20=item.mms_20,
+                mms_50=item.mms_50,
+                mms_200=item.mms_200,
+            )
+
+    SimpleMovingAverageRollup.objects.bulk_create(
+        rollups.values(), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimpleMovingAverageRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('timestamp', models.IntegerField(verbose_name='Timestamp')),
+                ('period', models.IntegerField(verbose_name='Period start')),
+                ('granularity', models.CharField(max_length=2, verbose_name='Granularity')),
+                ('pair', project.core.models.UpperCaseCharField(max_length=10, verbose_name='Pair')),
+                ('precision', models.CharField(max_length=10, verbose_name='Precision')),
+                ('mms_20', models.DecimalField(decimal_places=10, max_digits=20, verbose_name='Simple Moving Average of 20')),
+                ('mms_50', models.DecimalField(decimal_places=10, max_digits=20, verbose_name='Simple Moving Average of 50')),
+                ('mms_200', models.DecimalField(decimal_places=10, max_digits=20, verbose_name='Simple Moving Average of 200')),
+            ],
+            options={
+                'verbose_name': 'Simple Moving Average Rollup',
+                'verbose_name_plural': 'Simple Moving Average Rollups',
+                'db_table': 'ind_simplemovingaverage_rollup',
+                'unique_together': {('period', 'granularity', 'pair', 'precision')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mms', '0002_simplemovingaveragerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simplemovingaverage',
+            index=models.Index(fields=['pair', 'precision', 'timestamp'], name='ind_sma_pair_precision_ts_idx'),
+        ),
+    ]
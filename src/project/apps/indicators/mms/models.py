@@ -38,3 +38,60 @@ class SimpleMovingAverage(BaseModel):
 
         db_table = 'ind_simplemovingaverage'
         unique_together = ('timestamp', 'pair', 'precision')
+        indexes = [
+            models.Index(
+                fields=['pair', 'precision', 'timestamp'],
+                name='ind_sma_pair_precision_ts_idx',
+            ),
+        ]
+
+
+class SimpleMovingAverageRollup(BaseModel):
+    """
+    Weekly and monthly resolution of the simple moving average.
+
+    Each period keeps the values of the most recent day written in it, so
+    long ranges can be read with one row per week or month.
+    """
+
+    timestamp = models.IntegerField(
+        verbose_name='Timestamp',
+    )
+    period = models.IntegerField(
+        verbose_name='Period start',
+    )
+    granularity = models.CharField(
+        verbose_name='Granularity',
+        max_length=2
+    )
+    pair = UpperCaseCharField(
+        verbose_name='Pair',
+        max_length=10
+    )
+    precision = models.CharField(
+        verbose_name='Precision',
+        max_length=10
+    )
+    mms_20 = models.DecimalField(
+        verbose_name='Simple Moving Average of 20',
+        max_digits=20,
+        decimal_places=10,
+    )
+    mms_50 = models.DecimalField(
+        verbose_name='Simple Moving Average of 50',
+        max_digits=20,
+        decimal_places=10,
+    )
+    mms_200 = models.DecimalField(
+        verbose_name='Simple Moving Average of 200',
+        max_digits=20,
+        decimal_places=10,
+    )
+
+    class Meta:
+        app_label = 'mms'
+        verbose_name = 'Simple Moving Average Rollup'
+        verbose_name_plural = 'Simple Moving Average Rollups'
+
+        db_table = 'ind_simplemovingaverage_rollup'
+        unique_together = ('period', 'granularity', 'pair', 'precision')
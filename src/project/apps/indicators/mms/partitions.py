@@ -0,0 +1,172 @@
+import datetime
+import re
+from typing import List, Optional, Tuple
+
+from django.db import connections, transaction
+
+from project.apps.indicators.mms.models import SimpleMovingAverage
+
+TABLE_NAME = SimpleMovingAverage._meta.db_table
+DEFAULT_PARTITION_NAME = f'{TABLE_NAME}_default'
+BRIN_INDEX_NAME = f'{TABLE_NAME}_timestamp_brin'
+
+_PARTITION_NAME_REGEX = re.compile(rf'^{TABLE_NAME}_y(\d{{4}})$')
+
+
+def get_partition_name(year: int) -> str:
+    return f'{TABLE_NAME}_y{year}'
+
+
+def get_partition_year(partition_name: str) -> Optional[int]:
+    match = _PARTITION_NAME_REGEX.match(partition_name)
+    return int(match.group(1)) if match else None
+
+
+def get_year_bounds(year: int) -> Tuple[int, int]:
+    """
+    Returns the timestamp range [start, end) of a year in UTC
+    """
+    start = datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def sql_create_partition(year: int) -> str:
+    start, end = get_year_bounds(year)
+    return (
+        f'CREATE TABLE IF NOT EXISTS {get_partition_name(year)} '
+        f'PARTITION OF {TABLE_NAME} '
+        f'FOR VALUES FROM ({start}) TO ({end})'
+    )
+
+
+def sql_drop_partition(year: int) -> List[str]:
+    partition_name = get_partition_name(year)
+    return [
+        f'ALTER TABLE {TABLE_NAME} DETACH PARTITION {partition_name}',
+        f'DROP TABLE {partition_name}',
+    ]
+
+
+def sql_create_brin_index(pages_per_range: int = 32) -> str:
+    return (
+        f'CREATE INDEX IF NOT EXISTS {BRIN_INDEX_NAME} '
+        f'ON {TABLE_NAME} USING brin (timestamp) '
+        f'WITH (pages_per_range = {pages_per_range})'
+    )
+
+
+def sql_create_indexes() -> List[str]:
+    """
+    Creates the indexes of the model (Meta.indexes and db_index fields) on
+    the table, which on a partitioned table are also created on each of its
+    partitions
+    """
+    meta = SimpleMovingAverage._meta
+    indexes = [
+        (
+            index.name,
+            [
+                f'{meta.get_field(name).column} {order}'.strip()
+                for name, order in index.fields_orders
+            ],
+        )
+        for index in meta.indexes
+    ]
+    indexes += [
+        (f'{TABLE_NAME}_{field.column}_idx', [field.column])
+        for field in meta.fields
+        if field.db_index and not field.unique
+    ]
+    return [
+        f'CREATE INDEX IF NOT EXISTS {name} '
+        f'ON {TABLE_NAME} ({", ".join(columns)})'
+        for name, columns in indexes
+    ]
+
+
+def sql_convert_to_partitioned(years: List[int]) -> List[str]:
+    """
+    Rebuilds the indicator table as a table partitioned by year on the
+    timestamp column, moving the existing rows to the new partitions.
+
+    Postgres requires the partition key in every unique constraint, so the
+    primary key becomes (id, timestamp). LIKE does not copy the indexes of
+    the old table (nor could it, they do not include the partition key), so
+    the indexes of the model are created again once the old table and its
+    index names are dropped.
+    """
+    old_table_name = f'{TABLE_NAME}_old'
+    statements = [
+        f'ALTER TABLE {TABLE_NAME} RENAME TO {old_table_name}',
+        f'CREATE TABLE {TABLE_NAME} '
+        f'(LIKE {old_table_name} INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE (timestamp)',
+        f'ALTER TABLE {TABLE_NAME} '
+        f'ADD CONSTRAINT {TABLE_NAME}_partitioned_pkey '
+        f'PRIMARY KEY (id, timestamp)',
+        f'ALTER TABLE {TABLE_NAME} '
+        f'ADD CONSTRAINT {TABLE_NAME}_partitioned_uniq '
+        f'UNIQUE (timestamp, pair, precision)',
+        f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION_NAME} '
+        f'PARTITION OF {TABLE_NAME} DEFAULT',
+    ]
+    statements += [sql_create_partition(year) for year in years]
+    statements += [
+        f'INSERT INTO {TABLE_NAME} SELECT * FROM {old_table_name}',
+        f'DROP TABLE {old_table_name}',
+    ]
+    statements += sql_create_indexes()
+    return statements
+
+
+def is_postgresql(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def is_partitioned(using: str = 'default') -> bool:
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table pt '
+            'JOIN pg_class c ON c.oid = pt.partrelid '
+            'WHERE c.relname = %s',
+            [TABLE_NAME]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partition_years(using: str = 'default') -> List[int]:
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s',
+            [TABLE_NAME]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    years = [get_partition_year(name) for name in names]
+    return sorted(year for year in years if year is not None)
+
+
+def get_stored_years(using: str = 'default') -> List[int]:
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT MIN(timestamp), MAX(timestamp) FROM {TABLE_NAME}'
+        )
+        min_timestamp, max_timestamp = cursor.fetchone()
+
+    if min_timestamp is None:
+        return []
+
+    first_year = datetime.datetime.utcfromtimestamp(min_timestamp).year
+    last_year = datetime.datetime.utcfromtimestamp(max_timestamp).year
+    return list(range(first_year, last_year + 1))
+
+
+def execute_statements(statements: List[str], using: str = 'default'):
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
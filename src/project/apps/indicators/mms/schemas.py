@@ -1,41 +1,274 @@
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from django.utils import timezone
 
 from ninja import Schema
-from pydantic import Field, validator
+from pydantic import Field, errors, root_validator, validator
 
-from project.apps.indicators.mms.enum import RangeDaysEnum
+from project.apps.indicators.mms.enum import (
+    FormatEnum,
+    GranularityEnum,
+    RangeDaysEnum
+)
+from project.apps.indicators.mms.helpers import (
+    get_default_to_timestamp,
+    normalize_timestamp_range
+)
+from project.core.pagination import decode_cursor
+
+
+class RangeDaysList:
+    """
+    One or more ranges of days informed as comma-separated values, or "all"
+    """
+
+    def __init__(self, ranges: Iterable[RangeDaysEnum]):
+        self.ranges = sorted(set(ranges))
+
+    def __iter__(self) -> Iterator[RangeDaysEnum]:
+        return iter(self.ranges)
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    @property
+    def label(self) -> str:
+        return '-'.join(str(range_days.value) for range_days in self)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def __modify_schema__(cls, field_schema):
+        field_schema.update(
+            type='string',
+            example='20,50',
+            description='One or more of 20, 50 and 200 separated by commas, '
+                        'or "all".'
+        )
+
+    @classmethod
+    def validate(cls, value) -> 'RangeDaysList':
+        if str(value) == 'all':
+            return cls(RangeDaysEnum)
+
+        try:
+            return cls(
+                RangeDaysEnum(int(item))
+                for item in str(value).split(',')
+            )
+        except ValueError:
+            raise errors.EnumMemberError(enum_values=list(RangeDaysEnum))
+
+
+MAX_PAGE_LIMIT = 1000
+# Oldest start date of the queries, in days before today
+MAX_HISTORY_DAYS = 365
 
 
 class QueryFilter(Schema):
     from_timestamp: int = Field(alias='from')
     to_timestamp: int = Field(
         alias='to',
-        default=int(
-            (timezone.now() - timedelta(days=1)).replace(
-                hour=23,
-                minute=59,
-                second=59
-            ).timestamp()
-        )
+        default=None,
+        description='Defaults to the end of the previous day.'
     )
-    range: RangeDaysEnum
+    range: RangeDaysList
     precision: str = '1d'
+    granularity: GranularityEnum = GranularityEnum.DAY
+    format: FormatEnum = Field(
+        default=FormatEnum.JSON,
+        description='json (list of objects), ndjson (one object per line), '
+                    'columns (JSON with a list of values per field), msgpack '
+                    '(MessagePack with a list of values per field) or binary '
+                    '(rows of little-endian int64 timestamp and float64 '
+                    'averages).'
+    )
+    stream: bool = Field(
+        default=False,
+        description='Streams the rows as they are read from the database, '
+                    'without the response cache. Available for the json, '
+                    'ndjson and binary formats.'
+    )
+    limit: int = Field(
+        default=None,
+        ge=1,
+        le=MAX_PAGE_LIMIT,
+        description='Maximum number of items of the page. The cursor of the '
+                    'next page is returned in the X-Next-Cursor and Link '
+                    'headers.'
+    )
+    cursor: str = Field(
+        default=None,
+        description='Cursor of the page, returned by the previous one.'
+    )
 
     @validator('from_timestamp')
     def validate_from_datetime(cls, value):
         """
-        Ensures the start date is not earlier than 365 days
+        Ensures the start date is not earlier than MAX_HISTORY_DAYS days
         """
 
         now = timezone.now().date()
         date = datetime.utcfromtimestamp(value).date()
 
         diff_days = (now - date).days
-        if diff_days > 365:
-            raise ValueError('Start date cannot be longer than 365 days')
+        if diff_days > MAX_HISTORY_DAYS:
+            raise ValueError(
+                f'Start date cannot be longer than {MAX_HISTORY_DAYS} days'
+            )
+
+        return value
+
+    @validator('to_timestamp', pre=True, always=True)
+    def validate_to_datetime(cls, value):
+        """
+        Computes the default end date on each request
+        """
+
+        if value is None:
+            return get_default_to_timestamp()
+
+        return value
+
+    @validator('stream')
+    def validate_stream(cls, value, values):
+        """
+        Ensures the format can be written incrementally
+        """
+
+        output_format = values.get('format')
+        if value and output_format not in FormatEnum.get_streamable():
+            raise ValueError(
+                'Only the json, ndjson and binary formats can be streamed'
+            )
+
+        return value
+
+    @validator('limit')
+    def validate_limit(cls, value, values):
+        """
+        Ensures a streamed response is not paginated
+        """
+
+        if value is not None and values.get('stream'):
+            raise ValueError('A streamed response cannot be paginated')
+
+        return value
+
+    @validator('cursor')
+    def validate_cursor(cls, value, values):
+        """
+        Decodes the timestamp of the last item of the previous page
+        """
+
+        if value is None:
+            return value
+
+        if values.get('limit') is None:
+            raise ValueError('The cursor requires a limit')
+
+        return decode_cursor(value)
+
+    @root_validator(skip_on_failure=True)
+    def normalize_timestamps(cls, values):
+        """
+        Aligns the date range to the boundaries of the precision
+        """
+
+        values['from_timestamp'], values['to_timestamp'] = (
+            normalize_timestamp_range(
+                from_timestamp=values['from_timestamp'],
+                to_timestamp=values['to_timestamp'],
+                precision=values['precision'],
+            )
+        )
+        return values
+
+
+class PairList:
+    """
+    Pairs informed as comma-separated values, without repetitions
+    """
+
+    MAX_PAIRS = 20
+
+    def __init__(self, pairs: Iterable[str]):
+        self.pairs = list(dict.fromkeys(pairs))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.pairs)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def __modify_schema__(cls, field_schema):
+        field_schema.update(
+            type='string',
+            example='BRLBTC,BRLETH',
+            description='Pairs separated by commas.'
+        )
+
+    @classmethod
+    def validate(cls, value) -> 'PairList':
+        pairs = cls(item for item in str(value).split(',') if item)
+        if not pairs:
+            raise ValueError('At least one pair must be informed')
+
+        if len(pairs) > cls.MAX_PAIRS:
+            raise ValueError(
+                f'No more than {cls.MAX_PAIRS} pairs can be informed'
+            )
+
+        return pairs
+
+
+class BatchQueryFilter(QueryFilter):
+    pairs: PairList
+
+    @validator('format')
+    def validate_format(cls, value):
+        """
+        Ensures the format can be joined into a JSON object by pair
+        """
+
+        if value not in (FormatEnum.JSON, FormatEnum.COLUMNS):
+            raise ValueError('Only the json and columns formats are allowed')
+
+        return value
+
+    @validator('stream')
+    def validate_batch_stream(cls, value):
+        """
+        Ensures the pairs are not streamed
+        """
+
+        if value:
+            raise ValueError('Several pairs cannot be streamed')
+
+        return value
+
+    @validator('limit')
+    def validate_batch_limit(cls, value):
+        """
+        Ensures the pairs are not paginated
+        """
+
+        if value is not None:
+            raise ValueError('Several pairs cannot be paginated')
 
         return value
 
@@ -57,3 +290,17 @@ class IndicatorMmsResponseSchema(Schema):
             IndicatorMmsResponseSchema.from_dict(item)
             for item in items
         ]
+
+
+class IndicatorMmsRangesResponseSchema(Schema):
+    timestamp: int
+    mms_20: Optional[float]
+    mms_50: Optional[float]
+    mms_200: Optional[float]
+
+
+class IndicatorMmsLatestResponseSchema(Schema):
+    timestamp: int
+    mms_20: float
+    mms_50: float
+    mms_200: float
@@ -11,7 +11,7 @@ from project.apps.indicators.mms.helpers import (
     calculate_simple_moving_average_by_candles
 )
 from project.core.celery import app
-from project.core.locks import CacheLock, LockActiveError
+from project.core.locks import CacheLock, Lock, LockActiveError
 
 logger = structlog.get_logger()
 
@@ -28,7 +28,8 @@ def task_beat_select_pairs_to_mms(self):
     Generate calls to calculate simple moving average per pair.
 
     The cache lock is active for 24 hours, preventing the task from being
-    called more than once.
+    called more than once. It is kept after the task, so it is always held
+    in the cache whatever the LOCK_BACKEND.
     """
     datetime_started = timezone.now()
     precision = '1d'
@@ -125,8 +126,8 @@ def task_calculate_simple_moving_average(
     """
     Calculate simple moving average per pair.
 
-    The cache lock is only valid at runtime to prevent the same pair from
-    being processed at the same time.
+    The lock, of the LOCK_BACKEND of the settings, is only valid at runtime
+    to prevent the same pair from being processed at the same time.
     """
     datetime_started = datetime.datetime.fromisoformat(datetime_started)
 
@@ -151,9 +152,8 @@ def task_calculate_simple_moving_average(
             f'{datetime_started.date().isoformat()}'
         )
 
-        with CacheLock(
+        with Lock(
             key=cache_lock_key,
-            cache_alias='lock',
             expire=300,
             delete_on_exit=True,
         ):
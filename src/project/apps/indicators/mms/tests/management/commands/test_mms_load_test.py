@@ -0,0 +1,111 @@
+import socket
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import orjson
+import pytest
+from simple_settings import settings
+
+from project.apps.indicators.mms.models import SimpleMovingAverage
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommandMmsLoadTest:
+
+    @pytest.fixture()
+    def candles_port(self):
+        # A free port for the fake Candles API started by the command
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    @pytest.mark.parametrize('_keep_data,_count', [
+        (False, 0),
+        (True, 60),
+    ])
+    def test_should_validate_that_the_flow_runs_for_each_pair(
+        self,
+        tmp_path,
+        live_server,
+        candles_port,
+        _keep_data,
+        _count
+    ):
+        out = StringIO()
+        path = tmp_path / 'report.json'
+        configured_url = settings.SERVICES['candles']['url']
+        call_command(
+            'mms_load_test',
+            '--pairs=2',
+            '--concurrency=1',
+            '--requests=3',
+            '--history-days=30',
+            '--latency=0',
+            f'--base-url={live_server.url}',
+            f'--candles-port={candles_port}',
+            f'--json={path}',
+            *(['--keep-data'] if _keep_data else []),
+            stdout=out
+        )
+
+        report = orjson.loads(path.read_bytes())
+        assert {
+            name: (step['count'], step['errors'])
+            for name, step in report['steps'].items()
+        } == {
+            'beat': (2, {}),
+            'calculate': (2, {}),
+            'retrieve': (6, {}),
+        }
+        assert report['steps']['retrieve']['cache_status'] == {'MISS': 6}
+        assert report['base_url'] == live_server.url
+        assert report['candles_api']['url'] == (
+            f'http://127.0.0.1:{candles_port}/'
+        )
+        assert settings.SERVICES['candles']['url'] == configured_url
+        assert 'retrieve cache status' in out.getvalue()
+        assert SimpleMovingAverage.objects.filter(
+            pair__in=['LOAD00000', 'LOAD00001']
+        ).count() == _count
+
+    def test_should_validate_that_the_errors_of_the_candles_api_are_reported(  # noqa
+        self,
+        tmp_path,
+        live_server,
+        candles_port
+    ):
+        path = tmp_path / 'report.json'
+        with patch.dict(settings.SERVICES['candles'], {'max_retries': 1}):
+            call_command(
+                'mms_load_test',
+                '--pairs=1',
+                '--concurrency=1',
+                '--requests=1',
+                '--history-days=1',
+                '--latency=0',
+                '--error-rate=1',
+                f'--base-url={live_server.url}',
+                f'--candles-port={candles_port}',
+                f'--json={path}',
+                stdout=StringIO()
+            )
+
+        report = orjson.loads(path.read_bytes())
+        assert report['steps']['calculate']['errors'] == {
+            'ServiceCandleRequestClientException': 1
+        }
+
+    @pytest.mark.parametrize('_argument', [
+        '--history-days=0',
+        '--history-days=366',
+        '--ranges=30',
+    ])
+    def test_should_validate_that_the_requests_out_of_the_allowed_ranges_are_refused(  # noqa
+        self,
+        _argument
+    ):
+        with pytest.raises(CommandError, match='Error: argument'):
+            call_command('mms_load_test', _argument, stdout=StringIO())
@@ -0,0 +1,132 @@
+from unittest import mock
+from unittest.mock import call
+
+from django.core.management import call_command
+
+import pytest
+from freezegun import freeze_time
+
+from project.apps.indicators.mms import partitions
+
+
+@pytest.mark.django_db
+class TestCommandMmsPartitions:
+
+    @pytest.fixture()
+    def mock_logger(self):
+        with mock.patch(
+            'project.apps.indicators.mms.management.commands.'
+            'mms_partitions.logger'
+        ) as mock_logger:
+            yield mock_logger
+
+    @pytest.fixture()
+    def mock_partitions(self):
+        with mock.patch(
+            'project.apps.indicators.mms.management.commands.'
+            'mms_partitions.partitions',
+            wraps=partitions
+        ) as mock_partitions:
+            mock_partitions.is_postgresql.return_value = True
+            mock_partitions.execute_statements.return_value = None
+            yield mock_partitions
+
+    def test_should_validate_that_the_command_is_ignored_when_database_is_not_postgres(  # noqa
+        self,
+        mock_logger,
+    ):
+        call_command('mms_partitions')
+
+        mock_logger.error.assert_called_once_with(
+            'Partitioning is only supported on Postgres databases',
+            database='default',
+        )
+
+    def test_should_validate_that_setup_is_required_when_table_is_not_partitioned(  # noqa
+        self,
+        mock_logger,
+        mock_partitions,
+    ):
+        mock_partitions.is_partitioned.return_value = False
+
+        call_command('mms_partitions')
+
+        mock_partitions.execute_statements.assert_not_called()
+        mock_logger.error.assert_called_once_with(
+            'The indicator table is not partitioned, run the command with '
+            '--setup first',
+            database='default',
+        )
+
+    @freeze_time('2021-6-6 23:00')
+    def test_should_validate_the_conversion_of_the_table_on_setup(
+        self,
+        mock_logger,
+        mock_partitions,
+    ):
+        mock_partitions.is_partitioned.return_value = False
+        mock_partitions.get_stored_years.return_value = [2020]
+
+        call_command('mms_partitions', setup=True, brin=True)
+
+        statements = mock_partitions.execute_statements.call_args[0][0]
+        assert statements[0] == (
+            'ALTER TABLE ind_simplemovingaverage '
+            'RENAME TO ind_simplemovingaverage_old'
+        )
+        assert statements[-1].startswith(
+            'CREATE INDEX IF NOT EXISTS ind_simplemovingaverage_timestamp_brin'
+        )
+        assert (
+            'CREATE TABLE IF NOT EXISTS ind_simplemovingaverage_y2020 '
+            'PARTITION OF ind_simplemovingaverage '
+            'FOR VALUES FROM (1577836800) TO (1609459200)'
+        ) in statements
+        assert any('_y2022 ' in statement for statement in statements)
+
+    @freeze_time('2021-6-6 23:00')
+    def test_should_validate_the_rotation_of_the_partitions(
+        self,
+        mock_logger,
+        mock_partitions,
+    ):
+        mock_partitions.is_partitioned.return_value = True
+        mock_partitions.get_partition_years.return_value = [2018, 2019, 2021]
+
+        call_command('mms_partitions', years_ahead=2, retention_years=2)
+
+        mock_partitions.execute_statements.assert_called_once_with(
+            [
+                mock_partitions.sql_create_partition(2022),
+                mock_partitions.sql_create_partition(2023),
+                'ALTER TABLE ind_simplemovingaverage '
+                'DETACH PARTITION ind_simplemovingaverage_y2018',
+                'DROP TABLE ind_simplemovingaverage_y2018',
+            ],
+            'default'
+        )
+        mock_logger.info.assert_has_calls([
+            call(
+                'Simple moving average partitions successfully rotated',
+                database='default',
+                years_ahead=2,
+                retention_years=2,
+                dropped_years=[2018],
+                statements=4,
+            )
+        ])
+
+    def test_should_validate_the_log_message_when_an_exception_occurs(
+        self,
+        mock_logger,
+        mock_partitions,
+    ):
+        mock_partitions.is_partitioned.side_effect = Exception
+
+        call_command('mms_partitions')
+
+        mock_logger.error.assert_called_once_with(
+            'An error occurred while rotating the partitions',
+            database='default',
+            exc_info=True,
+        )
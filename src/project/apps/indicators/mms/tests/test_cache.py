@@ -0,0 +1,320 @@
+import struct
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.core.cache.backends.locmem import LocMemCache
+
+import msgpack
+import orjson
+import pytest
+
+from project.apps.indicators.mms.cache import (
+    RENDERERS,
+    bump_data_version,
+    get_cache_key,
+    get_data_version,
+    get_latest_values_async,
+    render_content,
+    set_latest_values
+)
+from project.apps.indicators.mms.enum import FormatEnum, RangeDaysEnum
+from project.core.caches import (
+    LocalLRUCache,
+    StaleWhileRevalidateCache,
+    pack_content
+)
+
+
+class TestCache:
+
+    @pytest.fixture
+    def mock_cache(self):
+        with patch(
+            'project.apps.indicators.mms.cache.cache',
+            LocMemCache('mms-cache-test', {})
+        ) as mock_cache:
+            yield mock_cache
+            mock_cache.clear()
+
+    @pytest.fixture
+    def local_cache(self):
+        local_cache = LocalLRUCache(max_size=1024)
+        with patch(
+            'project.apps.indicators.mms.cache.local_cache',
+            local_cache
+        ):
+            yield local_cache
+
+    def test_should_validate_that_the_version_is_bumped_per_pair_and_precision(  # noqa
+        self,
+        mock_cache
+    ):
+        with patch(
+            'project.apps.indicators.mms.cache.time.time_ns',
+            return_value=1_000_000_000
+        ):
+            assert get_data_version(pair='BRLBTC', precision='1d') == 1000000
+            assert bump_data_version(pair='BRLBTC', precision='1d') == 1000001
+            assert bump_data_version(pair='BRLBTC', precision='1d') == 1000002
+            assert get_data_version(pair='BRLBTC', precision='1d') == 1000002
+            assert get_data_version(pair='BRLETH', precision='1d') == 1000000
+
+    @pytest.mark.parametrize('_first_read', [True, False])
+    def test_should_validate_that_the_version_keeps_growing_after_the_cache_is_cleared(  # noqa
+        self,
+        mock_cache,
+        _first_read
+    ):
+        with patch(
+            'project.apps.indicators.mms.cache.time.time_ns',
+            return_value=1_000_000_000
+        ):
+            versions = [
+                bump_data_version(pair='BRLBTC', precision='1d')
+                for _ in range(3)
+            ]
+
+        mock_cache.clear()
+        with patch(
+            'project.apps.indicators.mms.cache.time.time_ns',
+            return_value=2_000_000_000
+        ):
+            version = (
+                get_data_version(pair='BRLBTC', precision='1d')
+                if _first_read
+                else bump_data_version(pair='BRLBTC', precision='1d')
+            )
+
+        assert version > max(versions)
+        assert get_data_version(pair='BRLBTC', precision='1d') == version
+
+    def test_should_validate_that_the_version_is_part_of_the_cache_key(self):
+        assert get_cache_key(
+            pair='BRLBTC',
+            precision='1d',
+            version=3,
+            range_days=20,
+            from_timestamp=1622851200,
+            to_timestamp=1623023999,
+            granularity='1d',
+            output_format='json',
+        ) == 'mms_retrieve_BRLBTC_1d_v3_20_1622851200_1623023999_1d_json'
+
+    def test_should_validate_the_rendered_content(self):
+        assert render_content(
+            [
+                (1622937599, Decimal('201108.2404745000')),
+                (1623023999, Decimal('258627.0329508000')),
+            ],
+            [RangeDaysEnum.TWENTY]
+        ) == (
+            b'[{"timestamp":1622937599,"mms":201108.2404745},'
+            b'{"timestamp":1623023999,"mms":258627.0329508}]'
+        )
+
+    @pytest.mark.parametrize('_format,_loads', [
+        (FormatEnum.COLUMNS, orjson.loads),
+        (FormatEnum.MSGPACK, msgpack.unpackb),
+    ])
+    def test_should_validate_the_rendered_content_by_column(
+        self,
+        _format,
+        _loads
+    ):
+        content = render_content(
+            [
+                (1622937599, Decimal('1.5'), Decimal('2.5')),
+                (1623023999, Decimal('3.5'), Decimal('4.5')),
+            ],
+            [RangeDaysEnum.TWENTY, RangeDaysEnum.TWO_HUNDRED],
+            _format
+        )
+
+        assert _loads(content) == {
+            'timestamp': [1622937599, 1623023999],
+            'mms_20': [1.5, 3.5],
+            'mms_200': [2.5, 4.5],
+        }
+
+    @pytest.mark.parametrize('_format', list(FormatEnum))
+    def test_should_validate_that_only_the_streamable_formats_can_be_streamed(  # noqa
+        self,
+        _format
+    ):
+        assert hasattr(RENDERERS[_format], 'stream_rows') is (
+            _format in FormatEnum.get_streamable()
+        )
+
+    def test_should_validate_the_rendered_binary_content(self):
+        content = render_content(
+            [
+                (1622937599, Decimal('1.5')),
+                (1623023999, Decimal('3.5')),
+            ],
+            [RangeDaysEnum.TWENTY],
+            FormatEnum.BINARY
+        )
+
+        assert list(struct.iter_unpack('<qd', content)) == [
+            (1622937599, 1.5),
+            (1623023999, 3.5),
+        ]
+
+    def test_should_validate_that_the_local_version_is_dropped_on_bump(
+        self,
+        mock_cache,
+        local_cache
+    ):
+        mock_cache.set('mms_version_BRLBTC_1d', 4)
+        assert get_data_version(pair='BRLBTC', precision='1d') == 4
+        mock_cache.set('mms_version_BRLBTC_1d', 5)
+        assert get_data_version(pair='BRLBTC', precision='1d') == 4
+
+        assert bump_data_version(pair='BRLBTC', precision='1d') == 6
+        assert get_data_version(pair='BRLBTC', precision='1d') == 6
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_latest_values_keep_the_newest_day(
+        self
+    ):
+        latest_cache = LocMemCache('mms-latest-cache-test', {})
+        with patch(
+            'project.core.caches.caches',
+            {'default': latest_cache}
+        ):
+            assert set_latest_values(
+                pair='BRLBTC',
+                precision='1d',
+                values={'timestamp': 1623023999, 'mms_20': Decimal('1.5')}
+            )
+            assert not set_latest_values(
+                pair='BRLBTC',
+                precision='1d',
+                values={'timestamp': 1622937599, 'mms_20': Decimal('2.5')}
+            )
+
+            assert await get_latest_values_async(
+                pair='BRLBTC',
+                precision='1d'
+            ) == {'timestamp': '1623023999', 'mms_20': '1.5'}
+            assert await get_latest_values_async(
+                pair='BRLETH',
+                precision='1d'
+            ) == {}
+
+        latest_cache.clear()
+
+
+class TestLocalLRUCache:
+
+    def test_should_validate_that_the_least_recently_used_entry_is_evicted(
+        self
+    ):
+        local_cache = LocalLRUCache(max_size=10)
+        local_cache.set('a', b'aaaa', 60)
+        local_cache.set('b', b'bbbb', 60)
+        local_cache.get('a')
+        local_cache.set('c', b'cccc', 60)
+
+        assert local_cache.get('a') == b'aaaa'
+        assert local_cache.get('b') is None
+        assert local_cache.get('c') == b'cccc'
+        assert local_cache.size == 8
+
+    def test_should_validate_that_values_larger_than_the_cap_are_skipped(
+        self
+    ):
+        local_cache = LocalLRUCache(max_size=2)
+        local_cache.set('a', b'aaaa', 60)
+
+        assert local_cache.get('a') is None
+        assert local_cache.size == 0
+
+    def test_should_validate_that_expired_entries_are_not_returned(self):
+        local_cache = LocalLRUCache(max_size=10)
+        local_cache.set('a', b'aaaa', 0)
+
+        assert local_cache.get('a') is None
+        assert local_cache.size == 0
+
+    def test_should_validate_that_the_shared_cache_is_skipped_on_local_hit(  # noqa
+        self
+    ):
+        shared_cache = LocMemCache('mms-shared-cache-test', {})
+        response_cache = StaleWhileRevalidateCache(
+            shared_cache,
+            lifetime=600,
+            stale_lifetime=3600,
+            local_cache=LocalLRUCache(max_size=1024),
+        )
+        shared_cache.set('key', pack_content(b'[]', 600))
+
+        assert response_cache.get('key') == (b'[]', False)
+        shared_cache.clear()
+        assert response_cache.get('key') == (b'[]', False)
+
+    def test_should_validate_that_a_stale_local_entry_is_read_again(self):
+        shared_cache = LocMemCache('mms-shared-cache-test', {})
+        response_cache = StaleWhileRevalidateCache(
+            shared_cache,
+            lifetime=600,
+            stale_lifetime=3600,
+            local_cache=LocalLRUCache(max_size=1024),
+        )
+        shared_cache.set('key', pack_content(b'[]', -1))
+        response_cache.get('key')
+        shared_cache.set('key', pack_content(b'[1]', 600))
+
+        assert response_cache.get('key') == (b'[1]', False)
+
+
+class TestStaleWhileRevalidateCache:
+
+    @pytest.fixture
+    def shared_cache(self):
+        shared_cache = LocMemCache('mms-stale-cache-test', {})
+        yield shared_cache
+        shared_cache.clear()
+
+    @pytest.fixture
+    def response_cache(self, shared_cache):
+        return StaleWhileRevalidateCache(
+            shared_cache,
+            lifetime=600,
+            stale_lifetime=3600,
+        )
+
+    def test_should_validate_that_the_batch_is_stale_error_when_the_refresh_fails(  # noqa
+        self,
+        shared_cache,
+        response_cache
+    ):
+        shared_cache.set('a', pack_content(b'[1]', 600))
+        shared_cache.set('b', pack_content(b'[2]', -1))
+
+        with patch('project.core.caches.logger') as mock_logger:
+            contents, status = response_cache.get_or_set_many(
+                ['a', 'b'],
+                refresh=Mock(side_effect=Exception)
+            )
+
+        assert contents == {'a': b'[1]', 'b': b'[2]'}
+        assert status == StaleWhileRevalidateCache.STALE_ERROR
+        mock_logger.warning.assert_called_once_with(
+            'Could not revalidate the cache, returning stale content',
+            keys=['b'],
+            exc_info=True,
+        )
+
+    def test_should_validate_that_the_batch_fails_when_a_missing_key_is_not_refreshed(  # noqa
+        self,
+        shared_cache,
+        response_cache
+    ):
+        shared_cache.set('a', pack_content(b'[1]', -1))
+
+        with pytest.raises(ValueError):
+            response_cache.get_or_set_many(
+                ['a', 'b'],
+                refresh=Mock(side_effect=ValueError)
+            )
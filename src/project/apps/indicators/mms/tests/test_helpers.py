@@ -1,16 +1,29 @@
 from decimal import Decimal
 
+from django.db import DatabaseError
+
 import pytest
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 from asynctest import patch
+from freezegun import freeze_time
+from model_bakery import baker
 
+from project.apps.indicators.mms.enum import GranularityEnum
 from project.apps.indicators.mms.exceptions import (
     CalculateMmsCountCandlesException
 )
 from project.apps.indicators.mms.helpers import (
-    calculate_simple_moving_average_by_candles
+    calculate_simple_moving_average_by_candles,
+    get_period_start,
+    normalize_timestamp_range,
+    refresh_simple_moving_average_cache,
+    save_simple_moving_average_database,
+    save_simple_moving_average_rollups
+)
+from project.apps.indicators.mms.models import (
+    SimpleMovingAverage,
+    SimpleMovingAverageRollup
 )
-from project.apps.indicators.mms.models import SimpleMovingAverage
 from project.services.candles.schemas import CandleSchema
 
 
@@ -91,3 +104,216 @@ class TestCalculateSimpleMovingAverageByCandles:
         assert values.mms_200 == Decimal('198499.9795800000')
         assert values.precision == '1d'
         assert values.pair == 'BRLBTC'
+
+    @pytest.mark.parametrize('_is_latest,_publish_count', [
+        (True, 1),
+        (False, 0),
+    ])
+    def test_should_validate_that_only_the_latest_day_is_published(
+        self,
+        _is_latest,
+        _publish_count
+    ):
+        with patch(
+            'project.apps.indicators.mms.helpers.set_latest_values',
+            return_value=_is_latest
+        ), patch(
+            'project.apps.indicators.mms.helpers.publish_latest_values'
+        ) as mock_publish:
+            async_to_sync(save_simple_moving_average_database)(
+                pair='BRLBTC',
+                precision='1d',
+                mms_20=Decimal('1.5'),
+                mms_50=Decimal('2.5'),
+                mms_200=Decimal('3.5'),
+                timestamp=1623023999,
+            )
+
+        assert mock_publish.call_count == _publish_count
+
+    def test_should_validate_that_the_day_is_not_saved_when_the_rollups_fail(  # noqa
+        self
+    ):
+        kwargs = {
+            'pair': 'BRLATOMIC',
+            'precision': '1d',
+            'mms_20': Decimal('1.5'),
+            'mms_50': Decimal('2.5'),
+            'mms_200': Decimal('3.5'),
+            'timestamp': 1623023999,
+        }
+
+        with patch(
+            'project.apps.indicators.mms.helpers.'
+            'save_simple_moving_average_rollups',
+            side_effect=DatabaseError
+        ), patch(
+            'project.apps.indicators.mms.helpers.'
+            'refresh_simple_moving_average_cache'
+        ) as mock_refresh, pytest.raises(DatabaseError):
+            async_to_sync(save_simple_moving_average_database)(**kwargs)
+
+        assert not SimpleMovingAverage.objects.filter(
+            pair='BRLATOMIC'
+        ).exists()
+        mock_refresh.assert_not_called()
+
+        # The retry of the task saves the day and its rollups
+        async_to_sync(save_simple_moving_average_database)(**kwargs)
+
+        assert SimpleMovingAverage.objects.filter(
+            pair='BRLATOMIC'
+        ).count() == 1
+        assert SimpleMovingAverageRollup.objects.filter(
+            pair='BRLATOMIC'
+        ).count() == 2
+
+
+@pytest.mark.django_db
+class TestSaveSimpleMovingAverageRollups:
+
+    @pytest.fixture
+    def clean_database(self):
+        SimpleMovingAverageRollup.objects.all().delete()
+
+    @pytest.mark.parametrize('granularity,period', [
+        (GranularityEnum.DAY, 1622851200),
+        (GranularityEnum.WEEK, 1622419200),
+        (GranularityEnum.MONTH, 1622505600),
+    ])
+    def test_should_validate_the_start_of_the_period(
+        self,
+        granularity,
+        period
+    ):
+        assert get_period_start(1622937599, granularity) == period
+
+    def test_should_validate_that_the_rollups_keep_the_most_recent_day(
+        self,
+        clean_database
+    ):
+        for timestamp, value in [
+            (1622851199, Decimal('1')),
+            (1622937599, Decimal('3')),
+            (1622764799, Decimal('2')),
+        ]:
+            save_simple_moving_average_rollups(
+                pair='BRLBTC',
+                precision='1d',
+                mms_20=value,
+                mms_50=value,
+                mms_200=value,
+                timestamp=timestamp,
+            )
+
+        rollups = SimpleMovingAverageRollup.objects.order_by(
+            'granularity'
+        ).values_list('granularity', 'period', 'timestamp', 'mms_20')
+        assert list(rollups) == [
+            ('1M', 1622505600, 1622937599, Decimal('3')),
+            ('1w', 1622419200, 1622937599, Decimal('3')),
+        ]
+
+
+class TestNormalizeTimestampRange:
+
+    @pytest.mark.parametrize('precision,timestamps,expected', [
+        ('1d', (1622862000, 1623034799), (1622851200, 1623023999)),
+        ('1d', (1622851200, 1623023999), (1622851200, 1623023999)),
+        ('1h', (1622862001, 1622865599), (1622862000, 1622865599)),
+        ('2d', (1622862000, 1623034799), (1622862000, 1623034799)),
+    ])
+    def test_should_validate_that_the_range_is_aligned_to_the_precision(
+        self,
+        precision,
+        timestamps,
+        expected
+    ):
+        assert normalize_timestamp_range(
+            from_timestamp=timestamps[0],
+            to_timestamp=timestamps[1],
+            precision=precision,
+        ) == expected
+
+
+@pytest.mark.django_db
+@freeze_time('2021-6-7 01:00')
+class TestRefreshSimpleMovingAverageCache:
+
+    @pytest.fixture
+    def mock_cache(self):
+        with patch(
+            'project.apps.indicators.mms.helpers.response_cache'
+        ) as mock_cache:
+            yield mock_cache
+
+    @pytest.fixture
+    def mock_bump_data_version(self):
+        with patch(
+            'project.apps.indicators.mms.helpers.bump_data_version',
+            return_value=4
+        ) as mock_bump_data_version:
+            yield mock_bump_data_version
+
+    @pytest.fixture
+    def clean_database(self):
+        SimpleMovingAverage.objects.all().delete()
+
+    def test_should_validate_that_the_most_requested_ranges_are_warmed(
+        self,
+        mock_cache,
+        mock_bump_data_version,
+        clean_database
+    ):
+        for timestamp in (1617235199, 1623023999):
+            baker.make(
+                'SimpleMovingAverage',
+                precision='1d',
+                pair='BRLBTC',
+                mms_20=Decimal('1.5'),
+                mms_50=Decimal('2.5'),
+                mms_200=Decimal('3.5'),
+                timestamp=timestamp
+            )
+
+        refresh_simple_moving_average_cache(
+            pair='BRLBTC',
+            precision='1d',
+            timestamp=1623023999,
+        )
+
+        mock_bump_data_version.assert_called_once_with(
+            pair='BRLBTC',
+            precision='1d'
+        )
+        contents = mock_cache.set_many.call_args[0][0]
+        assert len(contents) == 12
+        assert contents[
+            'mms_retrieve_BRLBTC_1d_v4_200_1620432000_1623023999_1d_json'
+        ] == b'[{"timestamp":1623023999,"mms":3.5}]'
+        assert contents[
+            'mms_retrieve_BRLBTC_1d_v4_50_1615248000_1623023999_1d_json'
+        ] == (
+            b'[{"timestamp":1617235199,"mms":2.5},'
+            b'{"timestamp":1623023999,"mms":2.5}]'
+        )
+        assert contents[
+            'mms_retrieve_BRLBTC_1d_v4_20-50-200_1620432000_1623023999_1d_json'
+        ] == (
+            b'[{"timestamp":1623023999,"mms_20":1.5,"mms_50":2.5,'
+            b'"mms_200":3.5}]'
+        )
+
+    def test_should_validate_that_past_days_only_invalidate_the_cache(
+        self,
+        mock_cache,
+        mock_bump_data_version,
+    ):
+        refresh_simple_moving_average_cache(
+            pair='BRLBTC',
+            precision='1d',
+            timestamp=1622937599,
+        )
+
+        mock_bump_data_version.assert_called_once()
+        mock_cache.set_many.assert_not_called()
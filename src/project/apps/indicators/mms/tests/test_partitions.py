@@ -0,0 +1,76 @@
+from django.db import connection
+
+import pytest
+
+from project.apps.indicators.mms.partitions import (
+    TABLE_NAME,
+    get_partition_name,
+    get_partition_year,
+    get_year_bounds,
+    sql_convert_to_partitioned,
+    sql_drop_partition
+)
+
+
+class TestPartitions:
+
+    def test_should_validate_the_timestamp_bounds_of_a_year(self):
+        assert get_year_bounds(2021) == (1609459200, 1640995200)
+
+    @pytest.mark.parametrize('name,year', [
+        ('ind_simplemovingaverage_y2021', 2021),
+        ('ind_simplemovingaverage_default', None),
+        ('ind_simplemovingaverage_old', None),
+    ])
+    def test_should_validate_the_year_extracted_from_the_partition_name(
+        self,
+        name,
+        year
+    ):
+        assert get_partition_year(name) == year
+
+    def test_should_validate_that_partitions_are_detached_before_drop(self):
+        assert get_partition_name(2021) == 'ind_simplemovingaverage_y2021'
+        assert sql_drop_partition(2021) == [
+            'ALTER TABLE ind_simplemovingaverage '
+            'DETACH PARTITION ind_simplemovingaverage_y2021',
+            'DROP TABLE ind_simplemovingaverage_y2021',
+        ]
+
+    def test_should_validate_that_the_conversion_creates_the_indexes_again(
+        self
+    ):
+        statements = sql_convert_to_partitioned([2021])
+
+        assert statements.index(
+            'DROP TABLE ind_simplemovingaverage_old'
+        ) < statements.index(
+            'CREATE INDEX IF NOT EXISTS ind_sma_pair_precision_ts_idx '
+            'ON ind_simplemovingaverage (pair, precision, timestamp)'
+        )
+
+    @pytest.mark.django_db
+    def test_should_validate_that_every_index_of_the_schema_is_created_again(  # noqa
+        self
+    ):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor,
+                TABLE_NAME
+            )
+
+        indexes = {
+            name: constraint['columns']
+            for name, constraint in constraints.items()
+            if constraint['index'] and not (
+                constraint['unique'] or constraint['primary_key']
+            )
+        }
+        statements = sql_convert_to_partitioned([2021])
+
+        assert indexes
+        for name, columns in indexes.items():
+            assert (
+                f'CREATE INDEX IF NOT EXISTS {name} '
+                f'ON {TABLE_NAME} ({", ".join(columns)})'
+            ) in statements
@@ -50,7 +50,7 @@ class TestTaskCalculateSimpleMovingAverage:
 
     @pytest.fixture
     def mock_cache_lock(self):
-        with mock.patch('project.apps.indicators.mms.tasks.CacheLock') as lock:
+        with mock.patch('project.apps.indicators.mms.tasks.Lock') as lock:
             yield lock
 
     def test_should_validate_if_a_task_was_successfully_executed(
@@ -76,7 +76,6 @@ class TestTaskCalculateSimpleMovingAverage:
         )
         mock_cache_lock.assert_called_once_with(
             key='task_calculate_simple_moving_average:BRLBTC-1d-2021-06-06',
-            cache_alias='lock',
             expire=300,
             delete_on_exit=True
         )
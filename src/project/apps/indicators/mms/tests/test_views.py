@@ -1,13 +1,34 @@
+import struct
 from decimal import Decimal
 from http import HTTPStatus
-from unittest.mock import patch
+from unittest.mock import ANY, AsyncMock, call, patch
 from urllib.parse import urlencode
 
+from django.test import AsyncClient, override_settings
+
 import pytest
+from asgiref.sync import sync_to_async
+from freezegun import freeze_time
 from model_bakery import baker
+from simple_settings import settings
+
+from project.apps.indicators.mms.models import SimpleMovingAverageRollup
+from project.core.caches import pack_content
+from project.core.renderers import get_etag
+
+
+@pytest.fixture(autouse=True)
+def mock_new_data_version():
+    # The version seeded when the cache has none, 0 in the cache keys below
+    with patch(
+        'project.apps.indicators.mms.cache._new_data_version',
+        return_value=0
+    ) as mock_new_data_version:
+        yield mock_new_data_version
 
 
 @pytest.mark.django_db
+@freeze_time('2021-6-7 12:00')
 class TestRetrieveIndicatorMmsView:
 
     @pytest.fixture()
@@ -19,13 +40,18 @@ class TestRetrieveIndicatorMmsView:
             mms_20=Decimal('201108.2404745000'),
             mms_50=Decimal('258627.0329508000'),
             mms_200=Decimal('229149.8719421000'),
-            timestamp=1623034799
+            timestamp=1623023999
         )
 
+    @pytest.fixture
+    def clean_database(self):
+        SimpleMovingAverageRollup.objects.all().delete()
+
     @pytest.fixture
     def mock_cache(self):
         with patch(
-            'project.apps.indicators.mms.views.cache'
+            'project.apps.indicators.mms.views.async_response_cache.cache',
+            new_callable=AsyncMock
         ) as mock_cache:
             yield mock_cache
 
@@ -56,16 +82,559 @@ class TestRetrieveIndicatorMmsView:
         data = response.json()
 
         assert response.status_code == HTTPStatus.OK
-        assert data == [{'timestamp': 1623034799, 'mms': _mms}]
+        assert data == [{'timestamp': 1623023999, 'mms': _mms}]
         mock_cache.get.assert_called_once_with(
-            f'mms_retrieve_BRLBTC_1d_{_range}_1622862000_1623034799'
+            f'mms_retrieve_BRLBTC_1d_v0_{_range}_1622851200_1623023999_1d_json'
         )
         mock_cache.set.assert_called_once_with(
-            key=f'mms_retrieve_BRLBTC_1d_{_range}_1622862000_1623034799',
-            value=[
-                {'mms': Decimal(f'{_mms}'), 'timestamp': 1623034799}
-            ],
-            timeout=600
+            key=(
+                f'mms_retrieve_BRLBTC_1d_v0_{_range}_'
+                '1622851200_1623023999_1d_json'
+            ),
+            value=pack_content(
+                b'[{"timestamp":1623023999,"mms":%s}]' % str(_mms).encode(),
+                600
+            ),
+            timeout=4200
+        )
+        assert response['X-Cache-Status'] == 'MISS'
+
+    @pytest.mark.parametrize('_range,_key,_body', [
+        (
+            'all',
+            '20-50-200',
+            [{
+                'timestamp': 1623023999,
+                'mms_20': 201108.2404745,
+                'mms_50': 258627.0329508,
+                'mms_200': 229149.8719421,
+            }]
+        ),
+        (
+            '200,20',
+            '20-200',
+            [{
+                'timestamp': 1623023999,
+                'mms_20': 201108.2404745,
+                'mms_200': 229149.8719421,
+            }]
+        ),
+    ])
+    def test_should_validate_that_several_ranges_are_returned_in_one_response(  # noqa
+        self,
+        client,
+        simple_moving_average,
+        mock_cache,
+        _range,
+        _key,
+        _body
+    ):
+        mock_cache.get.return_value = None
+        query_string = urlencode({'from': 1622862000, 'range': _range})
+        path = f'/v1/indicators/BRLBTC/mms?{query_string}'
+
+        response = client.get(path)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == _body
+        mock_cache.get.assert_called_once_with(
+            f'mms_retrieve_BRLBTC_1d_v0_{_key}_1622851200_1623023999_1d_json'
+        )
+
+    def test_should_validate_that_the_cached_content_is_returned_on_cache_hit(  # noqa
+        self,
+        client,
+        mock_cache,
+    ):
+        mock_cache.get.return_value = pack_content(
+            b'[{"timestamp":1623034799,"mms":201108.2404745}]',
+            600
+        )
+        params = {
+            'from': 1622862000,
+            'to': 1623034799,
+            'range': 20,
+        }
+        query_string = urlencode(params)
+        path = f'/v1/indicators/BRLBTC/mms?{query_string}'
+
+        with patch(
+            'project.apps.indicators.mms.views.'
+            'get_simple_moving_average_variations'
+        ) as mock_helper:
+            response = client.get(path)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == 'application/json; charset=utf-8'
+        assert response['X-Cache-Status'] == 'HIT'
+        assert response.content == (
+            b'[{"timestamp":1623034799,"mms":201108.2404745}]'
+        )
+        mock_helper.assert_not_called()
+        mock_cache.set.assert_not_called()
+
+    @pytest.mark.parametrize('_format,_content_type', [
+        ('columns', 'application/json; charset=utf-8'),
+        ('msgpack', 'application/msgpack'),
+        ('binary', 'application/octet-stream'),
+    ])
+    def test_should_validate_the_content_type_of_each_format(
+        self,
+        client,
+        simple_moving_average,
+        mock_cache,
+        _format,
+        _content_type
+    ):
+        mock_cache.get.return_value = None
+        query_string = urlencode({
+            'from': 1622862000,
+            'range': '20,50',
+            'format': _format,
+        })
+
+        response = client.get(
+            f'/v1/indicators/BRLBTC/mms?{query_string}',
+            HTTP_ORIGIN='https://example.com'
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == _content_type
+        assert {'X-Cache-Status', 'X-Columns'} <= set(
+            response['Access-Control-Expose-Headers'].split(', ')
+        )
+        mock_cache.get.assert_called_once_with(
+            'mms_retrieve_BRLBTC_1d_v0_20-50_1622851200_1623023999_1d_'
+            f'{_format}'
+        )
+        if _format == 'binary':
+            assert response['X-Columns'] == 'timestamp,mms_20,mms_50'
+            assert list(struct.iter_unpack('<qdd', response.content)) == [
+                (1623023999, 201108.2404745, 258627.0329508)
+            ]
+
+    @pytest.mark.parametrize('_format,_content', [
+        (
+            'json',
+            b'[{"timestamp":1623023999,"mms":201108.2404745},'
+            b'{"timestamp":1623110399,"mms":201108.2404745}]'
+        ),
+        (
+            'ndjson',
+            b'{"timestamp":1623023999,"mms":201108.2404745}\n'
+            b'{"timestamp":1623110399,"mms":201108.2404745}\n'
+        ),
+        (
+            'binary',
+            struct.pack('<qd', 1623023999, 201108.2404745) +
+            struct.pack('<qd', 1623110399, 201108.2404745)
+        ),
+    ])
+    def test_should_validate_that_the_rows_are_streamed_in_chunks(
+        self,
+        client,
+        simple_moving_average,
+        mock_cache,
+        _format,
+        _content
+    ):
+        baker.make(
+            'SimpleMovingAverage',
+            precision='1d',
+            pair='BRLBTC',
+            mms_20=Decimal('201108.2404745000'),
+            mms_50=Decimal('258627.0329508000'),
+            mms_200=Decimal('229149.8719421000'),
+            timestamp=1623110399
+        )
+        query_string = urlencode({
+            'from': 1622862000,
+            'to': 1623110399,
+            'range': 20,
+            'format': _format,
+            'stream': True,
+        })
+
+        with patch.dict(
+            'project.apps.indicators.mms.views.settings.STREAM_CHUNK_SIZE',
+            {'mms_retrieve': 1}
+        ):
+            response = client.get(
+                f'/v1/indicators/BRLBTC/mms?{query_string}'
+            )
+            parts = list(response.streaming_content)
+
+        assert response.status_code == HTTPStatus.OK
+        assert b''.join(parts) == _content
+        assert len(parts) >= 2
+        assert response['ETag']
+        mock_cache.get.assert_not_called()
+
+    @pytest.mark.parametrize('_format', ['columns', 'msgpack'])
+    def test_should_validate_status_code_and_body_when_the_format_cannot_be_streamed(  # noqa
+        self,
+        client,
+        _format
+    ):
+        query_string = urlencode({
+            'from': 1622862000,
+            'range': 20,
+            'format': _format,
+            'stream': True,
+        })
+
+        response = client.get(f'/v1/indicators/BRLBTC/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json() == {
+            'detail': [
+                {'loc': ['query', 'stream'], 'msg': 'Only the json, ndjson and binary formats can be streamed', 'type': 'value_error'}  # noqa
+            ]
+        }
+
+    def test_should_validate_that_the_pages_are_followed_by_the_cursor(
+        self,
+        client,
+        simple_moving_average,
+        mock_cache
+    ):
+        for timestamp in (1622937599, 1623110399):
+            baker.make(
+                'SimpleMovingAverage',
+                precision='1d',
+                pair='BRLBTC',
+                mms_20=Decimal('1.5'),
+                mms_50=Decimal('2.5'),
+                mms_200=Decimal('3.5'),
+                timestamp=timestamp
+            )
+        query_string = urlencode({
+            'from': 1622862000,
+            'to': 1623110399,
+            'range': 20,
+            'limit': 2,
+        })
+
+        response = client.get(
+            f'/v1/indicators/BRLBTC/mms?{query_string}',
+            HTTP_ORIGIN='https://example.com'
+        )
+        cursor = response['X-Next-Cursor']
+
+        assert response.status_code == HTTPStatus.OK
+        assert {'ETag', 'Link', 'X-Next-Cursor'} <= set(
+            response['Access-Control-Expose-Headers'].split(', ')
+        )
+        assert response.json() == [
+            {'timestamp': 1622937599, 'mms': 1.5},
+            {'timestamp': 1623023999, 'mms': 201108.2404745},
+        ]
+        assert response['Link'] == (
+            f'<http://testserver/v1/indicators/BRLBTC/mms?{query_string}'
+            f'&cursor={cursor}>; rel="next"'
+        )
+
+        response = client.get(
+            f'/v1/indicators/BRLBTC/mms?{query_string}&cursor={cursor}'
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [{'timestamp': 1623110399, 'mms': 1.5}]
+        assert 'X-Next-Cursor' not in response
+        assert 'Link' not in response
+        mock_cache.get.assert_not_called()
+
+    @pytest.mark.parametrize('_params,_loc,_msg', [
+        ({'cursor': 'MTYyMjkzNzU5OQ'}, 'cursor', 'The cursor requires a limit'),  # noqa
+        ({'limit': 2, 'cursor': '!'}, 'cursor', 'Invalid cursor'),
+        ({'limit': 2, 'stream': True}, 'limit', 'A streamed response cannot be paginated'),  # noqa
+    ])
+    def test_should_validate_status_code_and_body_when_the_page_is_invalid(
+        self,
+        client,
+        _params,
+        _loc,
+        _msg
+    ):
+        query_string = urlencode({'from': 1622862000, 'range': 20, **_params})
+
+        response = client.get(f'/v1/indicators/BRLBTC/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json() == {
+            'detail': [
+                {'loc': ['query', _loc], 'msg': _msg, 'type': 'value_error'}
+            ]
+        }
+
+    @pytest.mark.parametrize('_to,_cache_control', [
+        (1623034799, 'public, max-age=60'),
+        (1622937599, 'public, max-age=86400'),
+    ])
+    def test_should_validate_the_cache_headers_of_the_response(
+        self,
+        client,
+        mock_cache,
+        _to,
+        _cache_control
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+        query_string = urlencode({'from': 1622862000, 'to': _to, 'range': 20})
+
+        response = client.get(f'/v1/indicators/BRLBTC/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['Cache-Control'] == _cache_control
+        assert response['ETag'] == get_etag(
+            mock_cache.get.call_args[0][0]
+        )
+
+    @pytest.mark.parametrize('_if_none_match', [
+        '{etag}',
+        'W/{etag}',
+        '"other", {etag}',
+        '*',
+    ])
+    def test_should_validate_that_not_modified_is_returned_when_the_etag_matches(  # noqa
+        self,
+        client,
+        mock_cache,
+        _if_none_match
+    ):
+        etag = get_etag(
+            'mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623023999_1d_json'
+        )
+        path = '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+
+        response = client.get(
+            path,
+            HTTP_IF_NONE_MATCH=_if_none_match.format(etag=etag)
+        )
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.content == b''
+        assert response['ETag'] == etag
+        assert response['Cache-Control'] == 'public, max-age=60'
+        mock_cache.get.assert_not_called()
+
+    def test_should_validate_that_the_content_is_returned_when_the_etag_is_outdated(  # noqa
+        self,
+        client,
+        mock_cache
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+        etag = get_etag(
+            'mms_retrieve_BRLBTC_1d_v1_20_1622851200_1623023999_1d_json'
+        )
+        path = '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+
+        response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.content == b'[]'
+        assert response['ETag'] != etag
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_cached_content_is_returned_in_an_async_request(  # noqa
+        self,
+        async_client,
+        mock_cache,
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+
+        with patch(
+            'project.apps.indicators.mms.views.'
+            'get_simple_moving_average_variations'
+        ) as mock_helper:
+            response = await async_client.get(
+                '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'HIT'
+        assert response['X-API-Version']
+        assert response.content == b'[]'
+        mock_helper.assert_not_called()
+
+    @pytest.mark.parametrize('_admin_enabled,_hops', [
+        (False, 0),
+        (True, 8),
+    ])
+    @pytest.mark.asyncio
+    async def test_should_validate_the_sync_thread_hops_of_the_middlewares_in_an_async_request(  # noqa
+        self,
+        mock_cache,
+        _admin_enabled,
+        _hops,
+    ):
+        """
+        The middlewares of Django's MiddlewareMixin (and the process_view
+        hooks) run their hooks in the sync thread on async requests
+        """
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+        middleware = [
+            path for path in settings.MIDDLEWARE
+            if _admin_enabled or path not in settings.ADMIN_MIDDLEWARE
+        ]
+
+        with override_settings(MIDDLEWARE=middleware), patch(
+            'django.utils.deprecation.sync_to_async',
+            side_effect=sync_to_async
+        ) as mock_mixin_hop, patch(
+            'django.core.handlers.base.sync_to_async',
+            side_effect=sync_to_async
+        ) as mock_handler_hop:
+            response = await AsyncClient().get(
+                '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'HIT'
+        assert mock_mixin_hop.call_count + mock_handler_hop.call_count == (
+            _hops
+        )
+
+    def test_should_validate_that_stale_content_is_returned_when_the_database_fails(  # noqa
+        self,
+        client,
+        mock_cache,
+    ):
+        mock_cache.get.return_value = pack_content(
+            b'[{"timestamp":1623023999,"mms":201108.2404745}]',
+            -1
+        )
+        path = '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+
+        with patch(
+            'project.apps.indicators.mms.views.'
+            'get_simple_moving_average_variations',
+            side_effect=Exception
+        ) as mock_helper, patch('project.core.caches.logger') as mock_logger:
+            response = client.get(path)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'STALE_ERROR'
+        assert response.content == (
+            b'[{"timestamp":1623023999,"mms":201108.2404745}]'
+        )
+        mock_helper.assert_called_once()
+        mock_cache.set.assert_not_called()
+        mock_logger.warning.assert_called_once_with(
+            'Could not revalidate the cache, returning stale content',
+            key='mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623023999_1d_json',
+            exc_info=True,
+        )
+
+    def test_should_validate_that_only_the_lock_owner_revalidates_stale_content(  # noqa
+        self,
+        client,
+        mock_cache,
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', -1)
+        path = '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+
+        with patch('project.core.caches.AsyncCacheLock') as mock_lock, patch(
+            'project.apps.indicators.mms.views.'
+            'get_simple_moving_average_variations'
+        ) as mock_helper:
+            mock_lock.return_value.__aenter__.return_value.active = False
+            response = client.get(path)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'STALE'
+        assert response.content == b'[]'
+        mock_lock.assert_called_once_with(
+            key='mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623023999_1d_json_'
+                'revalidate',
+            cache=ANY,
+            expire=10,
+            raise_exception=False,
+            name='cache_revalidate',
+        )
+        mock_helper.assert_not_called()
+
+    @pytest.mark.parametrize('_from,_to', [
+        (1622862000, 1623034799),
+        (1622851200, 1623023999),
+        (1622937599, 1623030000),
+    ])
+    def test_should_validate_that_requests_for_the_same_days_share_the_cache_key(  # noqa
+        self,
+        client,
+        mock_cache,
+        _from,
+        _to
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+        query_string = urlencode({'from': _from, 'to': _to, 'range': 20})
+
+        response = client.get(f'/v1/indicators/BRLBTC/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        mock_cache.get.assert_called_once_with(
+            'mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623023999_1d_json'
+        )
+
+    def test_should_validate_that_the_default_end_date_is_computed_per_request(  # noqa
+        self,
+        client,
+        mock_cache,
+    ):
+        mock_cache.get.return_value = pack_content(b'[]', 600)
+        path = '/v1/indicators/BRLBTC/mms?from=1622862000&range=20'
+
+        client.get(path)
+        with freeze_time('2021-6-8 00:01'):
+            client.get(path)
+
+        mock_cache.get.assert_has_calls([
+            call('mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623023999_1d_json'),
+            call('mms_retrieve_BRLBTC_1d_v0_20_1622851200_1623110399_1d_json'),
+        ])
+
+    @pytest.mark.parametrize('_granularity,_timestamp', [
+        ('1w', 1623023999),
+        ('1M', 1623023999),
+    ])
+    def test_should_validate_that_rollups_are_returned_when_granularity_is_informed(  # noqa
+        self,
+        client,
+        simple_moving_average,
+        mock_cache,
+        clean_database,
+        _granularity,
+        _timestamp
+    ):
+        mock_cache.get.return_value = None
+        baker.make(
+            'SimpleMovingAverageRollup',
+            precision='1d',
+            pair='BRLBTC',
+            granularity=_granularity,
+            period=1622419200,
+            mms_20=Decimal('201108.2404745000'),
+            mms_50=Decimal('258627.0329508000'),
+            mms_200=Decimal('229149.8719421000'),
+            timestamp=_timestamp
+        )
+        params = {
+            'from': 1622419200,
+            'to': 1623034799,
+            'range': 20,
+            'granularity': _granularity
+        }
+        query_string = urlencode(params)
+        path = f'/v1/indicators/BRLBTC/mms?{query_string}'
+
+        response = client.get(path)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [
+            {'timestamp': _timestamp, 'mms': 201108.2404745}
+        ]
+        mock_cache.get.assert_called_once_with(
+            'mms_retrieve_BRLBTC_1d_v0_20_1622419200_1623023999_'
+            f'{_granularity}_json'
         )
 
     @patch(
@@ -120,6 +689,21 @@ class TestRetrieveIndicatorMmsView:
             ]
         }
 
+    def test_should_validate_status_code_and_body_when_one_of_the_ranges_is_invalid(  # noqa
+        self,
+        client
+    ):
+        response = client.get(
+            '/v1/indicators/BRLBTC/mms?from=1622862000&range=20,30'
+        )
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json() == {
+            'detail': [
+                {'loc': ['query', 'range'], 'msg': 'value is not a valid enumeration member; permitted: 20, 50, 200', 'type': 'type_error.enum', 'ctx': {'enum_values': [20, 50, 200]}}  # noqa
+            ]
+        }
+
     def test_should_validate_status_code_and_body_when_query_params_is_required(  # noqa
         self,
         client,
@@ -172,3 +756,306 @@ class TestRetrieveIndicatorMmsView:
                 {'loc': ['query', 'from'], 'msg': 'Start date cannot be longer than 365 days', 'type': 'value_error'}  # noqa
             ]
         }
+
+
+@pytest.mark.django_db
+class TestRetrieveLatestIndicatorMmsView:
+
+    @pytest.fixture
+    def mock_get_latest_values(self):
+        with patch(
+            'project.apps.indicators.mms.views.get_latest_values_async',
+            new_callable=AsyncMock,
+            return_value={}
+        ) as mock_get_latest_values:
+            yield mock_get_latest_values
+
+    def test_should_validate_that_the_stored_values_are_returned(
+        self,
+        client,
+        mock_get_latest_values
+    ):
+        mock_get_latest_values.return_value = {
+            'timestamp': '1623023999',
+            'mms_20': '201108.2404745000',
+            'mms_50': '258627.0329508000',
+            'mms_200': '229149.8719421000',
+        }
+
+        response = client.get('/v1/indicators/BRLBTC/mms/latest')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'HIT'
+        assert response.json() == {
+            'timestamp': 1623023999,
+            'mms_20': 201108.2404745,
+            'mms_50': 258627.0329508,
+            'mms_200': 229149.8719421,
+        }
+        mock_get_latest_values.assert_awaited_once_with(
+            pair='BRLBTC',
+            precision='1d'
+        )
+
+    def test_should_validate_that_the_database_is_read_when_nothing_is_stored(  # noqa
+        self,
+        client,
+        mock_get_latest_values
+    ):
+        for timestamp, value in [
+            (1623023999, Decimal('2.5')),
+            (1622937599, Decimal('1.5')),
+        ]:
+            baker.make(
+                'SimpleMovingAverage',
+                precision='1d',
+                pair='BRLBTC',
+                mms_20=value,
+                mms_50=value,
+                mms_200=value,
+                timestamp=timestamp
+            )
+
+        with patch(
+            'project.apps.indicators.mms.helpers.set_latest_values'
+        ) as mock_set_latest_values:
+            response = client.get('/v1/indicators/BRLBTC/mms/latest')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'MISS'
+        assert response.json() == {
+            'timestamp': 1623023999,
+            'mms_20': 2.5,
+            'mms_50': 2.5,
+            'mms_200': 2.5,
+        }
+        mock_set_latest_values.assert_called_once_with(
+            pair='BRLBTC',
+            precision='1d',
+            values={
+                'timestamp': 1623023999,
+                'mms_20': Decimal('2.5'),
+                'mms_50': Decimal('2.5'),
+                'mms_200': Decimal('2.5'),
+            }
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_events_are_sent_after_the_latest_values(  # noqa
+        self,
+        async_client,
+        mock_get_latest_values
+    ):
+        mock_get_latest_values.return_value = {
+            'timestamp': '1622937599',
+            'mms_20': '1.5',
+            'mms_50': '2.5',
+            'mms_200': '3.5',
+        }
+        subscription = AsyncMock()
+        subscription.get_message.side_effect = [None, b'{"timestamp":1}']
+
+        with patch(
+            'project.apps.indicators.mms.views.subscribe_latest_values'
+        ) as mock_subscribe:
+            mock_subscribe.return_value.__aenter__.return_value = subscription
+            response = await async_client.get(
+                '/v1/indicators/BRLBTC/mms/events'
+            )
+            content = response.aiter_content()
+            parts = [await content.__anext__() for _ in range(3)]
+            await content.aclose()
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'] == 'text/event-stream'
+        assert parts == [
+            b'event: mms\ndata: {"timestamp":1622937599,"mms_20":1.5,'
+            b'"mms_50":2.5,"mms_200":3.5}\n\n',
+            b': heartbeat\n\n',
+            b'event: mms\ndata: {"timestamp":1}\n\n',
+        ]
+        mock_subscribe.assert_called_once_with(pair='BRLBTC', precision='1d')
+        mock_subscribe.return_value.__aexit__.assert_awaited_once()
+
+    def test_should_validate_status_code_and_body_when_nothing_was_calculated(  # noqa
+        self,
+        client,
+        mock_get_latest_values
+    ):
+        response = client.get('/v1/indicators/BRLETH/mms/latest')
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert response.json() == {
+            'detail': 'No simple moving average was calculated for the pair.'
+        }
+
+
+@pytest.mark.django_db
+@freeze_time('2021-6-7 12:00')
+class TestRetrieveBatchIndicatorMmsView:
+
+    @pytest.fixture
+    def simple_moving_averages(self):
+        for pair, mms in [('BRLBTC', '201108.2404745'), ('BRLETH', '1.5')]:
+            baker.make(
+                'SimpleMovingAverage',
+                precision='1d',
+                pair=pair,
+                mms_20=Decimal(mms),
+                mms_50=Decimal(mms),
+                mms_200=Decimal(mms),
+                timestamp=1623023999
+            )
+
+    @pytest.fixture
+    def mock_cache(self):
+        with patch(
+            'project.apps.indicators.mms.views.response_cache.cache'
+        ) as mock_cache:
+            mock_cache.get_many.return_value = {}
+            yield mock_cache
+
+    def test_should_validate_that_the_pairs_are_returned_by_pair(
+        self,
+        client,
+        simple_moving_averages,
+        mock_cache
+    ):
+        query_string = urlencode({
+            'pairs': 'BRLBTC,BRLETH,BRLXRP',
+            'from': 1622862000,
+            'range': 20,
+        })
+
+        response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'MISS'
+        assert response.json() == {
+            'BRLBTC': [{'timestamp': 1623023999, 'mms': 201108.2404745}],
+            'BRLETH': [{'timestamp': 1623023999, 'mms': 1.5}],
+            'BRLXRP': [],
+        }
+        mock_cache.get_many.assert_called_once_with([
+            f'mms_retrieve_{pair}_1d_v0_20_1622851200_1623023999_1d_json'
+            for pair in ('BRLBTC', 'BRLETH', 'BRLXRP')
+        ])
+        assert len(mock_cache.set_many.call_args[0][0]) == 3
+
+    def test_should_validate_that_only_the_missing_pairs_are_queried(
+        self,
+        client,
+        mock_cache
+    ):
+        mock_cache.get_many.return_value = {
+            'mms_retrieve_BRLBTC_1d_v0_20-50_1622851200_1623023999_1d_json': (
+                pack_content(b'[]', 600)
+            ),
+        }
+        query_string = urlencode({
+            'pairs': 'BRLBTC,BRLETH',
+            'from': 1622862000,
+            'range': '20,50',
+        })
+
+        with patch(
+            'project.apps.indicators.mms.views.'
+            'get_simple_moving_average_variations_by_pairs'
+        ) as mock_helper:
+            mock_helper.return_value.values_list.return_value = [
+                ('BRLETH', 1623023999, Decimal('1.5'), Decimal('2.5')),
+            ]
+            response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            'BRLBTC': [],
+            'BRLETH': [
+                {'timestamp': 1623023999, 'mms_20': 1.5, 'mms_50': 2.5}
+            ],
+        }
+        assert mock_helper.call_args[1]['pairs'] == ['BRLETH']
+
+    def test_should_validate_that_all_pairs_are_cached(
+        self,
+        client,
+        mock_cache
+    ):
+        mock_cache.get_many.return_value = {
+            f'mms_retrieve_{pair}_1d_v0_20_1622851200_1623023999_1d_json': (
+                pack_content(b'[]', 600)
+            )
+            for pair in ('BRLBTC', 'BRLETH')
+        }
+        query_string = urlencode({
+            'pairs': 'BRLBTC,BRLETH',
+            'from': 1622862000,
+            'range': 20,
+        })
+
+        response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache-Status'] == 'HIT'
+        assert response.content == b'{"BRLBTC":[],"BRLETH":[]}'
+        mock_cache.set_many.assert_not_called()
+
+    def test_should_validate_that_the_columnar_format_is_returned_by_pair(
+        self,
+        client,
+        simple_moving_averages,
+        mock_cache
+    ):
+        query_string = urlencode({
+            'pairs': 'BRLBTC,BRLETH',
+            'from': 1622862000,
+            'range': 20,
+            'format': 'columns',
+        })
+
+        response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {
+            'BRLBTC': {'timestamp': [1623023999], 'mms': [201108.2404745]},
+            'BRLETH': {'timestamp': [1623023999], 'mms': [1.5]},
+        }
+
+    def test_should_validate_status_code_and_body_when_the_format_cannot_be_joined_by_pair(  # noqa
+        self,
+        client
+    ):
+        query_string = urlencode({
+            'pairs': 'BRLBTC,BRLETH',
+            'from': 1622862000,
+            'range': 20,
+            'format': 'binary',
+        })
+
+        response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json() == {
+            'detail': [
+                {'loc': ['query', 'format'], 'msg': 'Only the json and columns formats are allowed', 'type': 'value_error'}  # noqa
+            ]
+        }
+
+    def test_should_validate_status_code_and_body_when_too_many_pairs_are_informed(  # noqa
+        self,
+        client
+    ):
+        query_string = urlencode({
+            'pairs': ','.join(f'PAIR{index}' for index in range(21)),
+            'from': 1622862000,
+            'range': 20,
+        })
+
+        response = client.get(f'/v1/indicators/mms?{query_string}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json() == {
+            'detail': [
+                {'loc': ['query', 'pairs'], 'msg': 'No more than 20 pairs can be informed', 'type': 'value_error'}  # noqa
+            ]
+        }
@@ -1,18 +1,58 @@
 from http import HTTPStatus
-from typing import List
+from itertools import groupby
+from typing import AsyncIterator, Dict, List, Union
 
-from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 
+from asgiref.sync import sync_to_async
 from ninja import Query, Router
 from simple_settings import settings
 
+from project.apps.indicators.mms.cache import (
+    CACHE_REQUESTS,
+    RENDERERS,
+    async_response_cache,
+    get_cache_key,
+    get_content_columns,
+    get_data_version_async,
+    get_data_versions,
+    get_latest_values_async,
+    render_content,
+    render_latest_content,
+    render_pairs_content,
+    response_cache,
+    subscribe_latest_values
+)
+from project.apps.indicators.mms.enum import FormatEnum, GranularityEnum
 from project.apps.indicators.mms.schemas import (
+    BatchQueryFilter,
+    IndicatorMmsLatestResponseSchema,
+    IndicatorMmsRangesResponseSchema,
     IndicatorMmsResponseSchema,
-    QueryFilter
+    QueryFilter,
+    RangeDaysList
+)
+from project.core.exceptions import InternalServerError, NotFoundError
+from project.core.pagination import encode_cursor, get_next_link
+from project.core.renderers import (
+    get_content_type,
+    get_etag,
+    is_not_modified,
+    render_not_modified,
+    render_response
+)
+from project.core.streaming import (
+    AsyncStreamingHttpResponse,
+    ThreadedStreamingHttpResponse
 )
-from project.core.exceptions import InternalServerError
 
-from .helpers import get_simple_moving_average_variations
+from .helpers import (
+    get_latest_simple_moving_average,
+    get_max_age,
+    get_simple_moving_average_variations,
+    get_simple_moving_average_variations_by_pairs
+)
 
 router = Router()
 
@@ -22,12 +62,19 @@ router = Router()
     summary='Simple Moving Average',
     description='Service that delivers the 20, 50, and 200 day simple moving '
                 'average variations of Bitcoin and Etherium currencies that '
-                'are listed on the Mercado Bitcoin.',
+                'are listed on the Mercado Bitcoin. When more than one '
+                'range is informed, every average is returned in each item. '
+                'Responses carry an ETag and a request with a matching '
+                'If-None-Match header is answered with 304.',
     response={
-        HTTPStatus.OK: List[IndicatorMmsResponseSchema],
+        HTTPStatus.OK: Union[
+            List[IndicatorMmsResponseSchema],
+            List[IndicatorMmsRangesResponseSchema],
+        ],
+        HTTPStatus.NOT_MODIFIED: None,
     }
 )
-def retrieve(
+async def retrieve(
     request,
     pair: str,
     filters: QueryFilter = Query(None)
@@ -37,36 +84,367 @@ def retrieve(
         precision = filters['precision']
         from_timestamp = filters['from_timestamp']
         to_timestamp = filters['to_timestamp']
-        range_days = filters['range'].value
+        ranges = filters['range']
+        granularity = filters['granularity']
+        output_format = filters['format']
+        limit = filters['limit']
+        after = filters['cursor']
+
+        cache_key = get_cache_key(
+            pair=pair,
+            precision=precision,
+            version=await get_data_version_async(
+                pair=pair,
+                precision=precision
+            ),
+            range_days=ranges.label,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            granularity=granularity.value,
+            output_format=output_format.value,
+        )
 
-        cache_key = (
-            'mms_retrieve_'
-            f'{pair}_{precision}_{range_days}_{from_timestamp}_{to_timestamp}'
+        etag = get_etag(
+            cache_key if limit is None else f'{cache_key}_{after}_{limit}'
         )
-        data = cache.get(cache_key)
-        if not data:
+        max_age = get_max_age(to_timestamp)
+        if is_not_modified(request, etag):
+            return render_not_modified(etag=etag, max_age=max_age)
+
+        if limit is not None:
+            return await _render_page(
+                request,
+                pair=pair,
+                precision=precision,
+                from_timestamp=(
+                    from_timestamp if after is None
+                    else max(from_timestamp, after + 1)
+                ),
+                to_timestamp=to_timestamp,
+                ranges=ranges,
+                granularity=granularity,
+                output_format=output_format,
+                limit=limit,
+                etag=etag,
+                max_age=max_age,
+            )
+
+        if filters['stream']:
+            return _render_stream(
+                pair=pair,
+                precision=precision,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                ranges=ranges,
+                granularity=granularity,
+                output_format=output_format,
+                etag=etag,
+                max_age=max_age,
+            )
+
+        @sync_to_async
+        def refresh() -> bytes:
             items = get_simple_moving_average_variations(
                 pair=pair,
                 precision=precision,
                 from_timestamp=from_timestamp,
-                to_timestamp=to_timestamp
+                to_timestamp=to_timestamp,
+                granularity=granularity
+            ).values_list(
+                'timestamp',
+                *[f'mms_{range_days.value}' for range_days in ranges]
+            )
+
+            return render_content(items, ranges, output_format)
+
+        content, cache_status = await async_response_cache.get_or_set(
+            cache_key,
+            refresh
+        )
+
+        response = render_response(
+            content,
+            etag=etag,
+            max_age=max_age,
+            renderer=RENDERERS[output_format]
+        )
+        response['X-Cache-Status'] = cache_status
+        CACHE_REQUESTS.inc(route='mms_retrieve', status=cache_status)
+        if output_format == FormatEnum.BINARY:
+            response['X-Columns'] = ','.join(get_content_columns(ranges))
+        return response
+    except Exception:
+        raise InternalServerError(
+            'An internal error occurred while making the request.'
+        )
+
+
+@router.get(
+    path='/{pair}/mms/latest',
+    summary='Latest Simple Moving Average',
+    description='Service that delivers the 20, 50, and 200 day simple moving '
+                'averages of the most recent calculated day of the pair.',
+    response={
+        HTTPStatus.OK: IndicatorMmsLatestResponseSchema,
+    }
+)
+async def retrieve_latest(
+    request,
+    pair: str,
+    precision: str = '1d'
+):
+    try:
+        values = await get_latest_values_async(
+            pair=pair,
+            precision=precision
+        )
+        cache_status = 'HIT'
+        if not values:
+            values = await sync_to_async(get_latest_simple_moving_average)(
+                pair=pair,
+                precision=precision
             )
+            cache_status = 'MISS'
+    except Exception:
+        raise InternalServerError(
+            'An internal error occurred while making the request.'
+        )
+
+    if not values:
+        raise NotFoundError(
+            'No simple moving average was calculated for the pair.'
+        )
+
+    response = render_response(render_latest_content(values))
+    response['X-Cache-Status'] = cache_status
+    CACHE_REQUESTS.inc(route='mms_retrieve_latest', status=cache_status)
+    return response
+
 
-            data = [
-                {
-                    'mms': getattr(item, f'mms_{filters["range"].value}'),
-                    'timestamp': item.timestamp
-                }
-                for item in items
+@router.get(
+    path='/{pair}/mms/events',
+    summary='Simple Moving Average events',
+    description='Server-sent events with the 20, 50, and 200 day simple '
+                'moving averages of the pair: the most recent calculated day '
+                'is sent on connection and each new day as soon as it is '
+                'calculated.',
+)
+async def retrieve_events(
+    request,
+    pair: str,
+    precision: str = '1d'
+):
+    response = AsyncStreamingHttpResponse(
+        _stream_latest_events(pair=pair, precision=precision),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _stream_latest_events(
+    pair: str,
+    precision: str
+) -> AsyncIterator[bytes]:
+    """
+    Subscribes before reading the stored values, so no day is missed between
+    both, and sends a comment when no day arrives within the heartbeat to
+    keep the connection open through proxies
+    """
+    heartbeat = settings.EVENTS_HEARTBEAT['mms_latest']
+    async with subscribe_latest_values(
+        pair=pair,
+        precision=precision
+    ) as subscription:
+        values = await get_latest_values_async(pair=pair, precision=precision)
+        if values:
+            yield _render_event(render_latest_content(values))
+
+        while True:
+            content = await subscription.get_message(timeout=heartbeat)
+            if content is None:
+                yield b': heartbeat\n\n'
+            else:
+                yield _render_event(content)
+
+
+def _render_event(content: bytes) -> bytes:
+    return b'event: mms\ndata: ' + content + b'\n\n'
+
+
+async def _render_page(
+    request,
+    pair: str,
+    precision: str,
+    from_timestamp: int,
+    to_timestamp: int,
+    ranges: RangeDaysList,
+    granularity: GranularityEnum,
+    output_format: FormatEnum,
+    limit: int,
+    etag: str,
+    max_age: int,
+) -> HttpResponse:
+    """
+    Renders a page of the variations with a range scan on the timestamp
+    index, reading one extra item to know whether there is a next page
+    """
+    rows = await sync_to_async(list)(
+        get_simple_moving_average_variations(
+            pair=pair,
+            precision=precision,
+            from_timestamp=from_timestamp,
+            to_timestamp=to_timestamp,
+            granularity=granularity
+        ).values_list(
+            'timestamp',
+            *[f'mms_{range_days.value}' for range_days in ranges]
+        )[:limit + 1]
+    )
+
+    response = render_response(
+        render_content(rows[:limit], ranges, output_format),
+        etag=etag,
+        max_age=max_age,
+        renderer=RENDERERS[output_format]
+    )
+    if len(rows) > limit:
+        cursor = encode_cursor(rows[limit - 1][0])
+        response['X-Next-Cursor'] = cursor
+        response['Link'] = get_next_link(request, cursor)
+
+    if output_format == FormatEnum.BINARY:
+        response['X-Columns'] = ','.join(get_content_columns(ranges))
+
+    return response
+
+
+def _render_stream(
+    pair: str,
+    precision: str,
+    from_timestamp: int,
+    to_timestamp: int,
+    ranges: RangeDaysList,
+    granularity: GranularityEnum,
+    output_format: FormatEnum,
+    etag: str,
+    max_age: int,
+) -> ThreadedStreamingHttpResponse:
+    """
+    Streams the variations through a server-side cursor, so the memory of
+    the request does not grow with the range
+    """
+    chunk_size = settings.STREAM_CHUNK_SIZE['mms_retrieve']
+    columns = get_content_columns(ranges)
+    renderer = RENDERERS[output_format]
+
+    rows = get_simple_moving_average_variations(
+        pair=pair,
+        precision=precision,
+        from_timestamp=from_timestamp,
+        to_timestamp=to_timestamp,
+        granularity=granularity
+    ).values_list(
+        'timestamp',
+        *[f'mms_{range_days.value}' for range_days in ranges]
+    ).iterator(chunk_size=chunk_size)
+
+    response = ThreadedStreamingHttpResponse(
+        renderer.stream_rows(rows, columns, chunk_size),
+        content_type=get_content_type(renderer),
+    )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    if output_format == FormatEnum.BINARY:
+        response['X-Columns'] = ','.join(columns)
+
+    return response
+
+
+@router.get(
+    path='/mms',
+    summary='Simple Moving Average by pairs',
+    description='Service that delivers the simple moving average variations '
+                'of several pairs in the same period, by pair.',
+    response={
+        HTTPStatus.OK: Dict[
+            str,
+            Union[
+                List[IndicatorMmsResponseSchema],
+                List[IndicatorMmsRangesResponseSchema],
             ]
+        ],
+    }
+)
+def retrieve_batch(
+    request,
+    filters: BatchQueryFilter = Query(None)
+):
+    try:
+        filters = filters.dict()
+        pairs = list(filters['pairs'])
+        precision = filters['precision']
+        from_timestamp = filters['from_timestamp']
+        to_timestamp = filters['to_timestamp']
+        ranges = filters['range']
+        granularity = filters['granularity']
+        output_format = filters['format']
+
+        versions = get_data_versions(pairs=pairs, precision=precision)
+        cache_keys = {
+            get_cache_key(
+                pair=pair,
+                precision=precision,
+                version=versions[pair],
+                range_days=ranges.label,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                granularity=granularity.value,
+                output_format=output_format.value,
+            ): pair
+            for pair in pairs
+        }
 
-            cache.set(
-                key=cache_key,
-                value=data,
-                timeout=settings.CACHE_LIFETIME['mms_retrieve']
+        def refresh(keys: List[str]) -> Dict[str, bytes]:
+            items = get_simple_moving_average_variations_by_pairs(
+                pairs=[cache_keys[key] for key in keys],
+                precision=precision,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                granularity=granularity
+            ).values_list(
+                'pair',
+                'timestamp',
+                *[f'mms_{range_days.value}' for range_days in ranges]
             )
 
-        return HTTPStatus.OK, IndicatorMmsResponseSchema.from_list(data)
+            items_by_pair = {
+                pair: [item[1:] for item in pair_items]
+                for pair, pair_items in groupby(items, key=lambda x: x[0])
+            }
+
+            return {
+                key: render_content(
+                    items_by_pair.get(cache_keys[key], []),
+                    ranges,
+                    output_format
+                )
+                for key in keys
+            }
+
+        contents, cache_status = response_cache.get_or_set_many(
+            list(cache_keys),
+            refresh
+        )
+
+        response = render_response(render_pairs_content({
+            pair: contents[key]
+            for key, pair in cache_keys.items()
+        }))
+        response['X-Cache-Status'] = cache_status
+        CACHE_REQUESTS.inc(route='mms_retrieve_batch', status=cache_status)
+        return response
     except Exception:
         raise InternalServerError(
             'An internal error occurred while making the request.'
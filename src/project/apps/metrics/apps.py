@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    name = 'project.apps.metrics'
+    verbose_name = 'Metrics'
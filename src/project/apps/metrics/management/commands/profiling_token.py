@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from project.core.middlewares.profiling import get_profiling_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints a value of the X-Profile header that profiles the requests '
+        'while it is valid (PROFILING_TOKEN_MAX_AGE)'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(get_profiling_token())
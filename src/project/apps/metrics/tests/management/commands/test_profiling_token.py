@@ -0,0 +1,17 @@
+from io import StringIO
+
+from django.core import signing
+from django.core.management import call_command
+
+from project.core.middlewares.profiling import PROFILING_SALT
+
+
+class TestCommandProfilingToken:
+
+    def test_should_validate_that_the_token_is_signed_for_the_profiling(self):
+        out = StringIO()
+        call_command('profiling_token', stdout=out)
+
+        assert signing.TimestampSigner(salt=PROFILING_SALT).unsign(
+            out.getvalue().strip()
+        ) == 'profile'
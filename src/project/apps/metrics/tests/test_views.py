@@ -0,0 +1,141 @@
+import os
+import socket
+import time
+from unittest.mock import patch
+
+from django.test import Client
+
+import orjson
+import pytest
+from simple_settings import settings
+
+from project.core.metrics import Registry, merge_snapshots, render
+
+
+class TestRetrieveMetricsView:
+
+    @pytest.fixture()
+    def token(self):
+        with patch.dict(settings.METRICS, {'token': 'secret'}):
+            yield 'secret'
+
+    def test_should_validate_that_the_requests_are_recorded_by_route(
+        self,
+        token
+    ):
+        client = Client()
+        client.get(path='/ping/')
+
+        response = client.get(
+            path='/metrics/',
+            HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        content = response.content.decode()
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == (
+            'text/plain; version=0.0.4; charset=utf-8'
+        )
+        assert '# TYPE http_request_duration_seconds histogram' in content
+        assert (
+            'http_requests_total{method="GET",route="ping/",status="200"}'
+            in content
+        )
+
+    def test_should_validate_the_histogram_of_several_processes(self):
+        snapshots = []
+        for values in ([0.01, 0.2], [3.0]):
+            registry = Registry()
+            histogram = registry.histogram(
+                'task_duration_seconds',
+                'Duration of the tasks',
+                labels=('queue',),
+                buckets=(0.1, 1.0),
+            )
+            for value in values:
+                histogram.observe(value, queue='calculate')
+            snapshots.append(registry.snapshot())
+
+        assert render(merge_snapshots(snapshots)).splitlines() == [
+            '# HELP task_duration_seconds Duration of the tasks',
+            '# TYPE task_duration_seconds histogram',
+            'task_duration_seconds_bucket{queue="calculate",le="0.1"} 1',
+            'task_duration_seconds_bucket{queue="calculate",le="1.0"} 2',
+            'task_duration_seconds_bucket{queue="calculate",le="+Inf"} 3',
+            'task_duration_seconds_sum{queue="calculate"} 3.21',
+            'task_duration_seconds_count{queue="calculate"} 3',
+        ]
+
+    @pytest.mark.parametrize('_authorization', [
+        None,
+        'Bearer invalid',
+        'Bearer sécret',
+        'Basic secret',
+    ])
+    def test_should_validate_that_the_requests_without_the_token_are_refused(  # noqa
+        self,
+        token,
+        _authorization
+    ):
+        headers = (
+            {'HTTP_AUTHORIZATION': _authorization} if _authorization else {}
+        )
+
+        response = Client().get(path='/metrics/', **headers)
+
+        assert response.status_code == 401
+
+    def test_should_validate_that_every_request_is_refused_without_the_token_setting(  # noqa
+        self
+    ):
+        with patch.dict(settings.METRICS, {'token': None}):
+            response = Client().get(
+                path='/metrics/',
+                HTTP_AUTHORIZATION='Bearer None'
+            )
+
+        assert response.status_code == 401
+
+
+class TestRegistry:
+
+    @pytest.fixture()
+    def registry(self, tmp_path):
+        registry = Registry(directory=str(tmp_path), flush_interval=60)
+        registry.counter('tasks_total', 'Tasks').inc()
+        yield registry
+        registry.close()
+
+    def test_should_validate_that_the_files_not_written_recently_are_removed(  # noqa
+        self,
+        registry,
+        tmp_path
+    ):
+        now = time.time()
+        content = orjson.dumps(registry.snapshot())
+
+        ended_path = tmp_path / 'other-host-1.json'
+        ended_path.write_bytes(content)
+        os.utime(ended_path, (now - 181, now - 181))
+
+        alive_path = tmp_path / 'other-host-2.json'
+        alive_path.write_bytes(content)
+        os.utime(alive_path, (now - 170, now - 170))
+
+        assert registry.collect()['tasks_total']['values'] == [[[], [2]]]
+        assert not ended_path.exists()
+        assert alive_path.exists()
+
+    def test_should_validate_that_the_file_of_the_process_is_removed_on_close(  # noqa
+        self,
+        registry,
+        tmp_path
+    ):
+        registry.flush()
+        assert os.listdir(tmp_path) == [
+            f'{socket.gethostname()}-{os.getpid()}.json'
+        ]
+
+        registry.close()
+
+        assert os.listdir(tmp_path) == []
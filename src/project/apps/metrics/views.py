@@ -0,0 +1,42 @@
+import hmac
+
+from django.http import HttpResponse
+
+from ninja import Router
+from ninja.security import HttpBearer
+from simple_settings import settings
+
+from project.core.metrics import CONTENT_TYPE, registry, render
+
+router = Router()
+
+
+class MetricsTokenAuth(HttpBearer):
+    """
+    Accepts the requests with the METRICS_TOKEN bearer token (the
+    authorization of the Prometheus scrape config), and none when it is not
+    set
+    """
+
+    def authenticate(self, request, token: str):
+        expected = settings.METRICS['token']
+        if expected and hmac.compare_digest(
+            token.encode(),
+            expected.encode()
+        ):
+            return token
+
+        return None
+
+
+@router.get(
+    path='/',
+    summary='Metrics',
+    description='Metrics of the application in the Prometheus text format.',
+    auth=MetricsTokenAuth(),
+)
+def metrics(request):
+    return HttpResponse(
+        render(registry.collect()),
+        content_type=CONTENT_TYPE
+    )
@@ -7,10 +7,13 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
-from django.core.asgi import get_asgi_application
+import django
 
 from manage import set_settings_module
 
 set_settings_module()
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+from project.core.streaming import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
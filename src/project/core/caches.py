@@ -0,0 +1,587 @@
+import asyncio
+import functools
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+import structlog
+from asgiref.sync import sync_to_async
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+from django_redis.serializers.base import BaseSerializer
+from redis import asyncio as aioredis
+from simple_settings import settings
+
+from project.core.locks import AsyncCacheLock, CacheLock, LockAcquireError
+from project.core.profiling import timed
+
+logger = structlog.get_logger()
+
+_SOFT_EXPIRY = struct.Struct('>d')
+
+_SET_HASH_IF_NEWER = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current and tonumber(current) > tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+return 1
+"""
+
+
+class BytesSerializer(BaseSerializer):
+    """
+    Stores values that are already encoded (e.g. rendered responses) as they
+    are, without serializing them again.
+    """
+
+    def dumps(self, value: bytes) -> bytes:
+        return value
+
+    def loads(self, value: bytes) -> bytes:
+        return value
+
+
+def pack_content(content: bytes, lifetime: float) -> bytes:
+    """
+    Prefixes the content with its soft expiry timestamp
+    """
+    return _SOFT_EXPIRY.pack(time.time() + lifetime) + content
+
+
+def unpack_content(value: bytes) -> Tuple[bytes, float]:
+    """
+    Splits a packed value into its content and soft expiry timestamp
+    """
+    (expires_at,) = _SOFT_EXPIRY.unpack_from(value)
+    return value[_SOFT_EXPIRY.size:], expires_at
+
+
+class AsyncRedisCache:
+    """
+    Async client of a django-redis cache alias for integer and bytes values
+    (see BytesSerializer).
+
+    Keys are built by the alias and the values are stored as the django-redis
+    client stores them, so both clients share the same entries. A connection
+    pool is kept per event loop.
+    """
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            location = settings.CACHES[self.alias]['LOCATION']
+            if isinstance(location, (list, tuple)):
+                location = location[0]
+
+            client = aioredis.Redis.from_url(location)
+            self._clients[loop] = client
+
+        return client
+
+    def make_key(self, key: str) -> str:
+        return caches[self.alias].make_key(key)
+
+    def get_timeout(self, timeout) -> Optional[int]:
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = caches[self.alias].default_timeout
+
+        return None if timeout is None else max(int(timeout), 1)
+
+    @staticmethod
+    def decode(value: Optional[bytes]) -> Any:
+        if value is None:
+            return None
+
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return value
+
+    @timed('cache')
+    async def get(self, key: str) -> Any:
+        return self.decode(await self.client.get(self.make_key(key)))
+
+    @timed('cache')
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+
+        values = await self.client.mget([self.make_key(key) for key in keys])
+        return {
+            key: self.decode(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    @timed('cache')
+    async def set(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT):
+        await self.client.set(
+            self.make_key(key),
+            value,
+            ex=self.get_timeout(timeout)
+        )
+
+    @timed('cache')
+    async def set_many(self, values: Dict[str, Any], timeout=DEFAULT_TIMEOUT):
+        timeout = self.get_timeout(timeout)
+        async with self.client.pipeline(transaction=False) as pipeline:
+            for key, value in values.items():
+                pipeline.set(self.make_key(key), value, ex=timeout)
+            await pipeline.execute()
+
+    @timed('cache')
+    async def add(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT) -> bool:
+        return bool(await self.client.set(
+            self.make_key(key),
+            value,
+            ex=self.get_timeout(timeout),
+            nx=True
+        ))
+
+    @timed('cache')
+    async def incr(self, key: str, delta: int = 1) -> int:
+        return await self.client.incrby(self.make_key(key), delta)
+
+    @timed('cache')
+    async def get_hash(self, key: str) -> Dict[str, str]:
+        values = await self.client.hgetall(self.make_key(key))
+        return {
+            field.decode(): value.decode()
+            for field, value in values.items()
+        }
+
+    @timed('cache')
+    async def delete(self, key: str) -> bool:
+        return bool(await self.client.delete(self.make_key(key)))
+
+
+class AsyncCacheAdapter:
+    """
+    Exposes a cache alias of another backend (e.g. the dummy and local memory
+    caches of the tests) with the interface of AsyncRedisCache
+    """
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable]:
+        return timed('cache')(sync_to_async(getattr(caches[self.alias], name)))
+
+    @timed('cache')
+    async def get_hash(self, key: str) -> Dict[str, str]:
+        return await sync_to_async(caches[self.alias].get)(key) or {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_cache(alias: str):
+    """
+    Returns the async client of the cache alias
+    """
+    if settings.CACHES[alias]['BACKEND'] == 'django_redis.cache.RedisCache':
+        return AsyncRedisCache(alias)
+
+    return AsyncCacheAdapter(alias)
+
+
+def set_hash_if_newer(
+    alias: str,
+    key: str,
+    values: Dict[str, Any],
+    *,
+    order_field: str
+) -> bool:
+    """
+    Replaces the fields of a hash in a single atomic step, unless the stored
+    hash has a greater value in the order field (e.g. a past day calculated
+    again after a newer one).
+
+    The other backends store the hash as a dict, to be read by get_hash.
+    """
+    values = {field: str(value) for field, value in values.items()}
+    cache = caches[alias]
+
+    if not isinstance(cache, RedisCache):
+        current = cache.get(key)
+        if current and int(current[order_field]) > int(values[order_field]):
+            return False
+
+        cache.set(key, values, timeout=None)
+        return True
+
+    client = get_redis_connection(alias)
+    script = client.register_script(_SET_HASH_IF_NEWER)
+    arguments = [order_field, values[order_field]]
+    for field, value in values.items():
+        arguments.extend((field, value))
+
+    return bool(script(keys=[cache.make_key(key)], args=arguments))
+
+
+class LocalLRUCache:
+    """
+    In-process LRU cache with a lifetime per entry and a cap on the total
+    size of the stored values, in bytes.
+
+    It is meant as a first tier in front of a shared cache for a handful of
+    hot keys, so each worker answers them without a network round-trip.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                self._delete(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: float):
+        size = self._get_size(value)
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            self._delete(key)
+            self._entries[key] = (value, time.monotonic() + timeout, size)
+            self.size += size
+
+            while self.size > self.max_size:
+                self._delete(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    @staticmethod
+    def _get_size(value: Any) -> int:
+        if isinstance(value, bytes):
+            return len(value)
+        return sys.getsizeof(value)
+
+
+class BaseStaleWhileRevalidateCache:
+    """
+    Caches encoded contents with a soft expiry stored next to the value.
+
+    After the soft expiry only the request holding a short lock refreshes the
+    entry, while the others keep receiving the stale content (STALE). The
+    entry is only removed from the cache after the stale lifetime, and if
+    the refresh fails in the meantime the stale content is returned with the
+    STALE_ERROR status.
+
+    An optional local cache keeps the packed values in process for
+    local_lifetime seconds; a local entry past its soft expiry is read again
+    from the shared cache, where another worker may have refreshed it.
+
+    The subclasses only call the shared cache and the lock, synchronously
+    (StaleWhileRevalidateCache) or from the event loop
+    (AsyncStaleWhileRevalidateCache); both store the same packed values and
+    can share the keys.
+    """
+
+    HIT = 'HIT'
+    MISS = 'MISS'
+    STALE = 'STALE'
+    STALE_ERROR = 'STALE_ERROR'
+
+    def __init__(
+        self,
+        cache,
+        *,
+        lifetime: int,
+        stale_lifetime: int,
+        lock_alias: str = 'lock',
+        lock_expire: int = 10,
+        local_cache: Optional[LocalLRUCache] = None,
+        local_lifetime: int = 60,
+    ):
+        self.cache = cache
+        self.lifetime = lifetime
+        self.stale_lifetime = stale_lifetime
+        self.lock_alias = lock_alias
+        self.lock_expire = lock_expire
+        self.local_cache = local_cache
+        self.local_lifetime = local_lifetime
+
+    @property
+    def timeout(self) -> int:
+        return self.lifetime + self.stale_lifetime
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        """
+        Returns the content of the local entry that is not past the soft
+        expiry
+        """
+        if self.local_cache is None:
+            return None
+
+        value = self.local_cache.get(key)
+        if value is None:
+            return None
+
+        content, expires_at = unpack_content(value)
+        return content if time.time() < expires_at else None
+
+    def _load(self, key: str, value: bytes) -> Tuple[bytes, bool]:
+        """
+        Keeps the value read from the shared cache locally and returns its
+        content and whether it is past the soft expiry
+        """
+        if self.local_cache is not None:
+            self.local_cache.set(key, value, self.local_lifetime)
+
+        content, expires_at = unpack_content(value)
+        return content, time.time() >= expires_at
+
+    def _pack(self, key: str, content: bytes) -> bytes:
+        """
+        Returns the value of the content to store in the shared cache, kept
+        locally as well
+        """
+        value = pack_content(content, self.lifetime)
+        if self.local_cache is not None:
+            self.local_cache.set(key, value, self.local_lifetime)
+
+        return value
+
+    @staticmethod
+    def _get_lock_key(key: str) -> str:
+        return f'{key}_revalidate'
+
+    def _stale_on_error(self, **keys) -> str:
+        logger.warning(
+            'Could not revalidate the cache, returning stale content',
+            **keys,
+            exc_info=True,
+        )
+        return self.STALE_ERROR
+
+
+class StaleWhileRevalidateCache(BaseStaleWhileRevalidateCache):
+    """
+    BaseStaleWhileRevalidateCache over a Django cache
+    """
+
+    @timed('cache')
+    def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """
+        Returns the cached content and whether it is past the soft expiry
+        """
+        content = self._get_local(key)
+        if content is not None:
+            return content, False
+
+        value = self.cache.get(key)
+        if value is None:
+            return None, False
+
+        return self._load(key, value)
+
+    @timed('cache')
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[bytes, bool]]:
+        """
+        Returns the cached content of the keys found and whether each one is
+        past the soft expiry, reading the shared cache once
+        """
+        found = {}
+        for key in keys:
+            content = self._get_local(key)
+            if content is not None:
+                found[key] = content, False
+
+        missing = [key for key in keys if key not in found]
+        for key, value in self.cache.get_many(missing).items():
+            found[key] = self._load(key, value)
+
+        return found
+
+    @timed('cache')
+    def set(self, key: str, content: bytes):
+        self.cache.set(
+            key=key,
+            value=self._pack(key, content),
+            timeout=self.timeout
+        )
+
+    @timed('cache')
+    def set_many(self, contents: Dict[str, bytes]):
+        self.cache.set_many(
+            {
+                key: self._pack(key, content)
+                for key, content in contents.items()
+            },
+            timeout=self.timeout
+        )
+
+    def get_or_set(
+        self,
+        key: str,
+        refresh: Callable[[], bytes]
+    ) -> Tuple[bytes, str]:
+        """
+        Returns the content of the key and its cache status, calling refresh
+        on a miss or when the stale entry must be revalidated
+        """
+        content, stale = self.get(key)
+        if content is None:
+            content = refresh()
+            self.set(key, content)
+            return content, self.MISS
+
+        if not stale:
+            return content, self.HIT
+
+        try:
+            with CacheLock(
+                key=self._get_lock_key(key),
+                cache_alias=self.lock_alias,
+                expire=self.lock_expire,
+                raise_exception=False,
+                name='cache_revalidate',
+            ) as lock:
+                if not lock.active:
+                    return content, self.STALE
+
+                fresh_content = refresh()
+                self.set(key, fresh_content)
+                return fresh_content, self.MISS
+        except LockAcquireError:
+            return content, self.STALE
+        except Exception:
+            return content, self._stale_on_error(key=key)
+
+    def get_or_set_many(
+        self,
+        keys: List[str],
+        refresh: Callable[[List[str]], Dict[str, bytes]]
+    ) -> Tuple[Dict[str, bytes], str]:
+        """
+        Returns the content of each key and the cache status of the whole
+        batch, calling refresh once with the keys that are missing or stale.
+
+        Stale keys are revalidated together with the missing ones, without
+        the lock, and are returned stale (STALE_ERROR) only when the refresh
+        fails and no key is missing.
+        """
+        found = self.get_many(keys)
+        contents = {
+            key: content
+            for key, (content, stale) in found.items()
+            if not stale
+        }
+        refresh_keys = [key for key in keys if key not in contents]
+        if not refresh_keys:
+            return contents, self.HIT
+
+        try:
+            fresh_contents = refresh(refresh_keys)
+        except Exception:
+            if any(key not in found for key in refresh_keys):
+                raise
+
+            status = self._stale_on_error(keys=refresh_keys)
+            return {key: found[key][0] for key in keys}, status
+
+        self.set_many(fresh_contents)
+        contents.update(fresh_contents)
+        return contents, self.MISS
+
+
+class AsyncStaleWhileRevalidateCache(BaseStaleWhileRevalidateCache):
+    """
+    BaseStaleWhileRevalidateCache over an async cache (see get_async_cache),
+    so a hit is answered without leaving the event loop
+    """
+
+    async def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """
+        Returns the cached content and whether it is past the soft expiry
+        """
+        content = self._get_local(key)
+        if content is not None:
+            return content, False
+
+        value = await self.cache.get(key)
+        if value is None:
+            return None, False
+
+        return self._load(key, value)
+
+    async def set(self, key: str, content: bytes):
+        await self.cache.set(
+            key=key,
+            value=self._pack(key, content),
+            timeout=self.timeout
+        )
+
+    async def get_or_set(
+        self,
+        key: str,
+        refresh: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[bytes, str]:
+        """
+        Returns the content of the key and its cache status, awaiting refresh
+        on a miss or when the stale entry must be revalidated
+        """
+        content, stale = await self.get(key)
+        if content is None:
+            content = await refresh()
+            await self.set(key, content)
+            return content, self.MISS
+
+        if not stale:
+            return content, self.HIT
+
+        try:
+            async with AsyncCacheLock(
+                key=self._get_lock_key(key),
+                cache=get_async_cache(self.lock_alias),
+                expire=self.lock_expire,
+                raise_exception=False,
+                name='cache_revalidate',
+            ) as lock:
+                if not lock.active:
+                    return content, self.STALE
+
+                fresh_content = await refresh()
+                await self.set(key, fresh_content)
+                return fresh_content, self.MISS
+        except LockAcquireError:
+            return content, self.STALE
+        except Exception:
+            return content, self._stale_on_error(key=key)
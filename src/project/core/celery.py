@@ -1,12 +1,27 @@
+import time
+
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
 
 from manage import set_settings_module
 
 set_settings_module()
 
+from simple_settings import settings  # noqa: E402
+
+from project.core.metrics import registry  # noqa: E402
+
+TASK_DURATION = registry.histogram(
+    'celery_task_duration_seconds',
+    'Duration of the Celery tasks by task, queue and final state',
+    labels=('task', 'queue', 'state'),
+)
+
 app = Celery('project')
 app.config_from_object('simple_settings:settings', namespace='CELERY')
-app.autodiscover_tasks(related_name='tasks')
+if settings.IS_WORKER_PROCESS:
+    # Beat sends the tasks by name and does not need to import them
+    app.autodiscover_tasks(related_name='tasks')
 app.conf.broker_transport_options = {
     'queue_order_strategy': 'priority',
 }
@@ -15,3 +30,23 @@ app.conf.broker_transport_options = {
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+@task_prerun.connect
+def record_task_start(task_id, task, **kwargs):
+    task.request.metrics_start_time = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id, task, state=None, **kwargs):
+    start_time = getattr(task.request, 'metrics_start_time', None)
+    if start_time is None:
+        return
+
+    delivery_info = task.request.delivery_info or {}
+    TASK_DURATION.observe(
+        time.perf_counter() - start_time,
+        task=task.name,
+        queue=delivery_info.get('routing_key') or task.queue or 'celery',
+        state=state or 'UNKNOWN',
+    )
@@ -0,0 +1,29 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from cid.locals.base import build_cid
+from simple_settings import settings
+
+# django-cid 2.2 keeps the correlation id in a thread local (its context
+# variable backend fails to import), which the async requests handled by
+# the event loop thread would share, so the project keeps its own
+_correlation_id: ContextVar[Optional[str]] = ContextVar(
+    'correlation_id', default=None
+)
+
+
+def get_correlation_id() -> Optional[str]:
+    """
+    Returns the correlation id of the current request or task, generating
+    one when there is none and CID_GENERATE is enabled
+    """
+    cid = _correlation_id.get()
+    if cid is None and settings.CID_GENERATE:
+        cid = build_cid()
+        set_correlation_id(cid)
+
+    return cid
+
+
+def set_correlation_id(cid: Optional[str]):
+    _correlation_id.set(cid)
@@ -1,4 +1,64 @@
 import os
+import time
+from typing import Optional
+
+from django.core.cache import caches
+from django.db import connections
+
+import structlog
+from simple_settings import settings
+
+logger = structlog.get_logger()
+
+
+class ReplicaLagProbe:
+    """
+    Measures the replication lag, in seconds, of a read replica.
+
+    The measured value is cached in process and the replica is only queried
+    again after the probe interval. None means the lag is unknown, e.g. the
+    replica could not be reached.
+    """
+
+    query = (
+        'SELECT CASE '
+        'WHEN NOT pg_is_in_recovery() THEN 0 '
+        'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE COALESCE(EXTRACT(EPOCH FROM '
+        'now() - pg_last_xact_replay_timestamp()), 0) '
+        'END'
+    )
+
+    def __init__(self, alias: str, interval: float):
+        self.alias = alias
+        self.interval = interval
+        self._lag = None
+        self._expires_at = 0.0
+
+    def get_lag(self) -> Optional[float]:
+        now = time.monotonic()
+        if now >= self._expires_at:
+            self._lag = self.measure()
+            self._expires_at = now + self.interval
+
+        return self._lag
+
+    def measure(self) -> Optional[float]:
+        connection = connections[self.alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(self.query)
+                return float(cursor.fetchone()[0])
+        except Exception:
+            logger.warning(
+                'Could not measure the replica lag',
+                database=self.alias,
+                exc_info=True,
+            )
+            return None
 
 
 class DatabaseRouter:
@@ -6,6 +66,16 @@ class DatabaseRouter:
     A router to control all database operations on models in the
     auth and contenttypes applications
     https://docs.djangoproject.com/en/3.2/topics/db/multi-db/
+
+    Reads go to the replica, except for models written within the replica
+    lag window, which are read from the primary so that recently written
+    rows are never served (and cached) stale.
+
+    The last write of each model is kept in process, so a query does not
+    wait for the cache. It is shared with the other processes (e.g. the
+    worker writes, the api reads) through the cache at most once per probe
+    interval and model, in both directions, and the window is widened by
+    those intervals.
     """
 
     def __init__(self):
@@ -13,14 +83,102 @@ class DatabaseRouter:
             os.getenv('SIMPLE_SETTINGS') or
             os.getenv('DJANGO_SETTINGS_MODULE')
         )
+        self.lag_settings = settings.DATABASE_REPLICA_LAG
+        self.probe = ReplicaLagProbe(
+            alias='default_read',
+            interval=self.lag_settings['probe_interval'],
+        )
+        # Model label: time of the last write of this process
+        self._last_writes = {}
+        # Model label: time the last write was shared with the others
+        self._published_writes = {}
+        # Model label: (last write of any process, time it was read)
+        self._shared_writes = {}
 
     def db_for_read(self, model, **hints):
         if self.settings == 'project.core.settings.test':
             return 'default'
+
+        if not self.lag_settings['enabled']:
+            return 'default_read'
+
+        lag = self.probe.get_lag()
+        if lag is None:
+            return 'default'
+
+        label = model._meta.label_lower
+        now = time.time()
+        window = lag + self.probe.interval
+        last_write = self._last_writes.get(label)
+        if last_write and now - last_write <= window:
+            return 'default'
+
+        # A write shared by another process may be up to one interval old
+        # when it is shared and when it is read
+        shared_window = window + 2 * self.probe.interval
+        last_write = self.get_shared_write(label, now)
+        if last_write and now - last_write <= shared_window:
+            return 'default'
+
         return 'default_read'
 
     def db_for_write(self, model, **hints):
+        if (
+            self.settings != 'project.core.settings.test' and
+            self.lag_settings['enabled']
+        ):
+            self.set_last_write(model._meta.label_lower)
+
         return 'default'
 
     def allow_relation(self, obj1, obj2, **hints):
         return True
+
+    def get_shared_write(self, label: str, now: float) -> Optional[float]:
+        """
+        Returns the last write of the model by any process, read from the
+        cache at most once per probe interval
+        """
+        last_write, read_at = self._shared_writes.get(label, (None, 0.0))
+        if now - read_at < self.probe.interval:
+            return last_write
+
+        try:
+            cache = caches[self.lag_settings['cache_alias']]
+            last_write = cache.get(self._get_last_write_key(label))
+        except Exception:
+            logger.warning(
+                'Could not read the last write of the model',
+                model=label,
+                exc_info=True,
+            )
+            last_write = None
+
+        self._shared_writes[label] = (last_write, now)
+        return last_write
+
+    def set_last_write(self, label: str):
+        now = time.time()
+        self._last_writes[label] = now
+        published_at = self._published_writes.get(label, 0.0)
+        if now - published_at < self.probe.interval:
+            return
+
+        self._published_writes[label] = now
+        try:
+            cache = caches[self.lag_settings['cache_alias']]
+            cache.set(
+                self._get_last_write_key(label),
+                now,
+                timeout=self.lag_settings['last_write_lifetime'],
+            )
+        except Exception:
+            logger.warning(
+                'Could not record the last write of the model',
+                model=label,
+                exc_info=True,
+            )
+
+    @staticmethod
+    def _get_last_write_key(label: str) -> str:
+        return f'database_router_last_write_{label}'
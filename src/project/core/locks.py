@@ -1,5 +1,27 @@
+import abc
+import functools
+import hashlib
+import math
+import threading
+import time
+from typing import Optional
+
 from django.core.cache import caches
 from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from asgiref.sync import sync_to_async
+from simple_settings import settings
+
+from project.core.metrics import registry
+
+LOCK_ACQUISITIONS = registry.counter(
+    'lock_acquisitions_total',
+    'Attempts to acquire a lock by name and whether it was acquired or '
+    'already held by another process (contended)',
+    labels=('name', 'result'),
+)
 
 
 class LockActiveError(Exception):
@@ -14,59 +36,306 @@ class LockReleaseError(Exception):
     pass
 
 
-class Lock(object):
-    def __init__(self):
-        self.active = False
+class LockBackend(abc.ABC):
+    """
+    Where the locks are held: acquire takes the key, returning whether it
+    was free, and release frees it
 
+    The async methods run the sync ones in a thread unless the backend has
+    an async client
+    """
 
-class CacheLock(Lock):
+    @abc.abstractmethod
+    def acquire(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def release(self, key: str):
+        pass
+
+    async def acquire_async(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        return await sync_to_async(self.acquire)(key, expire)
+
+    async def release_async(self, key: str):
+        await sync_to_async(self.release)(key)
+
+
+class CacheLockBackend(LockBackend):
+    """
+    Locks held in a Django cache alias (the Redis of the lock alias in the
+    settings), which are seen by every process and expire on their own
+    """
+
+    def __init__(self, cache_alias: str = 'default', async_cache=None):
+        self.cache_alias = cache_alias
+        self._async_cache = async_cache
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def async_cache(self):
+        if self._async_cache is None:
+            # project.core.caches imports this module
+            from project.core.caches import get_async_cache
+            self._async_cache = get_async_cache(self.cache_alias)
+
+        return self._async_cache
+
+    def acquire(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        return self.cache.add(key, True, expire)
+
+    def release(self, key: str):
+        self.cache.delete(key)
+
+    async def acquire_async(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        return await self.async_cache.add(key, 1, expire)
+
+    async def release_async(self, key: str):
+        await self.async_cache.delete(key)
+
+
+class PostgresLockBackend(LockBackend):
+    """
+    Session advisory locks of Postgres, taken on the connection of the
+    database alias that the thread already holds (no other service and no
+    new connection)
+
+    The locks do not expire: they are held until released or until the
+    connection is closed, so the lock of a worker that died is released
+    with its connection. They can not be kept after the task either, and
+    the session must not be shared (e.g. PgBouncer in transaction mode).
+    """
+
+    def __init__(self, database_alias: str = 'default'):
+        self.database_alias = database_alias
+
+    @staticmethod
+    def get_lock_id(key: str) -> int:
+        """
+        The signed 64 bits integer that identifies the key in Postgres
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    def execute(self, function: str, key: str) -> bool:
+        connection = connections[self.database_alias]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {function}(%s)', [self.get_lock_id(key)]
+            )
+            return cursor.fetchone()[0]
+
+    def acquire(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        return self.execute('pg_try_advisory_lock', key)
+
+    def release(self, key: str):
+        self.execute('pg_advisory_unlock', key)
+
+
+class LocalLockBackend(LockBackend):
     """
-    A context manager to handle a lock status using Django cache
+    Locks held in the memory of the process, without any round trip, for a
+    single worker process and the tests
+
+    A timeout of None never expires and DEFAULT_TIMEOUT is default_timeout
+    seconds, as in the Django cache.
+    """
+
+    def __init__(self, default_timeout: float = 300):
+        self.default_timeout = default_timeout
+        self._expires_at = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        if expire is DEFAULT_TIMEOUT:
+            expire = self.default_timeout
+
+        now = time.monotonic()
+        with self._lock:
+            if self._expires_at.get(key, 0) > now:
+                return False
+
+            self._expires_at[key] = (
+                math.inf if expire is None else now + expire
+            )
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._expires_at.pop(key, None)
+
+    async def acquire_async(self, key: str, expire=DEFAULT_TIMEOUT) -> bool:
+        return self.acquire(key, expire)
+
+    async def release_async(self, key: str):
+        self.release(key)
+
+
+@functools.lru_cache(maxsize=None)
+def get_lock_backend(name: Optional[str] = None) -> LockBackend:
+    """
+    Returns the lock backend of the name in LOCK_BACKENDS, which defaults to
+    the LOCK_BACKEND of the deployment
+    """
+    config = settings.LOCK_BACKENDS[name or settings.LOCK_BACKEND]
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+class Lock(object):
+    """
+    A context manager ("with" or "async with") to handle a lock status in a
+    lock backend, the LOCK_BACKEND of the settings by default
 
     The active status is True on __enter__ and False on __exit__
 
-    The cache will be deleted on context __exit__
+    The lock will be released on context __exit__
     """
 
     def __init__(
         self,
         key: str,
         *,
-        cache_alias: str = 'default',
+        backend: Optional[LockBackend] = None,
         expire=DEFAULT_TIMEOUT,
         raise_exception: bool = True,
-        delete_on_exit: bool = True
+        delete_on_exit: bool = True,
+        name: Optional[str] = None
     ):
-        super(CacheLock, self).__init__()
+        self.active = False
         self._key = key
         self._expire = expire
-        self.cache = caches[cache_alias]
+        self.backend = backend or get_lock_backend()
         self.raise_exception = raise_exception
         self.delete_on_exit = delete_on_exit
+        # The label of the metrics, which defaults to the prefix of the key
+        # (e.g. the task of "task_calculate_simple_moving_average:BRLBTC")
+        self.name = name or key.split(':', 1)[0]
+
+    def record_acquisition(self):
+        LOCK_ACQUISITIONS.inc(
+            name=self.name,
+            result='acquired' if self.active else 'contended'
+        )
 
     def __enter__(self):
         try:
-            self.active = self.cache.add(self._key, True, self._expire)
+            self.active = self.backend.acquire(self._key, self._expire)
         except Exception as e:
             raise LockAcquireError(
                 'Could not acquire a lock. Caused by: {}'.format(e)
             )
 
-        if not self.active and self.raise_exception:
-            raise LockActiveError('For key {key}'.format(key=self._key))
-
-        return self
+        return self._check_acquisition()
 
     def __exit__(self, *args, **kwargs):
         if self.active and self.delete_on_exit:
-            self.delete_cache()
+            self.release()
 
         self.active = False
 
-    def delete_cache(self):
+    async def __aenter__(self):
         try:
-            self.cache.delete(self._key)
+            self.active = await self.backend.acquire_async(
+                self._key, self._expire
+            )
+        except Exception as e:
+            raise LockAcquireError(
+                'Could not acquire a lock. Caused by: {}'.format(e)
+            )
+
+        return self._check_acquisition()
+
+    async def __aexit__(self, *args, **kwargs):
+        if self.active and self.delete_on_exit:
+            await self.release_async()
+
+        self.active = False
+
+    def _check_acquisition(self):
+        self.record_acquisition()
+        if not self.active and self.raise_exception:
+            raise LockActiveError('For key {key}'.format(key=self._key))
+
+        return self
+
+    def release(self):
+        try:
+            self.backend.release(self._key)
         except Exception as e:
             raise LockReleaseError(
                 'Could not release a lock. Caused by: {}'.format(e)
             )
+
+    async def release_async(self):
+        try:
+            await self.backend.release_async(self._key)
+        except Exception as e:
+            raise LockReleaseError(
+                'Could not release a lock. Caused by: {}'.format(e)
+            )
+
+
+class CacheLock(Lock):
+    """
+    A lock held in a Django cache alias whatever the LOCK_BACKEND, for the
+    locks that live with the cache (e.g. the revalidation of its entries)
+    or that are kept after the task
+    """
+
+    def __init__(
+        self,
+        key: str,
+        *,
+        cache_alias: str = 'default',
+        expire=DEFAULT_TIMEOUT,
+        raise_exception: bool = True,
+        delete_on_exit: bool = True,
+        name: Optional[str] = None
+    ):
+        super(CacheLock, self).__init__(
+            key,
+            backend=CacheLockBackend(cache_alias),
+            expire=expire,
+            raise_exception=raise_exception,
+            delete_on_exit=delete_on_exit,
+            name=name,
+        )
+        self.cache = self.backend.cache
+
+    def delete_cache(self):
+        self.release()
+
+
+class AsyncCacheLock(Lock):
+    """
+    The async counterpart of CacheLock, used with "async with" and an async
+    cache (see project.core.caches.get_async_cache)
+
+    Both share the keys of the cache alias, so a lock taken by one of them
+    is seen by the other
+    """
+
+    def __init__(
+        self,
+        key: str,
+        *,
+        cache,
+        expire=DEFAULT_TIMEOUT,
+        raise_exception: bool = True,
+        delete_on_exit: bool = True,
+        name: Optional[str] = None
+    ):
+        super(AsyncCacheLock, self).__init__(
+            key,
+            backend=CacheLockBackend(cache.alias, async_cache=cache),
+            expire=expire,
+            raise_exception=raise_exception,
+            delete_on_exit=delete_on_exit,
+            name=name,
+        )
+        self.cache = cache
+
+    async def delete_cache(self):
+        await self.release_async()
@@ -0,0 +1,130 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Callable
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that calls after_handle after each record and whose stop
+    waits at most timeout seconds
+    """
+
+    def __init__(
+        self,
+        queue_: queue.Queue,
+        handler: logging.Handler,
+        after_handle: Callable[[], None]
+    ):
+        super().__init__(queue_, handler)
+        self.after_handle = after_handle
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        self.after_handle()
+
+    def stop(self, timeout: float = None):
+        if self._thread is None:
+            return
+
+        try:
+            self.queue.put(self._sentinel, timeout=timeout)
+        except queue.Full:
+            pass
+
+        self._thread.join(timeout)
+        self._thread = None
+
+
+class QueueStreamHandler(logging.handlers.QueueHandler):
+    """
+    Writes the log records to a stream from a background thread, so the
+    request and task that log do not wait for the rendering of the
+    formatter or the stream (e.g. stdout read by a slow log collector).
+
+    At most max_size records wait in the queue. When it is full the record
+    is dropped (the number of dropped records is logged later) or, with
+    block, the caller waits for room. On close the queued records are
+    written for up to close_timeout seconds.
+    """
+
+    close_timeout = 5
+
+    def __init__(
+        self,
+        stream=None,
+        max_size: int = 10000,
+        block: bool = False
+    ):
+        super().__init__(queue.Queue(max_size))
+        self.stream_handler = logging.StreamHandler(stream or sys.stderr)
+        self.max_size = max_size
+        self.block = block
+        self._start()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start)
+        atexit.register(self.close)
+
+    def _start(self):
+        self.queue = queue.Queue(self.max_size)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = _QueueListener(
+            self.queue,
+            self.stream_handler,
+            after_handle=self._log_dropped
+        )
+        self.listener.start()
+
+    def setFormatter(self, formatter: logging.Formatter):
+        # The records are formatted by the stream handler, in the thread
+        super().setFormatter(formatter)
+        self.stream_handler.setFormatter(formatter)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merges the arguments into the message now, as they may change
+        before the record is formatted. The records of structlog carry
+        their event dict as the message, which is copied instead.
+        """
+        record = copy.copy(record)
+        if isinstance(record.msg, dict):
+            record.msg = dict(record.msg)
+        else:
+            record.msg = record.getMessage()
+            record.args = None
+
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.block:
+            self.queue.put(record)
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _log_dropped(self):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+
+        if dropped:
+            self.stream_handler.handle(logging.makeLogRecord({
+                'name': __name__,
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': f'{dropped} log records were dropped',
+            }))
+
+    def close(self):
+        self.listener.stop(timeout=self.close_timeout)
+        super().close()
@@ -1,30 +1,25 @@
 # -*- coding: utf-8 -*-
-import socket
+from project.core.correlation import get_correlation_id
 
-from cid.locals import get_cid
-from simple_settings import settings
 
-
-def hostname(logger, log_method, event_dict):
+class StaticFields:
     """
-    Adds the application hostname to the log. Useful when the application has
-    many pods scaled.
+    Adds fields computed once at startup to the logs, such as the
+    application hostname (useful when the application has many pods scaled)
+    and version.
     """
-    event_dict['host'] = socket.gethostname()
-    return event_dict
 
+    def __init__(self, **fields):
+        self.fields = fields
 
-def version(logger, log_method, event_dict):
-    """
-    Adds the application version to the logs.
-    """
-    event_dict['version'] = settings.VERSION
-    return event_dict
+    def __call__(self, logger, log_method, event_dict):
+        event_dict.update(self.fields)
+        return event_dict
 
 
 def correlation(logger, log_method, event_dict):
     """
     Adds the application correlation id to the logs.
     """
-    event_dict['correlation'] = get_cid()
+    event_dict['correlation'] = get_correlation_id()
     return event_dict
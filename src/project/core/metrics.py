@@ -0,0 +1,335 @@
+import atexit
+import bisect
+import glob
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from simple_settings import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """
+    Values of a metric aggregated in the process, by the values of its
+    labels
+    """
+
+    type = ''
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = ()
+    ):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def get_label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            values = [
+                [list(label_values), list(values)]
+                for label_values, values in self.values.items()
+            ]
+
+        return {
+            'type': self.type,
+            'description': self.description,
+            'labels': list(self.labels),
+            'values': values,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.values = {}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        label_values = self.get_label_values(labels)
+        with self._lock:
+            values = self.values.setdefault(label_values, [0])
+            values[0] += amount
+
+
+class Histogram(Metric):
+    """
+    Counts the observed values by bucket (upper bound), with their sum and
+    count, as the Prometheus histograms
+    """
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        label_values = self.get_label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self.values.get(label_values)
+            if values is None:
+                values = self.values[label_values] = (
+                    [0] * (len(self.buckets) + 3)
+                )
+
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observes the duration of the block in seconds, even when it fails
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict:
+        return {**super().snapshot(), 'buckets': list(self.buckets)}
+
+
+class Registry:
+    """
+    Metrics of the process.
+
+    Each process (web workers, Celery workers) keeps its own values. When a
+    directory is configured the values are also written to it periodically,
+    one file per process named by its host name and PID (the directory may
+    be shared by containers, which reuse the PIDs), and collect merges the
+    files of all processes. The file is removed when the process exits, and
+    the files not written for stale_intervals flush intervals, of the
+    processes that ended without removing them (e.g. killed), are removed
+    by collect.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        flush_interval: float = 10,
+        stale_intervals: int = 3
+    ):
+        self.metrics: Dict[str, Metric] = {}
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_intervals = stale_intervals
+        self._thread = None
+        self._closed = threading.Event()
+
+    def counter(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        if self.directory and self._thread is None:
+            self._start_flush()
+
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+        }
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def collect(self) -> Dict[str, Dict]:
+        """
+        Returns the values of the process or, with a directory, the merged
+        values of the processes that wrote to it
+        """
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush()
+        snapshots = []
+        stale_before = time.time() - self.flush_interval * self.stale_intervals
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    self._remove(path)
+                    continue
+
+                with open(path, 'rb') as file:
+                    snapshots.append(orjson.loads(file.read()))
+            except (OSError, ValueError):
+                continue
+
+        return merge_snapshots(snapshots)
+
+    def flush(self):
+        """
+        Writes the values of the process to its file of the directory
+        """
+        path = self._get_path()
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(orjson.dumps(self.snapshot()))
+        os.replace(temporary_path, path)
+
+    def close(self):
+        """
+        Stops writing the values of the process and removes its file, so
+        they are no longer merged by collect
+        """
+        self._closed.set()
+        if self.directory:
+            self._remove(self._get_path())
+
+    def _get_path(self) -> str:
+        return os.path.join(
+            self.directory,
+            f'{socket.gethostname()}-{os.getpid()}.json'
+        )
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _start_flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_flush,
+            name='metrics-flush',
+            daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run_flush(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _after_fork(self):
+        # The child process starts with no values and its own file
+        self.reset()
+        if self._thread is not None:
+            self._thread = None
+            self._start_flush()
+
+
+def merge_snapshots(snapshots: List[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """
+    Sums the values of the same metric and labels of several processes
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            for label_values, values in metric['values']:
+                key = tuple(label_values)
+                current = target['values'].get(key)
+                target['values'][key] = (
+                    list(values) if current is None
+                    else [a + b for a, b in zip(current, values)]
+                )
+
+    for metric in merged.values():
+        metric['values'] = [
+            [list(key), values] for key, values in metric['values'].items()
+        ]
+
+    return merged
+
+
+def render(snapshot: Dict[str, Dict]) -> str:
+    """
+    Renders the metrics in the Prometheus text format
+    """
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f'# HELP {name} {metric["description"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        for label_values, values in sorted(metric['values']):
+            labels = list(zip(metric['labels'], label_values))
+            if metric['type'] == 'counter':
+                lines.append(f'{name}{_render_labels(labels)} {values[0]}')
+                continue
+
+            cumulative = 0
+            bounds = [*metric['buckets'], '+Inf']
+            for bound, count in zip(bounds, values[:-2]):
+                cumulative += count
+                bucket_labels = _render_labels([*labels, ('le', bound)])
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{_render_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_count{_render_labels(labels)} {values[-1]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _render_labels(labels: List[Tuple[str, object]]) -> str:
+    if not labels:
+        return ''
+
+    content = ','.join(
+        '{}="{}"'.format(
+            label,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for label, value in labels
+    )
+    return f'{{{content}}}'
+
+
+registry = Registry(
+    directory=settings.METRICS['directory'],
+    flush_interval=settings.METRICS['flush_interval'],
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._after_fork)
@@ -1,47 +1,78 @@
-from django.utils import timezone
+import random
+import time
 
 import orjson
 import structlog
+from simple_settings import settings
+
+from project.core.middlewares.base import BaseMiddleware
 
 logger = structlog.get_logger()
 
 
-class AccessLoggingMiddleware:
+class AccessLoggingMiddleware(BaseMiddleware):
+    """
+    Logs the method, path, status and duration of the requests.
+
+    Only a sample of the requests of the included paths is logged (server
+    errors are always logged) and the bodies are logged only when enabled,
+    truncated to a maximum size. See ACCESS_LOGGING in the settings.
+    """
+
     def __init__(self, get_response):
-        self.get_response = get_response
+        super().__init__(get_response)
+        config = settings.ACCESS_LOGGING
+        self.sample_rate = config['sample_rate']
+        self.log_body = config['body']
+        self.max_body_size = config['max_body_size']
+        self.include_paths = tuple(config['include_paths'])
+        self.exclude_paths = tuple(config['exclude_paths'])
 
-    def __call__(self, request):
-        start_time = timezone.now()
+    def process_request(self, request):
+        request.access_logging_sampled = (
+            self.is_path_logged(request.path) and
+            random.random() < self.sample_rate
+        )
+        request.access_logging_start_time = time.perf_counter()
 
-        response = self.get_response(request)
+    def process_response(self, request, response):
+        if not (
+            request.access_logging_sampled or
+            response.status_code >= 500
+        ):
+            return response
 
-        end_time = timezone.now()
-        time_spent = (end_time - start_time).total_seconds()
+        time_spent = time.perf_counter() - request.access_logging_start_time
         content_type = response.headers.get('Content-Type')
 
+        fields = {}
+        if self.log_body and 'application/json' in (content_type or ''):
+            fields['request_body'] = self.extract_body(request.body)
+            if not response.streaming:
+                fields['response_body'] = self.extract_body(response.content)
+
         logger.info(
             'Request finished',
             path=request.path,
             method=request.method,
             status_code=response.status_code,
-            request_body=(
-                self.extract_body(request.body)
-                if 'application/json' in content_type
-                else None
-            ),
-            response_body=(
-                self.extract_body(response.content)
-                if 'application/json' in content_type
-                else None
-            ),
             content_type=content_type,
-            time_spent=round(time_spent, 2),
+            time_spent=round(time_spent, 4),
+            **fields,
         )
 
         return response
 
-    @staticmethod
-    def extract_body(body_text):
+    def is_path_logged(self, path: str) -> bool:
+        if self.include_paths and not path.startswith(self.include_paths):
+            return False
+
+        return not path.startswith(self.exclude_paths)
+
+    def extract_body(self, body_text: bytes):
+        if len(body_text) > self.max_body_size:
+            return body_text[:self.max_body_size].decode(errors='replace')
+
         try:
             return orjson.loads(body_text)
         except Exception:
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Optional
+
+from django.http import HttpRequest, HttpResponse
+
+
+class BaseMiddleware:
+    """
+    Base of the middlewares that run in both sync and async chains.
+
+    Unlike Django's MiddlewareMixin, the hooks are called inline on async
+    requests, so they must not block; in return an async request does not
+    leave the event loop to pass through the middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Marks the instance as a coroutine function to Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+
+        return self.process_response(request, response)
+
+    async def __acall__(self, request: HttpRequest):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+
+        return self.process_response(request, response)
+
+    def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
+        return None
+
+    def process_response(
+        self,
+        request: HttpRequest,
+        response: HttpResponse
+    ) -> HttpResponse:
+        return response
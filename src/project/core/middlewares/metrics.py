@@ -0,0 +1,43 @@
+import time
+
+from project.core.metrics import registry
+from project.core.middlewares.base import BaseMiddleware
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds',
+    'Time until the response of the request is returned, by route',
+    labels=('method', 'route'),
+)
+REQUESTS = registry.counter(
+    'http_requests_total',
+    'Requests by route and status',
+    labels=('method', 'route', 'status'),
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Records the duration and status of the requests by route (the URL
+    pattern, so the values of the path parameters are not labels)
+    """
+
+    def process_request(self, request):
+        request.metrics_start_time = time.perf_counter()
+
+    def process_response(self, request, response):
+        time_spent = time.perf_counter() - request.metrics_start_time
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+
+        REQUEST_DURATION.observe(
+            time_spent,
+            method=request.method,
+            route=route
+        )
+        REQUESTS.inc(
+            method=request.method,
+            route=route,
+            status=response.status_code
+        )
+
+        return response
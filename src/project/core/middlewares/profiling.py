@@ -0,0 +1,140 @@
+import asyncio
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+import structlog
+from simple_settings import settings
+
+from project.core.middlewares.base import BaseMiddleware
+from project.core.profiling import (
+    SamplingProfiler,
+    format_server_timing,
+    install_database_timing,
+    start_timings,
+    stop_timings
+)
+
+logger = structlog.get_logger()
+
+PROFILING_SALT = 'project.core.middlewares.profiling'
+
+
+def get_profiling_token() -> str:
+    """
+    Returns a value of the X-Profile header that profiles the requests
+    until it expires (see PROFILING max_age)
+    """
+    return signing.TimestampSigner(salt=PROFILING_SALT).sign('profile')
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """
+    Profiles a request when it has a valid X-Profile header (see
+    get_profiling_token) or is drawn by the sample rate, writing the
+    profile to the directory of PROFILING and adding a Server-Timing header
+    with the time spent in the database, cache and serialization.
+
+    cProfile records every function run by the thread that enabled it,
+    which on an async chain is the event loop running the other requests as
+    well, so the async requests are always profiled by the SamplingProfiler.
+    Only one request is profiled at a time in each process. Removed from the
+    chain when PROFILING is not enabled.
+    """
+
+    _profiling = threading.Lock()
+
+    def __init__(self, get_response):
+        config = settings.PROFILING
+        if not config['enabled']:
+            raise MiddlewareNotUsed()
+
+        super().__init__(get_response)
+        self.mode = config['mode']
+        self.interval = config['interval']
+        self.directory = config['directory']
+        self.sample_rate = config['sample_rate']
+        self.max_age = config['max_age']
+        self.server_timing = config['server_timing']
+        self.signer = signing.TimestampSigner(salt=PROFILING_SALT)
+        self.sampling = (
+            self.mode == 'sampling' or
+            asyncio.iscoroutinefunction(get_response)
+        )
+
+        os.makedirs(self.directory, exist_ok=True)
+        connection_created.connect(install_database_timing)
+        for connection in connections.all():
+            install_database_timing(sender=None, connection=connection)
+
+    def process_request(self, request):
+        request.profiler = None
+        if self.is_profiled(request) and self._profiling.acquire(False):
+            request.profiler = self.start_profiler()
+
+        request.profiling_timings = None
+        if request.profiler is not None or self.server_timing:
+            request.profiling_timings = start_timings()
+            request.profiling_start_time = time.perf_counter()
+
+    def process_response(self, request, response):
+        if request.profiling_timings is not None:
+            timings = stop_timings(request.profiling_timings)
+            timings['total'] = (
+                time.perf_counter() - request.profiling_start_time
+            )
+            response['Server-Timing'] = format_server_timing(timings)
+
+        if request.profiler is not None:
+            try:
+                self.save_profile(request)
+            finally:
+                self._profiling.release()
+
+        return response
+
+    def is_profiled(self, request) -> bool:
+        token = request.headers.get('X-Profile')
+        if token:
+            try:
+                self.signer.unsign(token, max_age=self.max_age)
+                return True
+            except signing.BadSignature:
+                logger.warning('Invalid profiling token', path=request.path)
+
+        return random.random() < self.sample_rate
+
+    def start_profiler(self):
+        if self.sampling:
+            profiler = SamplingProfiler(self.interval)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        return profiler
+
+    def save_profile(self, request):
+        profiler = request.profiler
+        if self.sampling:
+            profiler.stop()
+            extension = 'collapsed'
+        else:
+            profiler.disable()
+            extension = 'pstats'
+
+        name = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_')
+        path = os.path.join(
+            self.directory,
+            f'{time.time_ns()}_{request.method}_{name}.{extension}'
+        )
+        profiler.dump_stats(path)
+        logger.info('Request profiled', path=request.path, profile=path)
@@ -0,0 +1,98 @@
+from django.middleware import clickjacking, common, locale, security
+
+from cid.locals import generate_new_cid
+from cid.middleware import CidMiddleware as BaseCidMiddleware
+from corsheaders.middleware import CorsMiddleware as BaseCorsMiddleware
+from whitenoise.middleware import (
+    WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+)
+
+from project.core.correlation import get_correlation_id, set_correlation_id
+from project.core.middlewares.base import BaseMiddleware
+
+
+class CidMiddleware(BaseMiddleware, BaseCidMiddleware):
+    """
+    django-cid middleware that also runs in async chains. The correlation id
+    is kept in the context variable of project.core.correlation instead of
+    the thread local of django-cid, so concurrent async requests, handled by
+    the same thread, do not share it.
+    """
+
+    def __init__(self, get_response):
+        BaseCidMiddleware.__init__(self, get_response)
+        BaseMiddleware.__init__(self, get_response)
+
+    def process_request(self, request):
+        cid = generate_new_cid(request.META.get(self.cid_request_header))
+        request.correlation_id = cid
+        set_correlation_id(cid)
+
+    def process_response(self, request, response):
+        cid = get_correlation_id()
+        if cid and self.cid_response_header:
+            response[self.cid_response_header] = cid
+
+        return response
+
+
+class WhiteNoiseMiddleware(BaseMiddleware, BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that also runs in async chains. Only the requests
+    of static files are answered by it, the others are passed on.
+    """
+
+    def __init__(self, get_response):
+        BaseWhiteNoiseMiddleware.__init__(self, get_response)
+        BaseMiddleware.__init__(self, get_response)
+
+    def process_request(self, request):
+        return BaseWhiteNoiseMiddleware.process_request(self, request)
+
+
+class InlineMiddleware(BaseMiddleware):
+    """
+    Runs the process_request and process_response hooks of a Django
+    MiddlewareMixin inline, so an async request does not go to the sync
+    thread to pass through it. Only for middlewares whose hooks do not
+    block (headers and redirects); the other hooks (e.g. process_view) are
+    not run.
+    """
+
+    middleware_class = None
+
+    def __init__(self, get_response):
+        super(InlineMiddleware, self).__init__(get_response)
+        self.middleware = self.middleware_class(get_response)
+
+    def process_request(self, request):
+        if hasattr(self.middleware, 'process_request'):
+            return self.middleware.process_request(request)
+
+    def process_response(self, request, response):
+        if hasattr(self.middleware, 'process_response'):
+            return self.middleware.process_response(request, response)
+
+        return response
+
+
+class SecurityMiddleware(InlineMiddleware):
+    middleware_class = security.SecurityMiddleware
+
+
+class CorsMiddleware(InlineMiddleware):
+    # Its process_view only replaces the referer, which process_request
+    # already does (CORS_REPLACE_HTTPS_REFERER)
+    middleware_class = BaseCorsMiddleware
+
+
+class CommonMiddleware(InlineMiddleware):
+    middleware_class = common.CommonMiddleware
+
+
+class XFrameOptionsMiddleware(InlineMiddleware):
+    middleware_class = clickjacking.XFrameOptionsMiddleware
+
+
+class LocaleMiddleware(InlineMiddleware):
+    middleware_class = locale.LocaleMiddleware
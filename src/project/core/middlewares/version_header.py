@@ -1,16 +1,14 @@
 from simple_settings import settings
 
+from project.core.middlewares.base import BaseMiddleware
 
-class VersionHeaderMiddleware:
+
+class VersionHeaderMiddleware(BaseMiddleware):
     """
     Add a X-API-Version header to the response.
     """
 
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        response = self.get_response(request)
+    def process_response(self, request, response):
         response['X-API-Version'] = settings.VERSION
 
         return response
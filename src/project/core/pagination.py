@@ -0,0 +1,33 @@
+import base64
+import binascii
+
+from django.http import HttpRequest
+
+
+def encode_cursor(value: int) -> str:
+    """
+    Returns an opaque cursor of the key of the last item of a page
+    """
+    return base64.urlsafe_b64encode(str(value).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Returns the key of the last item of the previous page
+    """
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        return int(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def get_next_link(request: HttpRequest, cursor: str) -> str:
+    """
+    Returns the Link header of the next page, keeping the other parameters
+    of the request
+    """
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    url = request.build_absolute_uri(request.path)
+    return f'<{url}?{query.urlencode()}>; rel="next"'
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import functools
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = (
+    contextvars.ContextVar('timings', default=None)
+)
+# Time spent in the timings nested in the current one, which is not added
+# to the current category (e.g. the queries of a lazy QuerySet evaluated
+# while rendering count as db, not serialization)
+_nested: contextvars.ContextVar[Optional[List[float]]] = (
+    contextvars.ContextVar('nested_timings', default=None)
+)
+
+
+def start_timings() -> contextvars.Token:
+    """
+    Starts recording the time spent by category (see timing) in the current
+    context, which is copied to the threads of sync_to_async
+    """
+    return _timings.set(defaultdict(float))
+
+
+def stop_timings(token: contextvars.Token) -> Dict[str, float]:
+    timings = _timings.get()
+    _timings.reset(token)
+    return dict(timings or {})
+
+
+@contextmanager
+def timing(name: str) -> Iterator[None]:
+    """
+    Adds the time spent in the block, except the time of nested timings, to
+    the category of the current timings, when they are being recorded
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    nested = [0.0]
+    token = _nested.set(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _nested.reset(token)
+        timings[name] += elapsed - nested[0]
+
+        parent = _nested.get()
+        if parent is not None:
+            parent[0] += elapsed
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator version of timing, for functions and coroutine functions
+    """
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with timing(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timing(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def time_database_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper (see connection.execute_wrapper) that adds the
+    time of the queries to the db timing
+    """
+    with timing('db'):
+        return execute(sql, params, many, context)
+
+
+def install_database_timing(sender, connection, **kwargs):
+    """
+    Receiver of connection_created that times every query of the connection
+    """
+    if time_database_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_database_query)
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """
+    Formats the timings, in seconds, as a Server-Timing header
+    """
+    return ', '.join(
+        f'{name};dur={seconds * 1000:.1f}'
+        for name, seconds in timings.items()
+    )
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads of the process every interval seconds
+    and counts them as collapsed stacks (one line per stack, the frames
+    separated by ";" from the thread name to the leaf, and the number of
+    samples), the input of flame graph tools.
+
+    The threads of sync_to_async and of the other requests in progress are
+    sampled as well, which is the only way to see the database work of an
+    async request.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name='sampling-profiler',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {
+                thread.ident: thread.name
+                for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                name = names.get(thread_id, thread_id)
+                self.stacks[f'{name};{self.collapse(frame)}'] += 1
+
+    @staticmethod
+    def collapse(frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(
+                f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+            )
+            frame = frame.f_back
+
+        return ';'.join(reversed(frames))
+
+    def dump_stats(self, path: str):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
@@ -0,0 +1,175 @@
+import asyncio
+import functools
+from typing import Dict, Optional, Set
+
+from django.core.cache import caches
+
+import structlog
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+
+from project.core.caches import AsyncRedisCache, get_async_cache
+
+logger = structlog.get_logger()
+
+
+def publish(alias: str, channel: str, message: bytes) -> int:
+    """
+    Publishes the message on a channel of the Redis server of the cache
+    alias, returning the number of subscribers that received it.
+
+    Other backends have no pub/sub and the message is dropped.
+    """
+    cache = caches[alias]
+    if not isinstance(cache, RedisCache):
+        return 0
+
+    client = get_redis_connection(alias)
+    return client.publish(cache.make_key(channel), message)
+
+
+class Subscriber:
+    """
+    The subscriptions of the process to the channels of the Redis server of
+    a cache alias: a single pub/sub connection, read by a single task, whose
+    messages are fanned out to a queue per Subscription, so the connections
+    to Redis do not grow with the clients.
+
+    The connection belongs to the event loop that opened it, and a new loop
+    (e.g. of the tests) starts over. With other backends no message is ever
+    received.
+    """
+
+    # Messages kept for a slow client, whose oldest messages are dropped
+    queue_size = 100
+    read_timeout = 1.0
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self._loop = None
+        self._pubsub = None
+        self._reader = None
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pubsub = None
+            self._reader = None
+            self._queues = {}
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        """
+        Returns the queue that receives the messages of the channel
+        """
+        self._check_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        cache = get_async_cache(self.alias)
+        if not isinstance(cache, AsyncRedisCache):
+            return queue
+
+        key = cache.make_key(channel)
+        queues = self._queues.setdefault(key, set())
+        queues.add(queue)
+        if len(queues) == 1:
+            if self._pubsub is None:
+                self._pubsub = cache.client.pubsub()
+
+            await self._pubsub.subscribe(key)
+
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.ensure_future(self._read())
+
+        return queue
+
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        self._check_loop()
+        cache = get_async_cache(self.alias)
+        if not isinstance(cache, AsyncRedisCache):
+            return
+
+        key = cache.make_key(channel)
+        queues = self._queues.get(key, set())
+        queues.discard(queue)
+        if not queues and key in self._queues:
+            del self._queues[key]
+            await self._pubsub.unsubscribe(key)
+
+    async def _read(self):
+        """
+        Fans the messages out while there are subscriptions
+        """
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.read_timeout
+                )
+            except Exception:
+                logger.warning(
+                    'Could not read the pub/sub messages',
+                    alias=self.alias,
+                    exc_info=True,
+                )
+                await asyncio.sleep(self.read_timeout)
+                continue
+
+            if message is None:
+                continue
+
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+
+            for queue in self._queues.get(channel, ()):
+                if queue.full():
+                    queue.get_nowait()
+
+                queue.put_nowait(message['data'])
+
+
+@functools.lru_cache(maxsize=None)
+def get_subscriber(alias: str) -> Subscriber:
+    """
+    Returns the subscriber of the process to the cache alias
+    """
+    return Subscriber(alias)
+
+
+class Subscription:
+    """
+    Async subscription to a channel of the Redis server of the cache alias,
+    through the subscriber of the process, used as an async context manager:
+
+        async with Subscription('default', 'channel') as subscription:
+            message = await subscription.get_message(timeout=15)
+
+    With other backends no message is ever received.
+    """
+
+    def __init__(self, alias: str, channel: str):
+        self.alias = alias
+        self.channel = channel
+        self._queue = None
+
+    async def __aenter__(self) -> 'Subscription':
+        self._queue = await get_subscriber(self.alias).subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._queue is not None:
+            await get_subscriber(self.alias).unsubscribe(
+                self.channel,
+                self._queue
+            )
+            self._queue = None
+
+    async def get_message(self, timeout: float) -> Optional[bytes]:
+        """
+        Waits up to timeout seconds for the next message of the channel
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
@@ -1,12 +1,26 @@
-from typing import Any
+import hashlib
+import struct
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 
+import msgpack
 import orjson
 from ninja.renderers import BaseRenderer
 
+from project.core.streaming import get_chunks
+
 
 class RendererDefault(BaseRenderer):
+    """
+    Renders the responses of the NinjaAPI and, as the renderers of the other
+    formats, encodes database rows for render_response (render_rows and
+    stream_rows)
+    """
+
     media_type = 'application/json'
 
     def render(
@@ -17,3 +31,220 @@ class RendererDefault(BaseRenderer):
         response_status: int
     ) -> bytes:
         return orjson.dumps(data)
+
+    def render_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str]
+    ) -> bytes:
+        """
+        Encodes database rows (tuples in the order of the columns) as a list
+        of objects, converting decimals to floats
+        """
+        return orjson.dumps(
+            [dict(zip(columns, row)) for row in rows],
+            default=float
+        )
+
+    def stream_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str],
+        chunk_size: int
+    ) -> Iterator[bytes]:
+        """
+        Encodes the rows incrementally, chunk_size rows at a time, yielding
+        the same content as render_rows
+        """
+        yield b'['
+        separator = b''
+        for chunk in get_chunks(rows, chunk_size):
+            yield separator + self.render_rows(chunk, columns)[1:-1]
+            separator = b','
+        yield b']'
+
+
+class RendererNDJson(BaseRenderer):
+    """
+    One JSON object per line
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def render_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str]
+    ) -> bytes:
+        return b''.join(
+            orjson.dumps(dict(zip(columns, row)), default=float) + b'\n'
+            for row in rows
+        )
+
+    def stream_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str],
+        chunk_size: int
+    ) -> Iterator[bytes]:
+        for chunk in get_chunks(rows, chunk_size):
+            yield self.render_rows(chunk, columns)
+
+
+class RendererColumnar(BaseRenderer):
+    """
+    JSON with one list of values per field instead of one object per item,
+    which can not be streamed (it has no stream_rows)
+    """
+
+    media_type = 'application/json'
+
+    def render_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str]
+    ) -> bytes:
+        return orjson.dumps(get_columns(rows, columns), default=float)
+
+
+class RendererMsgPack(RendererColumnar):
+    """
+    MessagePack with one list of values per field, which can not be
+    streamed either
+    """
+
+    media_type = 'application/msgpack'
+    charset = None
+
+    def render_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str]
+    ) -> bytes:
+        return msgpack.packb(get_columns(rows, columns), default=float)
+
+
+class RendererBinary(RendererColumnar):
+    """
+    Rows packed as little-endian values: the first column as int64 and the
+    others as float64, with the names of the columns in X-Columns header.
+    Unlike the other columnar formats, it can be streamed.
+    """
+
+    media_type = 'application/octet-stream'
+    charset = None
+
+    def render_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str]
+    ) -> bytes:
+        row_struct = struct.Struct('<q' + 'd' * (len(columns) - 1))
+        return b''.join(
+            row_struct.pack(row[0], *map(float, row[1:]))
+            for row in rows
+        )
+
+    def stream_rows(
+        self,
+        rows: Iterable[Sequence],
+        columns: Sequence[str],
+        chunk_size: int
+    ) -> Iterator[bytes]:
+        for chunk in get_chunks(rows, chunk_size):
+            yield self.render_rows(chunk, columns)
+
+
+def get_columns(
+    rows: Iterable[Sequence],
+    columns: Sequence[str]
+) -> Dict[str, List]:
+    """
+    Transposes the rows into a list of values by column
+    """
+    values = [[] for _ in columns]
+    for row in rows:
+        for column_values, value in zip(values, row):
+            column_values.append(value)
+
+    return dict(zip(columns, values))
+
+
+def get_content_type(renderer: BaseRenderer) -> str:
+    if renderer.charset is None:
+        return renderer.media_type
+
+    return f'{renderer.media_type}; charset={renderer.charset}'
+
+
+def render_response(
+    content: bytes,
+    *,
+    status: int = HTTPStatus.OK,
+    etag: Optional[str] = None,
+    max_age: Optional[int] = None,
+    renderer: BaseRenderer = RendererDefault
+) -> HttpResponse:
+    """
+    Builds the response of a content already encoded by the renderer,
+    skipping the schema validation and rendering of the operation.
+    """
+    response = HttpResponse(
+        content,
+        status=status,
+        content_type=get_content_type(renderer),
+    )
+    return _set_validators(response, etag=etag, max_age=max_age)
+
+
+def render_not_modified(
+    *,
+    etag: str,
+    max_age: Optional[int] = None
+) -> HttpResponse:
+    """
+    Builds the 304 response of a conditional request, without a body
+    """
+    response = HttpResponse(status=HTTPStatus.NOT_MODIFIED)
+    del response['Content-Type']
+    return _set_validators(response, etag=etag, max_age=max_age)
+
+
+def get_etag(value: str) -> str:
+    """
+    Returns a strong ETag derived from a value that identifies the content
+    (e.g. a versioned cache key)
+    """
+    digest = hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def is_not_modified(request: HttpRequest, etag: str) -> bool:
+    """
+    Checks the If-None-Match header of the request against the ETag, with
+    the weak comparison required for this header
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+
+    etags = parse_etags(header)
+    return '*' in etags or any(
+        item.removeprefix('W/') == etag
+        for item in etags
+    )
+
+
+def _set_validators(
+    response: HttpResponse,
+    *,
+    etag: Optional[str],
+    max_age: Optional[int]
+) -> HttpResponse:
+    if etag is not None:
+        response['ETag'] = etag
+
+    if max_age is not None:
+        patch_cache_control(response, public=True, max_age=max_age)
+
+    return response
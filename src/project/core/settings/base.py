@@ -1,4 +1,5 @@
 import os
+import socket
 import sys
 from distutils.util import strtobool
 
@@ -7,8 +8,6 @@ from django.utils.translation import gettext_lazy as _
 
 import dj_database_url
 import structlog
-from celery.schedules import crontab
-from kombu import Exchange, Queue
 
 from project import __version__
 from project.core.logging import processors
@@ -25,7 +24,6 @@ SECRET_KEY = os.getenv('SECRET_KEY', '65145e56-8c4f-4434-b451-6e0e3214640e')
 DEBUG = bool(strtobool(os.getenv('DEBUG', 'False')))
 
 WSGI_APPLICATION = 'project.core.wsgi.application'
-ROOT_URLCONF = 'project.urls'
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(';')
 
 VERSION = __version__
@@ -70,6 +68,15 @@ CID_RESPONSE_HEADER = 'X-Correlation-ID'
 # Cors (https://github.com/adamchainz/django-cors-headers)
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
+# Response headers readable by the browsers of other origins (pagination,
+# conditional requests, fields of the binary formats and cache status)
+CORS_EXPOSE_HEADERS = [
+    'ETag',
+    'Link',
+    'X-Cache-Status',
+    'X-Columns',
+    'X-Next-Cursor',
+]
 
 # Django templates settings (https://docs.djangoproject.com/en/3.2/topics/templates) # noqa
 TEMPLATES = [
@@ -91,56 +98,102 @@ TEMPLATES = [
     },
 ]
 
+# Role of the process, which selects the apps, middlewares and settings it
+# loads: web (Gunicorn), worker (Celery worker), beat (Celery beat) or all
+# (management commands and tests)
+PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'all')
+if PROCESS_ROLE not in ('web', 'worker', 'beat', 'all'):
+    raise ValueError(f'Invalid PROCESS_ROLE "{PROCESS_ROLE}"')
+
+IS_WEB_PROCESS = PROCESS_ROLE in ('web', 'all')
+IS_WORKER_PROCESS = PROCESS_ROLE in ('worker', 'all')
+IS_BEAT_PROCESS = PROCESS_ROLE in ('beat', 'all')
+
+# Only the web process resolves URLs (the system checks run by the Celery
+# worker would import every view)
+if IS_WEB_PROCESS:
+    ROOT_URLCONF = 'project.urls'
+
 # Django apps settings
 DEFAULT_APPS = [
     'django.contrib.auth',
     'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
 ]
-if ADMIN_ENABLED:
-    DEFAULT_APPS.append('django.contrib.admin')
+if IS_WEB_PROCESS:
+    DEFAULT_APPS += [
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    ]
+    if ADMIN_ENABLED:
+        DEFAULT_APPS.append('django.contrib.admin')
 
 THIRD_PARTY_APPS = [
-    'corsheaders',
-    'django_extensions',
     'django_dbconn_retry',
-    'django_celery_beat',
     'cid.apps.CidAppConfig',
 ]
-
+if IS_WEB_PROCESS:
+    THIRD_PARTY_APPS.append('corsheaders')
+if IS_BEAT_PROCESS or (IS_WEB_PROCESS and ADMIN_ENABLED):
+    # The periodic tasks are also edited in the admin
+    THIRD_PARTY_APPS.append('django_celery_beat')
+if PROCESS_ROLE == 'all':
+    # Development commands only (e.g. shell_plus)
+    THIRD_PARTY_APPS.append('django_extensions')
+
+# Apps of every role (core holds the commands that are not of an indicator)
 LOCAL_APPS = [
-    'project.apps.ping.apps.PingConfig',
+    'project.apps.core.apps.CoreConfig',
     'project.apps.indicators.mms.apps.MmsConfig',
 ]
+if IS_WEB_PROCESS:
+    LOCAL_APPS = [
+        'project.apps.ping.apps.PingConfig',
+        'project.apps.metrics.apps.MetricsConfig',
+    ] + LOCAL_APPS
 
 INSTALLED_APPS = DEFAULT_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # Django middlewares settings
+# Async capable versions of the Django and django-cors-headers middlewares
 DEFAULT_MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
+    'project.core.middlewares.third_party.SecurityMiddleware',
+    'project.core.middlewares.third_party.CorsMiddleware',
+    'project.core.middlewares.third_party.CommonMiddleware',
+    'project.core.middlewares.third_party.XFrameOptionsMiddleware',
+    'project.core.middlewares.third_party.LocaleMiddleware',
+]
+
+# Only the admin uses the session, the CSRF protection, the user and the
+# messages. Their hooks run in the sync thread on async requests (about 8
+# hops a request), so the processes that serve the api should disable it
+ADMIN_MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.locale.LocaleMiddleware',
 ]
+if ADMIN_ENABLED:
+    DEFAULT_MIDDLEWARE += ADMIN_MIDDLEWARE
 
+# Async capable versions of whitenoise and django-cid middlewares
 THIRD_PARTY_MIDDLEWARE = [
-    'whitenoise.middleware.WhiteNoiseMiddleware',
-    'cid.middleware.CidMiddleware',
+    'project.core.middlewares.third_party.WhiteNoiseMiddleware',
+    'project.core.middlewares.third_party.CidMiddleware',
 ]
 
 LOCAL_MIDDLEWARE = [
+    'project.core.middlewares.metrics.MetricsMiddleware',
+    'project.core.middlewares.profiling.ProfilingMiddleware',
     'project.core.middlewares.version_header.VersionHeaderMiddleware',
     'project.core.middlewares.access_logging.AccessLoggingMiddleware',
 ]
 
-MIDDLEWARE = DEFAULT_MIDDLEWARE + THIRD_PARTY_MIDDLEWARE + LOCAL_MIDDLEWARE
+# Only the web process handles requests
+MIDDLEWARE = (
+    DEFAULT_MIDDLEWARE + THIRD_PARTY_MIDDLEWARE + LOCAL_MIDDLEWARE
+    if IS_WEB_PROCESS else []
+)
 
 # Redis connection settings (https://github.com/jazzband/django-redis)
 CACHES = {
@@ -158,6 +211,20 @@ CACHES = {
             }
         }
     },
+    'response': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv(
+            'REDIS_URL', 'redis://127.0.0.1:6379/0'
+        ).split(';'),
+        'KEY_PREFIX': 'response',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SERIALIZER': 'project.core.caches.BytesSerializer',
+            'CONNECTION_POOL_KWARGS': {
+                'retry_on_timeout': True
+            }
+        }
+    },
     'lock': {
         'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': os.getenv(
@@ -172,9 +239,67 @@ CACHES = {
         }
     },
 }
+# Backend of the locks held while a task runs (see project.core.locks):
+# cache (the Redis of the lock cache alias), postgres (advisory locks in the
+# session of the default database) or local (in the process, for a single
+# worker and the tests)
+LOCK_BACKENDS = {
+    'cache': {
+        'BACKEND': 'project.core.locks.CacheLockBackend',
+        'OPTIONS': {'cache_alias': 'lock'},
+    },
+    'postgres': {
+        'BACKEND': 'project.core.locks.PostgresLockBackend',
+        'OPTIONS': {'database_alias': 'default'},
+    },
+    'local': {
+        'BACKEND': 'project.core.locks.LocalLockBackend',
+        'OPTIONS': {},
+    },
+}
+LOCK_BACKEND = os.getenv('LOCK_BACKEND', 'cache')
+if LOCK_BACKEND not in LOCK_BACKENDS:
+    raise ValueError(f'Invalid LOCK_BACKEND "{LOCK_BACKEND}"')
 CACHE_LIFETIME = {
     'mms_retrieve': int(os.getenv('CACHE_LIFETIME_MMS_RETRIEVE', 600))
 }
+# Time that an expired entry can still be returned while it is refreshed
+CACHE_STALE_LIFETIME = {
+    'mms_retrieve': int(os.getenv('CACHE_STALE_LIFETIME_MMS_RETRIEVE', 3600))
+}
+# Number of rows read from the database and written at a time when streaming
+STREAM_CHUNK_SIZE = {
+    'mms_retrieve': int(os.getenv('STREAM_CHUNK_SIZE_MMS_RETRIEVE', 2000))
+}
+# Max-age of the Cache-Control header of the responses whose range can still
+# receive new data (current) or not (past)
+HTTP_CACHE_MAX_AGE = {
+    'mms_retrieve': {
+        'current': int(
+            os.getenv('HTTP_CACHE_MAX_AGE_MMS_RETRIEVE_CURRENT', 60)
+        ),
+        'past': int(os.getenv('HTTP_CACHE_MAX_AGE_MMS_RETRIEVE_PAST', 86400)),
+    }
+}
+# Seconds between the heartbeats of the server-sent events connections
+EVENTS_HEARTBEAT = {
+    'mms_latest': int(os.getenv('EVENTS_HEARTBEAT_MMS_LATEST', 15))
+}
+# In-process cache in front of Redis for the hottest responses of each worker
+LOCAL_CACHE = {
+    'enabled': bool(strtobool(os.getenv('LOCAL_CACHE_ENABLED', 'False'))),
+    'max_size': int(os.getenv('LOCAL_CACHE_MAX_SIZE', 32 * 1024 * 1024)),
+    'lifetime': int(os.getenv('LOCAL_CACHE_LIFETIME', 60)),
+    'version_lifetime': float(os.getenv('LOCAL_CACHE_VERSION_LIFETIME', 1)),
+}
+# Number of days of the ranges cached right after a new day is calculated
+CACHE_WARMING = {
+    'mms_retrieve': [
+        int(days) for days in os.getenv(
+            'CACHE_WARMING_MMS_RETRIEVE_DAYS', '30;90;365'
+        ).split(';')
+    ]
+}
 
 # Database django connection settings (https://docs.djangoproject.com/en/3.2/ref/databases) # noqa
 DATABASES = {
@@ -212,6 +337,23 @@ DATABASES = {
 
 DATABASE_ROUTERS = ['project.core.databases.DatabaseRouter']
 
+# Reads of models written within the replica lag window go to the primary
+DATABASE_REPLICA_LAG = {
+    'enabled': bool(strtobool(os.getenv(
+        'DATABASE_REPLICA_LAG_ENABLED',
+        'True'
+    ))),
+    'probe_interval': float(os.getenv(
+        'DATABASE_REPLICA_LAG_PROBE_INTERVAL',
+        '5'
+    )),
+    'last_write_lifetime': int(os.getenv(
+        'DATABASE_REPLICA_LAG_LAST_WRITE_LIFETIME',
+        '3600'
+    )),
+    'cache_alias': 'default',
+}
+
 # Type default for primary key fields (https://docs.djangoproject.com/en/3.2/topics/db/models/#automatic-primary-key-fields) # noqa
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -223,6 +365,60 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},  # noqa
 ]
 
+# Access log of the requests (see the Readme in the Log section): the share
+# of sampled requests, whether the JSON bodies are logged and the paths
+# (prefixes) logged; server errors are always logged
+ACCESS_LOGGING = {
+    'sample_rate': float(os.getenv('ACCESS_LOGGING_SAMPLE_RATE', 1.0)),
+    'body': bool(strtobool(os.getenv('ACCESS_LOGGING_BODY', 'False'))),
+    'max_body_size': int(os.getenv('ACCESS_LOGGING_MAX_BODY_SIZE', 1024)),
+    'include_paths': [
+        path for path in os.getenv(
+            'ACCESS_LOGGING_INCLUDE_PATHS', ''
+        ).split(';') if path
+    ],
+    'exclude_paths': [
+        path for path in os.getenv(
+            'ACCESS_LOGGING_EXCLUDE_PATHS', '/ping;/metrics;/v1/openapi.json'
+        ).split(';') if path
+    ],
+}
+
+# Metrics of the process exposed in /metrics/; with a directory the processes
+# of the host (web and Celery workers) write their values to it and the
+# endpoint merges them
+METRICS = {
+    'directory': os.getenv('METRICS_DIR') or None,
+    'flush_interval': float(os.getenv('METRICS_FLUSH_INTERVAL', 10)),
+    # Bearer token of the /metrics/ route, which refuses every request
+    # when it is not set
+    'token': os.getenv('METRICS_TOKEN') or None,
+}
+
+# Profiling of single requests, triggered by a signed X-Profile header or the
+# sample rate; the profiles (cprofile: pstats, sampling: collapsed stacks)
+# are written to the directory
+PROFILING = {
+    'enabled': bool(strtobool(os.getenv('PROFILING_ENABLED', 'False'))),
+    'mode': os.getenv('PROFILING_MODE', 'cprofile'),
+    'interval': float(os.getenv('PROFILING_INTERVAL', 0.001)),
+    'directory': os.getenv('PROFILING_DIR', '/tmp/profiles'),
+    'sample_rate': float(os.getenv('PROFILING_SAMPLE_RATE', 0)),
+    'max_age': int(os.getenv('PROFILING_TOKEN_MAX_AGE', 3600)),
+    'server_timing': bool(
+        strtobool(os.getenv('PROFILING_SERVER_TIMING', 'False'))
+    ),
+}
+
+# Writes the logs from a background thread, with at most max_size records
+# waiting; when it is full the records are dropped or, with block, the
+# caller waits
+LOG_QUEUE = {
+    'enabled': bool(strtobool(os.getenv('LOG_QUEUE_ENABLED', 'False'))),
+    'max_size': int(os.getenv('LOG_QUEUE_MAX_SIZE', 10000)),
+    'block': bool(strtobool(os.getenv('LOG_QUEUE_BLOCK', 'False'))),
+}
+
 # Configuring Django logs (https://docs.djangoproject.com/en/3.2/topics/logging) # noqa
 # See the Readme in the Log section
 LOGGING = {
@@ -249,6 +445,13 @@ LOGGING = {
             'formatter': 'json',
             'filters': ['ignore_if_contains'],
             'stream': sys.stdout,
+        } if not LOG_QUEUE['enabled'] else {
+            '()': 'project.core.logging.handlers.QueueStreamHandler',
+            'formatter': 'json',
+            'filters': ['ignore_if_contains'],
+            'stream': sys.stdout,
+            'max_size': LOG_QUEUE['max_size'],
+            'block': LOG_QUEUE['block'],
         },
     },
     'loggers': {
@@ -282,8 +485,7 @@ LOGGING = {
 # Configuration of the Structlog module that structures the logs in Json (https://www.structlog.org/en/stable) # noqa
 structlog.configure(
     processors=[
-        processors.hostname,
-        processors.version,
+        processors.StaticFields(host=socket.gethostname(), version=VERSION),
         processors.correlation,
         structlog.stdlib.filter_by_level,
         structlog.processors.TimeStamper(fmt='iso', key='datetime', utc=True),
@@ -314,29 +516,36 @@ CELERY_CONTENT_ENCODING = 'utf-8'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/1')
 
-CELERY_TASK_QUEUES = (
-    Queue(
-        name='indicator-mms-calculate',
-        exchange=Exchange('indicator-mms-calculate', type='direct'),
-        routing_key='indicator-mms-calculate',
-    ),
-    Queue(
-        name='indicator-mms-select-pairs',
-        exchange=Exchange('indicator-mms-select-pairs', type='direct'),
-        routing_key='indicator-mms-select-pairs',
-    ),
-)
-
-CELERY_BEAT_SCHEDULE = {
-    'indicator-mms-select-pairs': {
-        'task': (
-            'project.apps.indicators.mms.tasks.task_beat_select_pairs_to_mms'
+# The queues and schedule need Celery objects, which the web process does
+# not import
+if IS_WORKER_PROCESS or IS_BEAT_PROCESS:
+    from celery.schedules import crontab
+    from kombu import Exchange, Queue
+
+    CELERY_TASK_QUEUES = (
+        Queue(
+            name='indicator-mms-calculate',
+            exchange=Exchange('indicator-mms-calculate', type='direct'),
+            routing_key='indicator-mms-calculate',
         ),
-        'schedule': crontab(
-            hour=os.getenv('CELERY_BEAT_HOUR_SELECT_PAIRS_TO_MMS', '*/1')
-        )
-    },
-}
+        Queue(
+            name='indicator-mms-select-pairs',
+            exchange=Exchange('indicator-mms-select-pairs', type='direct'),
+            routing_key='indicator-mms-select-pairs',
+        ),
+    )
+
+    CELERY_BEAT_SCHEDULE = {
+        'indicator-mms-select-pairs': {
+            'task': (
+                'project.apps.indicators.mms.tasks.'
+                'task_beat_select_pairs_to_mms'
+            ),
+            'schedule': crontab(
+                hour=os.getenv('CELERY_BEAT_HOUR_SELECT_PAIRS_TO_MMS', '*/1')
+            )
+        },
+    }
 
 
 # Settings for applications
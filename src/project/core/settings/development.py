@@ -1,3 +1,7 @@
 from .base import *  # noqa
 
 DEBUG = bool(strtobool(os.getenv('DEBUG', 'True')))
+
+ACCESS_LOGGING['body'] = bool(
+    strtobool(os.getenv('ACCESS_LOGGING_BODY', 'True'))
+)
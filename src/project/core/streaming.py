@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, Iterator, List, TypeVar
+
+from django.core.handlers.asgi import ASGIHandler as BaseASGIHandler
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+from asgiref.sync import sync_to_async
+
+T = TypeVar('T')
+
+_DONE = object()
+
+_receive = contextvars.ContextVar('receive')
+
+
+def get_chunks(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """
+    Groups the items in lists of up to chunk_size items
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+class ThreadedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response whose content may read the database (e.g. through
+    QuerySet.iterator), which Django 3.2 does not allow inside the event
+    loop that sends the response.
+
+    Under ASGI the content is produced in a thread owned by the response,
+    which also holds its database connection until the end of the stream;
+    under WSGI it behaves as a StreamingHttpResponse.
+    """
+
+    async def aiter_content(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1)
+        iterator = iter(self)
+        try:
+            while True:
+                part = await loop.run_in_executor(
+                    executor,
+                    next,
+                    iterator,
+                    _DONE
+                )
+                if part is _DONE:
+                    break
+
+                yield part
+        finally:
+            await loop.run_in_executor(executor, self._close_in_thread)
+            executor.shutdown(wait=False)
+
+    def _close_in_thread(self):
+        self.close()
+        connections.close_all()
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response whose content is an async iterator (e.g. the events
+    of a pub/sub channel), which can only be sent by the ASGIHandler below
+    """
+
+    def __init__(self, streaming_content: AsyncIterator[bytes], **kwargs):
+        super().__init__(**kwargs)
+        self.async_streaming_content = streaming_content
+
+    def __iter__(self):
+        raise TypeError('An async streaming response requires ASGI')
+
+    async def aiter_content(self) -> AsyncIterator[bytes]:
+        try:
+            async for part in self.async_streaming_content:
+                yield part
+        finally:
+            await self.async_streaming_content.aclose()
+
+
+class ASGIHandler(BaseASGIHandler):
+    """
+    Django ASGI handler that sends ThreadedStreamingHttpResponse without
+    iterating it in the event loop and AsyncStreamingHttpResponse, stopping
+    both when the client disconnects
+    """
+
+    async def __call__(self, scope, receive, send):
+        _receive.set(receive)
+        return await super().__call__(scope, receive, send)
+
+    async def send_response(self, response, send):
+        if not isinstance(
+            response,
+            (ThreadedStreamingHttpResponse, AsyncStreamingHttpResponse)
+        ):
+            return await super().send_response(response, send)
+
+        try:
+            response_headers = []
+            for header, value in response.items():
+                if isinstance(header, str):
+                    header = header.encode('ascii')
+                if isinstance(value, str):
+                    value = value.encode('latin1')
+                response_headers.append((bytes(header), bytes(value)))
+            for cookie in response.cookies.values():
+                value = cookie.output(header='').encode('ascii').strip()
+                response_headers.append((b'Set-Cookie', value))
+
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': response_headers,
+            })
+
+            sending = asyncio.ensure_future(self.send_content(response, send))
+            disconnect = asyncio.ensure_future(self.wait_disconnect())
+            await asyncio.wait(
+                [sending, disconnect],
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            disconnect.cancel()
+            if not sending.done():
+                sending.cancel()
+                await asyncio.gather(sending, return_exceptions=True)
+                return
+
+            sending.result()
+            await send({'type': 'http.response.body'})
+        finally:
+            if isinstance(response, AsyncStreamingHttpResponse):
+                # Sends request_finished and closes the connections, as
+                # Django does; the threaded response closes in its thread
+                await sync_to_async(
+                    response.close,
+                    thread_sensitive=True
+                )()
+
+    async def send_content(self, response, send):
+        content = response.aiter_content()
+        try:
+            async for part in content:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            await content.aclose()
+
+    @staticmethod
+    async def wait_disconnect():
+        receive = _receive.get()
+        while (await receive())['type'] != 'http.disconnect':
+            pass
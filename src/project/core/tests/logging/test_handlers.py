@@ -0,0 +1,116 @@
+import io
+import logging
+import threading
+
+import pytest
+
+from project.core.logging.handlers import QueueStreamHandler
+
+
+class BlockingStream(io.StringIO):
+    """
+    Stream whose writes wait until it is released
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.released.wait(timeout=5)
+        return super().write(text)
+
+
+class TestQueueStreamHandler:
+
+    @pytest.fixture()
+    def stream(self):
+        return BlockingStream()
+
+    @pytest.fixture()
+    def handler(self, stream):
+        handler = QueueStreamHandler(stream=stream, max_size=1)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        yield handler
+        stream.released.set()
+        handler.close()
+
+    @pytest.fixture()
+    def logger(self, handler):
+        logger = logging.getLogger('test_queue_stream_handler')
+        logger.propagate = False
+        logger.addHandler(handler)
+        yield logger
+        logger.removeHandler(handler)
+
+    def test_should_validate_that_the_records_are_dropped_and_counted_when_the_queue_is_full(  # noqa
+        self,
+        handler,
+        logger,
+        stream,
+    ):
+        logger.warning('first')
+        assert stream.writing.wait(timeout=5)
+
+        # The first record is being written and the second fills the queue
+        for index in range(2, 6):
+            logger.warning('record %d', index)
+
+        assert handler.dropped == 3
+        stream.released.set()
+        handler.close()
+
+        assert stream.getvalue().splitlines() == [
+            'WARNING first',
+            'WARNING 3 log records were dropped',
+            'WARNING record 2',
+        ]
+        assert handler.dropped == 0
+
+    def test_should_validate_that_the_queued_records_are_written_on_close(
+        self,
+        stream,
+    ):
+        stream.released.set()
+        handler = QueueStreamHandler(stream=stream, max_size=100)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+        for index in range(50):
+            handler.handle(logging.makeLogRecord({'msg': f'record {index}'}))
+        handler.close()
+
+        assert stream.getvalue().splitlines() == [
+            f'record {index}' for index in range(50)
+        ]
+
+    def test_should_validate_that_the_message_is_formatted_with_the_arguments_of_the_log_call(  # noqa
+        self,
+        logger,
+        handler,
+        stream,
+    ):
+        values = [1]
+        logger.info('values %s', values)
+        values.append(2)
+
+        stream.released.set()
+        handler.close()
+
+        assert stream.getvalue() == 'INFO values [1]\n'
+
+    def test_should_validate_that_close_waits_for_the_stream_up_to_the_timeout(  # noqa
+        self,
+        logger,
+        handler,
+        stream,
+    ):
+        handler.close_timeout = 0.05
+        logger.info('first')
+        logger.info('second')
+        assert stream.writing.wait(timeout=5)
+
+        handler.close()
+
+        assert stream.getvalue() == ''
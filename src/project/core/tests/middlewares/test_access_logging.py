@@ -0,0 +1,197 @@
+from unittest.mock import patch
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+import pytest
+from simple_settings import settings
+
+from project.core.middlewares.access_logging import AccessLoggingMiddleware
+
+ACCESS_LOGGING = {
+    'sample_rate': 1.0,
+    'body': False,
+    'max_body_size': 1024,
+    'include_paths': [],
+    'exclude_paths': ['/ping'],
+}
+
+
+class TestAccessLoggingMiddleware:
+
+    @pytest.fixture()
+    def logger(self):
+        with patch(
+            'project.core.middlewares.access_logging.logger'
+        ) as logger:
+            yield logger
+
+    @pytest.fixture()
+    def make_middleware(self):
+        def make(response=None, **config):
+            with patch.dict(
+                settings.ACCESS_LOGGING,
+                {**ACCESS_LOGGING, **config}
+            ):
+                return AccessLoggingMiddleware(
+                    lambda request: response or JsonResponse({'ok': True})
+                )
+
+        return make
+
+    def test_should_validate_that_the_request_metadata_is_logged(
+        self,
+        logger,
+        make_middleware,
+    ):
+        middleware = make_middleware()
+
+        middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        logger.info.assert_called_once()
+        fields = logger.info.call_args.kwargs
+        assert fields['path'] == '/v1/BRLBTC/mms'
+        assert fields['method'] == 'GET'
+        assert fields['status_code'] == 200
+        assert fields['content_type'] == 'application/json'
+        assert fields['time_spent'] >= 0
+        assert 'request_body' not in fields
+        assert 'response_body' not in fields
+
+    @pytest.mark.parametrize('path,logged', [
+        ('/v1/BRLBTC/mms', True),
+        ('/ping', False),
+        ('/ping/', False),
+    ])
+    def test_should_validate_that_the_excluded_paths_are_not_logged(
+        self,
+        logger,
+        make_middleware,
+        path,
+        logged,
+    ):
+        middleware = make_middleware()
+
+        middleware(RequestFactory().get(path))
+
+        assert logger.info.called is logged
+
+    def test_should_validate_that_only_the_included_paths_are_logged(
+        self,
+        logger,
+        make_middleware,
+    ):
+        middleware = make_middleware(include_paths=['/v1/'])
+
+        middleware(RequestFactory().get('/admin/'))
+        middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        logger.info.assert_called_once()
+        assert logger.info.call_args.kwargs['path'] == '/v1/BRLBTC/mms'
+
+    @pytest.mark.parametrize('random_value,logged', [
+        (0.0, True),
+        (0.24, True),
+        (0.25, False),
+        (0.99, False),
+    ])
+    def test_should_validate_that_only_a_sample_of_the_requests_is_logged(
+        self,
+        logger,
+        make_middleware,
+        random_value,
+        logged,
+    ):
+        middleware = make_middleware(sample_rate=0.25)
+
+        with patch(
+            'project.core.middlewares.access_logging.random.random',
+            return_value=random_value
+        ):
+            middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        assert logger.info.called is logged
+
+    @pytest.mark.parametrize('path', ['/v1/BRLBTC/mms', '/ping'])
+    def test_should_validate_that_the_server_errors_are_always_logged(
+        self,
+        logger,
+        make_middleware,
+        path,
+    ):
+        middleware = make_middleware(
+            response=HttpResponse(status=500),
+            sample_rate=0.0,
+        )
+
+        middleware(RequestFactory().get(path))
+
+        logger.info.assert_called_once()
+        assert logger.info.call_args.kwargs['status_code'] == 500
+
+    def test_should_validate_that_the_bodies_are_logged_when_enabled(
+        self,
+        logger,
+        make_middleware,
+    ):
+        middleware = make_middleware(body=True)
+
+        middleware(RequestFactory().post(
+            '/v1/BRLBTC/mms',
+            data={'range': 20},
+            content_type='application/json',
+        ))
+
+        fields = logger.info.call_args.kwargs
+        assert fields['request_body'] == {'range': 20}
+        assert fields['response_body'] == {'ok': True}
+
+    def test_should_validate_that_the_bodies_larger_than_the_maximum_size_are_truncated(  # noqa
+        self,
+        logger,
+        make_middleware,
+    ):
+        middleware = make_middleware(
+            response=JsonResponse({'values': list(range(100))}),
+            body=True,
+            max_body_size=10,
+        )
+
+        middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        assert logger.info.call_args.kwargs['response_body'] == (
+            '{"values":'
+        )
+
+    def test_should_validate_that_the_body_of_a_streaming_response_is_not_read(  # noqa
+        self,
+        logger,
+        make_middleware,
+    ):
+        response = StreamingHttpResponse(
+            iter([b'[]']),
+            content_type='application/json',
+        )
+        middleware = make_middleware(response=response, body=True)
+
+        middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        fields = logger.info.call_args.kwargs
+        assert 'response_body' not in fields
+        assert list(response.streaming_content) == [b'[]']
+
+    def test_should_validate_that_the_bodies_of_other_content_types_are_not_logged(  # noqa
+        self,
+        logger,
+        make_middleware,
+    ):
+        middleware = make_middleware(
+            response=HttpResponse('text', content_type='text/plain'),
+            body=True,
+        )
+
+        middleware(RequestFactory().get('/v1/BRLBTC/mms'))
+
+        fields = logger.info.call_args.kwargs
+        assert 'request_body' not in fields
+        assert 'response_body' not in fields
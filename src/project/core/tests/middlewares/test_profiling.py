@@ -0,0 +1,89 @@
+import os
+from unittest.mock import patch
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+import pytest
+from simple_settings import settings
+
+from project.core.middlewares.profiling import (
+    ProfilingMiddleware,
+    get_profiling_token
+)
+from project.core.profiling import install_database_timing, time_database_query
+
+
+class TestProfilingMiddleware:
+
+    @pytest.fixture()
+    def make_middleware(self, tmp_path):
+        def make(get_response, **config):
+            with patch.dict(settings.PROFILING, {
+                'enabled': True,
+                'directory': str(tmp_path),
+                **config,
+            }):
+                return ProfilingMiddleware(get_response)
+
+        yield make
+
+        connection_created.disconnect(install_database_timing)
+        for connection in connections.all():
+            if time_database_query in connection.execute_wrappers:
+                connection.execute_wrappers.remove(time_database_query)
+
+    def get_extensions(self, directory):
+        return [name.rsplit('.', 1)[-1] for name in os.listdir(directory)]
+
+    @pytest.mark.parametrize('_token,_profiled', [
+        (None, True),
+        ('profile:invalid', False),
+    ])
+    def test_should_validate_that_the_request_with_the_token_is_profiled(
+        self,
+        make_middleware,
+        tmp_path,
+        _token,
+        _profiled
+    ):
+        middleware = make_middleware(lambda request: HttpResponse())
+        token = _token or get_profiling_token()
+
+        response = middleware(
+            RequestFactory().get('/ping/', HTTP_X_PROFILE=token)
+        )
+
+        assert ('Server-Timing' in response) is _profiled
+        assert self.get_extensions(tmp_path) == (
+            ['pstats'] if _profiled else []
+        )
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_async_request_is_profiled_by_sampling(  # noqa
+        self,
+        make_middleware,
+        tmp_path,
+    ):
+        async def view(request):
+            return HttpResponse()
+
+        middleware = make_middleware(view, mode='cprofile')
+
+        response = await middleware(RequestFactory().get(
+            '/ping/',
+            HTTP_X_PROFILE=get_profiling_token()
+        ))
+
+        assert 'Server-Timing' in response
+        assert self.get_extensions(tmp_path) == ['collapsed']
+
+    def test_should_validate_that_the_middleware_is_not_used_when_disabled(
+        self,
+        make_middleware,
+    ):
+        with pytest.raises(MiddlewareNotUsed):
+            make_middleware(lambda request: HttpResponse(), enabled=False)
@@ -0,0 +1,83 @@
+import asyncio
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+import pytest
+
+from project.core.logging.processors import correlation
+from project.core.middlewares.third_party import (
+    CidMiddleware,
+    CorsMiddleware,
+    SecurityMiddleware,
+    XFrameOptionsMiddleware
+)
+
+
+class TestCidMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_concurrent_async_requests_keep_their_correlation_id(  # noqa
+        self
+    ):
+        logged = []
+
+        async def view(request):
+            for _ in range(3):
+                # Switches to the other request between the logs
+                await asyncio.sleep(0)
+                logged.append((
+                    request.correlation_id,
+                    correlation(None, 'info', {})['correlation']
+                ))
+
+            return HttpResponse()
+
+        middleware = CidMiddleware(view)
+        first, second = await asyncio.gather(
+            middleware(RequestFactory().get('/ping/')),
+            middleware(RequestFactory().get('/ping/')),
+        )
+
+        assert first['X-Correlation-ID'] != second['X-Correlation-ID']
+        assert len(logged) == 6
+        assert all(expected == cid for expected, cid in logged)
+        assert {cid for _, cid in logged} == {
+            first['X-Correlation-ID'],
+            second['X-Correlation-ID'],
+        }
+
+    def test_should_validate_that_the_upstream_correlation_id_is_kept(self):
+        middleware = CidMiddleware(lambda request: HttpResponse())
+
+        response = middleware(
+            RequestFactory().get('/ping/', **{'X-Correlation-ID': 'upstream'})
+        )
+
+        assert response['X-Correlation-ID'].startswith('upstream, ')
+
+
+class TestInlineMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_django_hooks_run_in_an_async_request(  # noqa
+        self
+    ):
+        async def view(request):
+            return HttpResponse()
+
+        handler = view
+        for middleware_class in reversed([
+            SecurityMiddleware,
+            CorsMiddleware,
+            XFrameOptionsMiddleware,
+        ]):
+            handler = middleware_class(handler)
+
+        response = await handler(
+            RequestFactory().get('/ping/', HTTP_ORIGIN='http://example.com')
+        )
+
+        assert response['X-Content-Type-Options'] == 'nosniff'
+        assert response['X-Frame-Options'] == 'DENY'
+        assert response['Access-Control-Allow-Origin'] == 'http://example.com'
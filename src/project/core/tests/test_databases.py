@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+
+import pytest
+
+from project.apps.indicators.mms.models import SimpleMovingAverage
+from project.core.databases import DatabaseRouter, ReplicaLagProbe
+
+
+class TestReplicaLagProbe:
+
+    def test_should_validate_that_the_lag_is_measured_once_per_interval(
+        self
+    ):
+        probe = ReplicaLagProbe(alias='default_read', interval=5)
+
+        with patch.object(probe, 'measure', return_value=0.5) as mock_measure:
+            assert probe.get_lag() == 0.5
+            assert probe.get_lag() == 0.5
+
+        mock_measure.assert_called_once_with()
+
+    def test_should_validate_that_a_failed_measure_returns_none(self):
+        probe = ReplicaLagProbe(alias='default_read', interval=5)
+
+        with patch('project.core.databases.connections') as mock_connections:
+            connection = mock_connections.__getitem__.return_value
+            connection.vendor = 'postgresql'
+            connection.cursor.side_effect = Exception('unreachable')
+
+            assert probe.get_lag() is None
+
+
+class TestDatabaseRouter:
+
+    @pytest.fixture()
+    def shared_cache(self):
+        shared_cache = LocMemCache('database-router-test', {})
+        with patch('project.core.databases.caches') as mock_caches:
+            mock_caches.__getitem__.return_value = shared_cache
+            yield shared_cache
+
+        shared_cache.clear()
+
+    @pytest.fixture()
+    def router(self, shared_cache):
+        router = DatabaseRouter()
+        router.settings = 'project.core.settings.production'
+        with patch.object(router.probe, 'measure', return_value=0.5):
+            yield router
+
+    def test_should_validate_that_a_low_lag_routes_reads_to_the_replica(
+        self,
+        router
+    ):
+        assert router.db_for_read(SimpleMovingAverage) == 'default_read'
+
+    def test_should_validate_that_reads_after_a_write_go_to_the_primary(
+        self,
+        router,
+        shared_cache,
+    ):
+        assert router.db_for_write(SimpleMovingAverage) == 'default'
+
+        with patch.object(shared_cache, 'get') as mock_get:
+            assert router.db_for_read(SimpleMovingAverage) == 'default'
+
+        # The write of the process is kept in process
+        mock_get.assert_not_called()
+
+        with patch('project.core.databases.time.time') as mock_time:
+            mock_time.return_value = (
+                router._last_writes['mms.simplemovingaverage'] + 100
+            )
+            assert router.db_for_read(SimpleMovingAverage) == 'default_read'
+
+    def test_should_validate_that_the_write_of_another_process_is_shared_once_per_interval(  # noqa
+        self,
+        router,
+        shared_cache,
+    ):
+        writer = DatabaseRouter()
+        writer.settings = router.settings
+
+        with patch.object(
+            shared_cache,
+            'set',
+            wraps=shared_cache.set
+        ) as mock_set:
+            writer.db_for_write(SimpleMovingAverage)
+            writer.db_for_write(SimpleMovingAverage)
+
+        mock_set.assert_called_once()
+        with patch.object(
+            shared_cache,
+            'get',
+            wraps=shared_cache.get
+        ) as mock_get:
+            assert router.db_for_read(SimpleMovingAverage) == 'default'
+            assert router.db_for_read(SimpleMovingAverage) == 'default'
+
+        mock_get.assert_called_once()
+
+    def test_should_validate_that_reads_fall_back_to_the_primary_when_the_probe_fails(  # noqa
+        self,
+        router
+    ):
+        with patch.object(router.probe, 'measure', return_value=None):
+            assert router.db_for_read(SimpleMovingAverage) == 'default'
+
+    def test_should_validate_that_a_cache_failure_does_not_break_the_routing(  # noqa
+        self,
+        router,
+        shared_cache,
+    ):
+        with patch.object(
+            shared_cache,
+            'get',
+            side_effect=ConnectionError
+        ), patch.object(shared_cache, 'set', side_effect=ConnectionError):
+            assert router.db_for_read(SimpleMovingAverage) == 'default_read'
+            assert router.db_for_write(SimpleMovingAverage) == 'default'
+            assert router.db_for_read(SimpleMovingAverage) == 'default'
@@ -0,0 +1,145 @@
+from unittest.mock import patch
+
+import pytest
+
+from project.core.locks import (
+    LocalLockBackend,
+    Lock,
+    LockAcquireError,
+    LockActiveError,
+    LockBackend,
+    PostgresLockBackend,
+    get_lock_backend
+)
+
+
+class TestLockBackend:
+
+    def test_should_validate_that_a_backend_without_release_is_not_created(  # noqa
+        self
+    ):
+        class AcquireOnlyLockBackend(LockBackend):
+
+            def acquire(self, key, expire=None):
+                return True
+
+        with pytest.raises(TypeError):
+            AcquireOnlyLockBackend()
+
+
+class TestLocalLockBackend:
+
+    def test_should_validate_that_a_held_key_is_not_acquired_again(self):
+        backend = LocalLockBackend()
+
+        assert backend.acquire('key') is True
+        assert backend.acquire('key') is False
+        assert backend.acquire('other_key') is True
+
+        backend.release('key')
+        assert backend.acquire('key') is True
+
+    def test_should_validate_that_an_expired_lock_is_acquired_again(self):
+        backend = LocalLockBackend()
+
+        with patch('project.core.locks.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 100
+            assert backend.acquire('key', 10) is True
+            assert backend.acquire('never', None) is True
+
+            mock_monotonic.return_value = 110
+            assert backend.acquire('key', 10) is True
+            assert backend.acquire('never', None) is False
+
+    def test_should_validate_that_the_default_lock_backend_is_of_the_settings(  # noqa
+        self
+    ):
+        assert isinstance(get_lock_backend(), LocalLockBackend)
+        assert get_lock_backend() is get_lock_backend()
+
+
+class TestPostgresLockBackend:
+
+    def test_should_validate_that_the_lock_id_is_a_stable_bigint(self):
+        lock_id = PostgresLockBackend.get_lock_id('task:BRLBTC-1d')
+
+        assert lock_id == PostgresLockBackend.get_lock_id('task:BRLBTC-1d')
+        assert lock_id != PostgresLockBackend.get_lock_id('task:BRLETH-1d')
+        assert -2 ** 63 <= lock_id < 2 ** 63
+
+    def test_should_validate_that_the_advisory_lock_functions_are_called(
+        self
+    ):
+        backend = PostgresLockBackend('default')
+        lock_id = backend.get_lock_id('key')
+
+        with patch('project.core.locks.connections') as mock_connections:
+            cursor = mock_connections.__getitem__.return_value.cursor
+            mock_cursor = cursor.return_value.__enter__.return_value
+            mock_cursor.fetchone.return_value = (True,)
+
+            with Lock('key', backend=backend) as lock:
+                assert lock.active is True
+
+        mock_connections.__getitem__.assert_called_with('default')
+        assert [call.args for call in mock_cursor.execute.call_args_list] == [
+            ('SELECT pg_try_advisory_lock(%s)', [lock_id]),
+            ('SELECT pg_advisory_unlock(%s)', [lock_id]),
+        ]
+
+    @pytest.mark.django_db
+    def test_should_validate_that_a_database_error_raises_acquire_error(
+        self
+    ):
+        # The sqlite database of the tests has no advisory locks
+        with pytest.raises(LockAcquireError):
+            with Lock('key', backend=PostgresLockBackend()):
+                pass
+
+
+class TestLock:
+
+    def test_should_validate_that_a_held_lock_raises_active_error(self):
+        backend = LocalLockBackend()
+
+        with Lock('task:BRLBTC', backend=backend) as lock:
+            assert lock.active is True
+            assert lock.name == 'task'
+
+            with pytest.raises(LockActiveError):
+                with Lock('task:BRLBTC', backend=backend):
+                    pass
+
+            with Lock(
+                'task:BRLBTC',
+                backend=backend,
+                raise_exception=False
+            ) as other_lock:
+                assert other_lock.active is False
+
+        assert lock.active is False
+        assert backend.acquire('task:BRLBTC') is True
+
+    def test_should_validate_that_the_lock_is_kept_without_delete_on_exit(
+        self
+    ):
+        backend = LocalLockBackend()
+
+        with Lock('key', backend=backend, delete_on_exit=False):
+            pass
+
+        assert backend.acquire('key') is False
+
+    @pytest.mark.asyncio
+    async def test_should_validate_the_async_lock(self):
+        backend = LocalLockBackend()
+
+        async with Lock('key', backend=backend) as lock:
+            assert lock.active is True
+
+            with pytest.raises(LockActiveError):
+                async with Lock('key', backend=backend):
+                    pass
+
+        assert lock.active is False
+        assert await backend.acquire_async('key') is True
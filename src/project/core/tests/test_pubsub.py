@@ -0,0 +1,131 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from project.core.caches import AsyncRedisCache
+from project.core.pubsub import Subscriber, Subscription
+
+
+class FakePubSub:
+    """
+    Pub/sub connection of redis.asyncio that delivers the published
+    messages of its channels
+    """
+
+    def __init__(self):
+        self.channels = set()
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+
+    async def unsubscribe(self, channel):
+        self.channels.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def publish(self, channel, data):
+        if channel in self.channels:
+            self.messages.put_nowait({
+                'type': 'message',
+                'channel': channel.encode(),
+                'data': data,
+            })
+
+
+class TestSubscriber:
+
+    @pytest.fixture()
+    def pubsub(self):
+        return FakePubSub()
+
+    @pytest.fixture()
+    def subscriber(self, pubsub):
+        cache = MagicMock(spec=AsyncRedisCache)
+        cache.make_key.side_effect = lambda key: f'default:1:{key}'
+        cache.client.pubsub.return_value = pubsub
+        subscriber = Subscriber('default')
+        subscriber.read_timeout = 0.01
+        with patch(
+            'project.core.pubsub.get_async_cache',
+            return_value=cache
+        ), patch(
+            'project.core.pubsub.get_subscriber',
+            return_value=subscriber
+        ):
+            yield subscriber
+
+        cache.client.pubsub.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_messages_are_fanned_out_to_each_subscription(  # noqa
+        self,
+        subscriber,
+        pubsub,
+    ):
+        async with Subscription('default', 'events') as first, Subscription(
+            'default',
+            'events'
+        ) as second, Subscription('default', 'other') as other:
+            assert pubsub.channels == {
+                'default:1:events',
+                'default:1:other',
+            }
+
+            pubsub.publish('default:1:events', b'message')
+
+            assert await first.get_message(timeout=1) == b'message'
+            assert await second.get_message(timeout=1) == b'message'
+            assert await other.get_message(timeout=0.05) is None
+
+        assert pubsub.channels == set()
+        # The reader stops once there are no subscriptions
+        await asyncio.wait_for(subscriber._reader, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_channel_is_kept_while_it_has_subscriptions(  # noqa
+        self,
+        subscriber,
+        pubsub,
+    ):
+        async with Subscription('default', 'events') as first:
+            async with Subscription('default', 'events'):
+                pass
+
+            assert pubsub.channels == {'default:1:events'}
+            pubsub.publish('default:1:events', b'message')
+
+            assert await first.get_message(timeout=1) == b'message'
+
+        await asyncio.wait_for(subscriber._reader, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_oldest_messages_of_a_slow_subscription_are_dropped(  # noqa
+        self,
+        subscriber,
+        pubsub,
+    ):
+        subscriber.queue_size = 2
+
+        async with Subscription('default', 'events') as subscription:
+            for index in range(3):
+                pubsub.publish('default:1:events', b'%d' % index)
+
+            await asyncio.sleep(0.05)
+
+            assert await subscription.get_message(timeout=1) == b'1'
+            assert await subscription.get_message(timeout=1) == b'2'
+
+        await asyncio.wait_for(subscriber._reader, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_no_message_is_received_without_redis(  # noqa
+        self
+    ):
+        async with Subscription('default', 'events') as subscription:
+            assert await subscription.get_message(timeout=0.01) is None
@@ -0,0 +1,66 @@
+import asyncio
+
+from django.core.signals import request_finished
+
+import pytest
+
+from project.core.streaming import ASGIHandler, AsyncStreamingHttpResponse
+
+
+@pytest.mark.django_db
+class TestASGIHandler:
+
+    @pytest.fixture()
+    def finished_requests(self):
+        finished_requests = []
+
+        def receiver(sender, **kwargs):
+            finished_requests.append(sender)
+
+        request_finished.connect(receiver)
+        yield finished_requests
+        request_finished.disconnect(receiver)
+
+    @pytest.mark.parametrize('_disconnect', [False, True])
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_async_streaming_response_is_closed(  # noqa
+        self,
+        finished_requests,
+        _disconnect,
+    ):
+        async def content():
+            yield b'first'
+            if _disconnect:
+                await asyncio.sleep(10)
+
+        async def receive():
+            if not _disconnect:
+                await asyncio.sleep(10)
+
+            return {'type': 'http.disconnect'}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        handler = ASGIHandler()
+        response = AsyncStreamingHttpResponse(content())
+        await asyncio.wait_for(
+            asyncio.ensure_future(
+                self.send_response(handler, response, receive, send)
+            ),
+            timeout=5
+        )
+
+        assert messages[0]['type'] == 'http.response.start'
+        assert messages[1]['body'] == b'first'
+        assert len(messages) == (2 if _disconnect else 3)
+        assert len(finished_requests) == 1
+
+    @staticmethod
+    async def send_response(handler, response, receive, send):
+        # The receive channel is set by ASGIHandler.__call__
+        from project.core.streaming import _receive
+        _receive.set(receive)
+        await handler.send_response(response, send)
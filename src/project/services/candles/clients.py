@@ -4,10 +4,9 @@ from urllib.parse import urljoin
 
 import orjson
 import structlog
-from aiohttp import ClientError, ClientResponseError
-from aiohttp_retry import RandomRetry, RetryClient
 from simple_settings import settings
 
+from project.core.metrics import registry
 from project.services.candles.exceptions import (
     ServiceCandleClientException,
     ServiceCandleException,
@@ -20,6 +19,17 @@ logger = structlog.get_logger()
 
 CANDLE_SETTINGS = settings.SERVICES['candles']
 
+CANDLES_REQUEST_DURATION = registry.histogram(
+    'candles_request_duration_seconds',
+    'Duration of the requests to the Candles API, retries included',
+    labels=('precision',),
+)
+CANDLES_REQUEST_ERRORS = registry.counter(
+    'candles_request_errors_total',
+    'Failed requests to the Candles API by error',
+    labels=('error',),
+)
+
 
 async def get_candles(
     pair: str,
@@ -30,6 +40,29 @@ async def get_candles(
     """
     Make a request in the Candles API to filter a pair by date range
     """
+    with CANDLES_REQUEST_DURATION.time(precision=precision):
+        try:
+            return await _request_candles(
+                pair=pair,
+                from_timestamp=from_timestamp,
+                to_timestamp=to_timestamp,
+                precision=precision,
+            )
+        except ServiceCandleException as exc:
+            CANDLES_REQUEST_ERRORS.inc(error=type(exc).__name__)
+            raise
+
+
+async def _request_candles(
+    pair: str,
+    from_timestamp: int,
+    to_timestamp: int,
+    precision: str
+) -> List[CandleSchema]:
+    # Imported on the first request, the web process imports this module
+    # (through the helpers) but never requests the candles
+    from aiohttp import ClientError, ClientResponseError
+    from aiohttp_retry import RandomRetry, RetryClient
 
     try:
         url = urljoin(CANDLE_SETTINGS['url'], f'{pair}/candle')
@@ -0,0 +1,227 @@
+"""
+Fake Candles API, with the /{pair}/candle?from&to&precision contract of the
+real one and deterministic synthetic candles, for performance experiments
+without the Mercado Bitcoin API:
+
+    python -m project.services.candles.fake_server --port 8001 \
+        --latency 0.05 --jitter 0.02 --error-rate 0.01
+
+and SERVICE_CANDLE_URL=http://localhost:8001/ in the application.
+"""
+import argparse
+import asyncio
+import functools
+import math
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+from aiohttp import web
+
+PRECISION_SECONDS = {
+    '1m': 60,
+    '15m': 900,
+    '1h': 3600,
+    '3h': 10800,
+    '1d': 86400,
+}
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def make_candle(pair: str, timestamp: int, seed: int = 0) -> Dict:
+    """
+    Returns the candle of the pair that starts at the timestamp, which
+    depends only on its arguments (overlapping ranges have the same candles).
+
+    The candles are cached, so the server is not the bottleneck of the load
+    tests, and must not be changed.
+    """
+    base = random.Random(f'{seed}:{pair}').uniform(1000, 300000)
+    generator = random.Random(f'{seed}:{pair}:{timestamp}')
+
+    # A slow wave of about 90 days with noise of up to 3% a candle
+    price = base * (1 + 0.3 * math.sin(timestamp / (86400 * 90 / math.tau)))
+    open_ = price * generator.uniform(0.97, 1.03)
+    close = price * generator.uniform(0.97, 1.03)
+    return {
+        'timestamp': timestamp,
+        'open': round(open_, 5),
+        'close': round(close, 5),
+        'high': round(max(open_, close) * generator.uniform(1, 1.02), 5),
+        'low': round(min(open_, close) * generator.uniform(0.98, 1), 5),
+        'volume': round(generator.uniform(1, 100), 8),
+    }
+
+
+def make_candles(
+    pair: str,
+    from_timestamp: int,
+    to_timestamp: int,
+    precision: str = '1d',
+    size: Optional[int] = None,
+    seed: int = 0
+) -> List[Dict]:
+    """
+    Returns the candles of the range or, with a size, that number of candles
+    ending at the end of the range (larger or smaller payloads)
+    """
+    step = PRECISION_SECONDS[precision]
+    end = to_timestamp - to_timestamp % step
+    if size is None:
+        start = from_timestamp + (-from_timestamp % step)
+        size = max((end - start) // step + 1, 0)
+
+    return [
+        make_candle(pair, end - index * step, seed)
+        for index in reversed(range(size))
+    ]
+
+
+def create_app(
+    latency: float = 0,
+    jitter: float = 0,
+    error_rate: float = 0,
+    error_status: int = 500,
+    size: Optional[int] = None,
+    seed: int = 0
+) -> web.Application:
+    """
+    Returns the application of the fake API.
+
+    Each response waits latency seconds plus up to jitter seconds, and the
+    error_rate fraction of them fails with the error_status. With a size,
+    every response has that number of candles.
+    """
+    generator = random.Random(seed)
+
+    async def candle(request: web.Request) -> web.Response:
+        delay = latency + generator.uniform(0, jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if generator.random() < error_rate:
+            return web.json_response(
+                {'status_code': error_status, 'status_message': 'Error'},
+                status=error_status
+            )
+
+        try:
+            precision = request.query.get('precision', '1d')
+            candles = make_candles(
+                pair=request.match_info['pair'],
+                from_timestamp=int(request.query['from']),
+                to_timestamp=int(request.query['to']),
+                precision=precision,
+                size=size,
+                seed=seed,
+            )
+        except (KeyError, ValueError):
+            return web.json_response(
+                {'status_code': 400, 'status_message': 'Invalid parameters'},
+                status=400
+            )
+
+        body = orjson.dumps({
+            'status_code': 100,
+            'status_message': 'Success',
+            'server_unix_timestamp': int(time.time()),
+            'candles': candles,
+        })
+        return web.Response(body=body, content_type='application/json')
+
+    app = web.Application()
+    app.router.add_get('/{pair}/candle', candle)
+    return app
+
+
+@contextmanager
+def serve_in_thread(
+    app: web.Application,
+    host: str = '127.0.0.1',
+    port: int = 0
+) -> Iterator[str]:
+    """
+    Serves the application from a background thread (on a free port by
+    default), yielding its url
+    """
+    sock = socket.socket()
+    sock.bind((host, port))
+    host, port = sock.getsockname()[:2]
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.SockSite(runner, sock).start())
+
+    thread = threading.Thread(
+        target=loop.run_forever,
+        name='fake-candles-server',
+        daemon=True
+    )
+    thread.start()
+    try:
+        yield f'http://{host}:{port}/'
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Candles API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument(
+        '--latency',
+        help='seconds each response waits',
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        '--jitter',
+        help='maximum random seconds added to the latency',
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        '--error-rate',
+        help='fraction of the responses that fail',
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        '--error-status',
+        help='status code of the failed responses',
+        type=int,
+        default=500,
+    )
+    parser.add_argument(
+        '--size',
+        help='number of candles of every response (default: of the range)',
+        type=int,
+        default=None,
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            size=args.size,
+            seed=args.seed,
+        ),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == '__main__':
+    main()
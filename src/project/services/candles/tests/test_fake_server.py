@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from project.services.candles.fake_server import create_app, make_candles
+from project.services.candles.schemas import CandleSchema
+
+
+class TestFakeServer:
+
+    @pytest.fixture
+    def params(self):
+        return {
+            'from': 1622592000,
+            'to': 1622851199,
+            'precision': '1d',
+        }
+
+    def test_should_validate_that_the_candles_of_the_range_are_deterministic(  # noqa
+        self
+    ):
+        candles = make_candles('BRLBTC', 1622592000, 1622851199)
+
+        assert [candle['timestamp'] for candle in candles] == [
+            1622592000, 1622678400, 1622764800
+        ]
+        assert candles[1:] == make_candles('BRLBTC', 1622678400, 1622851199)
+        assert candles != make_candles('BRLETH', 1622592000, 1622851199)
+        assert len(make_candles('BRLBTC', 0, 1622851199, size=10)) == 10
+
+    @pytest.mark.asyncio
+    async def test_should_validate_that_the_route_returns_the_candles(
+        self,
+        params
+    ):
+        async with TestClient(TestServer(create_app())) as client:
+            response = await client.get('/BRLBTC/candle', params=params)
+            data = await response.json()
+
+        assert response.status == HTTPStatus.OK
+        assert data['status_code'] == 100
+        assert [
+            CandleSchema.from_dict(candle).timestamp
+            for candle in data['candles']
+        ] == [1622592000, 1622678400, 1622764800]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('_params,_status', [
+        ({}, HTTPStatus.SERVICE_UNAVAILABLE),
+        ({'from': 'invalid'}, HTTPStatus.BAD_REQUEST),
+    ])
+    async def test_should_validate_the_status_code_of_the_errors(
+        self,
+        params,
+        _params,
+        _status
+    ):
+        app = create_app(
+            error_rate=0 if _params else 1,
+            error_status=HTTPStatus.SERVICE_UNAVAILABLE
+        )
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(
+                '/BRLBTC/candle',
+                params={**params, **_params}
+            )
+
+        assert response.status == _status
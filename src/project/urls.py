@@ -1,11 +1,11 @@
 from django.conf.urls.i18n import i18n_patterns
-from django.contrib import admin
 from django.urls import path
 
 from ninja import NinjaAPI
 from simple_settings import settings
 
 from project.apps.indicators.urls import router as indicators_router
+from project.apps.metrics.views import router as metrics_router
 from project.apps.ping.views import router as ping_router
 from project.core.handlers import custom_handler_404, custom_handler_500
 from project.core.renderers import RendererDefault
@@ -22,6 +22,7 @@ api = NinjaAPI(
     csrf=False,
 )
 api.add_router('ping/', ping_router)
+api.add_router('metrics/', metrics_router)
 
 # Routes V1
 api_v1 = NinjaAPI(
@@ -40,6 +41,9 @@ urlpatterns = [
 ]
 
 if settings.ADMIN_ENABLED:
+    # Imported only when enabled, the admin is a large part of the startup
+    from django.contrib import admin
+
     admin.site.site_header = settings.ADMIN_SITE_HEADER
     admin.site.site_title = settings.ADMIN_SITE_TITLE
     admin.site.index_title = settings.ADMIN_INDEX_TITLE